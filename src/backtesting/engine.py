@@ -1,6 +1,19 @@
+import multiprocessing
+import tempfile
+from collections import OrderedDict
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from itertools import product
+from pathlib import Path
+
 import backtrader as bt
+import numpy as np
 import pandas as pd
+import polars as pl
 
+from data.market_calendar import session_calendar
 from logger.logging import get_logger
 
 logger = get_logger(__name__)  # Creates 'yourpackage.backtesting.engine'
@@ -34,6 +47,158 @@ class PandasDataCustomized(bt.feeds.PandasData):
         super().__init__()
 
 
+class PolarsData(bt.feed.DataBase):
+    """
+    Backtrader feed reading one symbol's bars straight from a Polars DataFrame.
+
+    The columns are exposed as NumPy views over the frame's Arrow buffers (no copy
+    for null-free numeric columns) and `_load` only indexes into those arrays, so
+    no pandas objects are built. `dataname` must be a single-symbol frame sorted
+    by timestamp, e.g. a slice produced by `prepare_polars_data_feeds`.
+    """
+
+    lines = ("trade_count", "vwap")
+
+    params = (("timestamp_col", "timestamp"),)
+
+    # Backtrader stores datetimes as UTC float days since 0001-01-01 (ordinal 1)
+    _EPOCH_ORDINAL = 719163.0
+    _US_PER_DAY = 86_400_000_000
+
+    def start(self):
+        super().start()
+        df = self.p.dataname
+
+        epoch_us = df[self.p.timestamp_col].dt.epoch("us").to_numpy()
+        self._datetime = self._EPOCH_ORDINAL + epoch_us / self._US_PER_DAY
+        self._columns = [
+            (getattr(self.lines, name), df[name].to_numpy())
+            for name in (
+                "open",
+                "high",
+                "low",
+                "close",
+                "volume",
+                "trade_count",
+                "vwap",
+            )
+        ]
+        self._idx = -1
+
+    def _load(self):
+        self._idx += 1
+        if self._idx >= len(self._datetime):
+            return False
+
+        i = self._idx
+        self.lines.datetime[0] = self._datetime[i]
+        for line, values in self._columns:
+            line[0] = values[i]
+        self.lines.openinterest[0] = 0.0
+        return True
+
+
+class SessionCalendar(bt.TradingCalendarBase):
+    """
+    Backtrader trading calendar backed by the NYSE sessions of
+    `data.market_calendar`.
+
+    Session dates and their open/close times (int64 UTC epoch microseconds) are
+    held as sorted arrays, so every lookup is a binary search. Backtrader uses
+    the calendar for session ends when resampling or replaying feeds and for
+    session-based timers.
+    """
+
+    params = (("sessions", None),)
+
+    def __init__(self):
+        sessions = session_calendar() if self.p.sessions is None else self.p.sessions
+        self._days = sessions["session"].to_numpy()
+        self._opens = sessions["open"].to_numpy()
+        self._closes = sessions["close"].to_numpy()
+
+    def _nextday(self, day):
+        """Next session after `day`, with its ISO calendar components"""
+        current = day.date() if isinstance(day, datetime) else day
+        i = np.searchsorted(self._days, np.datetime64(current, "D"), side="right")
+        if i == len(self._days):
+            raise ValueError(
+                f"No session after {current}: the calendar ends on {self._days[-1]}"
+            )
+        nextday = self._days[i].astype(date)
+        if isinstance(day, datetime):
+            nextday = datetime.combine(nextday, day.time())
+        return nextday, nextday.isocalendar()
+
+    def schedule(self, day, tz=None):
+        """
+        Open and close of the first session ending at or after `day`, as naive
+        UTC datetimes like the rest of Backtrader's clock. Session times are
+        absolute, so `tz` is not needed.
+        """
+        epoch_us = int((day - datetime(1970, 1, 1)) / timedelta(microseconds=1))
+        i = np.searchsorted(self._closes, epoch_us, side="left")
+        if i == len(self._closes):
+            raise ValueError(
+                f"No session ends at or after {day}: the calendar ends on "
+                f"{self._days[-1]}"
+            )
+        return (
+            datetime(1970, 1, 1) + timedelta(microseconds=int(self._opens[i])),
+            datetime(1970, 1, 1) + timedelta(microseconds=int(self._closes[i])),
+        )
+
+
+def prepare_polars_data_feeds(
+    df: pl.DataFrame,
+    timeframe: bt.TimeFrame = bt.TimeFrame.Days,
+    timestamp_col: str = "timestamp",
+    symbol_col: str = "symbol",
+    sort: bool = True,
+) -> list:
+    """
+    Convert a long-format Polars DataFrame to Backtrader data feeds.
+
+    The frame is sorted once by (symbol, timestamp) and each feed receives a
+    zero-copy slice of the contiguous block for its symbol.
+
+    Args:
+        df: DataFrame with columns: `symbol`, `timestamp`, `open`, `high`, `low`,
+            `close`, `volume`, `trade_count`, `vwap`
+        timeframe: Backtrader timeframe (default: Days)
+        timestamp_col: Name of the timestamp column
+        symbol_col: Name of the symbol column
+        sort: Set to False if `df` is already a single chunk sorted by
+              (symbol, timestamp), e.g. a memory-mapped file, to avoid a copy
+
+    Returns:
+        List of Backtrader data feeds
+    """
+    required_base = ["open", "high", "low", "close", "volume", "trade_count", "vwap"]
+    for col in [symbol_col, timestamp_col, *required_base]:
+        if col not in df.columns:
+            raise ValueError(f"Missing required column: {col}")
+
+    if sort:
+        df = df.sort([symbol_col, timestamp_col]).rechunk()
+    counts = df.group_by(symbol_col, maintain_order=True).len()
+
+    data_feeds = []
+    offsets = np.concatenate([[0], np.cumsum(counts["len"].to_numpy())[:-1]])
+    for symbol, offset, length in zip(
+        counts[symbol_col].to_list(), offsets, counts["len"].to_list()
+    ):
+        data_feed = PolarsData(
+            dataname=df.slice(int(offset), length),
+            name=symbol,
+            timeframe=timeframe,
+            timestamp_col=timestamp_col,
+        )
+        data_feeds.append(data_feed)
+
+    return data_feeds
+
+
 def prepare_data_feeds(
     data_dict: dict[str, pd.DataFrame], timeframe: bt.TimeFrame = bt.TimeFrame.Days
 ) -> list:
@@ -83,7 +248,7 @@ def prepare_data_feeds(
 
 
 def run_backtest(
-    data_dict: dict,
+    data_dict: dict[str, pd.DataFrame] | pl.DataFrame,
     strategy: bt.Strategy,
     timeframe: bt.TimeFrame = bt.TimeFrame.Days,
     cash=10_0000,
@@ -93,7 +258,8 @@ def run_backtest(
     Run backtest on multi-symbol data.
 
     Args:
-        data_dict: Dictionary of symbol DataFrames
+        data_dict: Dictionary of symbol DataFrames, or a long-format Polars
+                   DataFrame which is fed to Backtrader without pandas copies
         strategy: Backtrader Strategy class
         cash: Starting capital
         commission: Commission rate (0.001 = 0.1%) or 1 basis point (bps)
@@ -101,14 +267,18 @@ def run_backtest(
     Returns:
         Cerebro instance with results
     """
-    # Create Cerebro engine
+    # Create Cerebro engine on the NYSE session clock
     cerebro = bt.Cerebro()
+    cerebro.addcalendar(SessionCalendar())
 
     # Add strategy
     cerebro.addstrategy(strategy)
 
     # Prepare and add data feeds
-    data_feeds = prepare_data_feeds(data_dict=data_dict, timeframe=timeframe)
+    if isinstance(data_dict, pl.DataFrame):
+        data_feeds = prepare_polars_data_feeds(data_dict, timeframe=timeframe)
+    else:
+        data_feeds = prepare_data_feeds(data_dict=data_dict, timeframe=timeframe)
     for data_feed in data_feeds:
         cerebro.adddata(data_feed)
 
@@ -160,51 +330,195 @@ def run_backtest(
     return cerebro
 
 
-def optimize_strategy(
-    data_dict: dict,
-    cerebro: bt.Cerebro,
-    cash=10_0000,
-    commission=0.001,
-):
+class EquityCurve(bt.Analyzer):
+    """Record the broker value at every bar as (UTC epoch microseconds, value)"""
+
+    def start(self):
+        self.values = []
+
+    def next(self):
+        # Float day clocks only resolve a few microseconds, so round to the ms
+        days = self.data.datetime[0] - PolarsData._EPOCH_ORDINAL
+        epoch_us = round(days * PolarsData._US_PER_DAY / 1000) * 1000
+        self.values.append((epoch_us, self.strategy.broker.getvalue()))
+
+    def get_analysis(self):
+        return self.values
+
+
+# Bars shared by every sweep task in a worker process, memory-mapped once
+_sweep_data: pl.DataFrame | None = None
+# Most recently used time slices of the shared bars in this worker, keyed by
+# (start, end). Each slice is a private copy, so only a couple are kept: tasks
+# of one walk-forward window run back to back, and older windows are not reused
+_sweep_slices: OrderedDict = OrderedDict()
+_SWEEP_SLICE_LIMIT = 2
+
+
+def _init_sweep_worker(data_path: str) -> None:
+    """Memory-map the shared bars file once per worker process"""
+    global _sweep_data
+    _sweep_data = pl.read_ipc(data_path, memory_map=True)
+    _sweep_slices.clear()
+
+
+def _sweep_slice(start: datetime | None, end: datetime | None) -> pl.DataFrame:
+    """Bars in [start, end), reused by the following tasks on the same window"""
+    if start is None and end is None:
+        return _sweep_data
+
+    key = (start, end)
+    if key in _sweep_slices:
+        _sweep_slices.move_to_end(key)
+        return _sweep_slices[key]
+
+    mask = pl.lit(True)
+    if start is not None:
+        mask &= pl.col("timestamp") >= start
+    if end is not None:
+        mask &= pl.col("timestamp") < end
+    # Filtering keeps the (symbol, timestamp) order of the shared file
+    _sweep_slices[key] = _sweep_data.filter(mask).rechunk()
+    while len(_sweep_slices) > _SWEEP_SLICE_LIMIT:
+        _sweep_slices.popitem(last=False)
+    return _sweep_slices[key]
+
+
+def _run_sweep_point(
+    strategy: type[bt.Strategy],
+    params: dict,
+    timeframe: bt.TimeFrame,
+    cash: float,
+    commission: float,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    record_equity: bool = False,
+) -> dict:
     """
-    Optimize strategy parameters.
+    Run one backtest of the sweep on the worker's shared bars in [start, end).
+    A range without bars has nothing to run, so its metrics are None and its
+    equity curve is empty.
     """
-    # cerebro = bt.Cerebro(optreturn=False)
-
-    # # Add strategy with parameter ranges
-    # cerebro.optstrategy(
-    #     strategy,
-    #     rebalance_hours=range(6, 36, 6),  # Test 6, 12, 18, 24, 30, 36, 42, 48 hours
-    # )
-
-    # Add data feeds
-    data_feeds = prepare_data_feeds(data_dict)
-    for data_feed in data_feeds:
+    bars = _sweep_slice(start, end)
+    if bars.is_empty():
+        result = {
+            **params,
+            "sharpe": None,
+            "max_drawdown": None,
+            "total_return": None,
+            "annual_return": None,
+            "final_value": cash,
+        }
+        if record_equity:
+            result["equity"] = []
+        return result
+
+    cerebro = bt.Cerebro(stdstats=False)
+    cerebro.addcalendar(SessionCalendar())
+    cerebro.addstrategy(strategy, **params)
+
+    for data_feed in prepare_polars_data_feeds(bars, timeframe=timeframe, sort=False):
         cerebro.adddata(data_feed)
 
-    # Set broker parameters
     cerebro.broker.setcash(cash)
     cerebro.broker.setcommission(commission=commission)
 
-    # Add analyzers
     cerebro.addanalyzer(bt.analyzers.SharpeRatio, _name="sharpe")
+    cerebro.addanalyzer(bt.analyzers.DrawDown, _name="drawdown")
+    cerebro.addanalyzer(bt.analyzers.Returns, _name="returns")
+    if record_equity:
+        cerebro.addanalyzer(EquityCurve, _name="equity")
 
-    logger.debug("\n" + "=" * 50)
-    logger.debug("Running optimization...")
-    logger.debug("=" * 50)
-    results = cerebro.run()
+    strat = cerebro.run()[0]
+    returns_analysis = strat.analyzers.returns.get_analysis()
+
+    result = {
+        **params,
+        "sharpe": strat.analyzers.sharpe.get_analysis().get("sharperatio"),
+        "max_drawdown": strat.analyzers.drawdown.get_analysis()["max"]["drawdown"],
+        "total_return": returns_analysis["rtot"],
+        "annual_return": returns_analysis.get("rnorm100"),
+        "final_value": cerebro.broker.getvalue(),
+    }
+    if record_equity:
+        result["equity"] = strat.analyzers.equity.get_analysis()
+    return result
+
+
+@contextmanager
+def shared_bars_pool(data: pl.DataFrame, max_workers: int | None = None):
+    """
+    Process pool whose workers share one memory-mapped copy of `data`.
 
-    logger.debug("\n=== Optimization Results ===")
-    for result in results:
-        strat = result[0]
-        sharpe = strat.analyzers.sharpe.get_analysis().get("sharperatio", None)
+    The bars are written once to an uncompressed Arrow IPC file sorted by
+    (symbol, timestamp) and every worker memory-maps it in its initializer, so
+    the pages are shared through the OS page cache instead of being pickled to
+    every task. Submit `_run_sweep_point` tasks to the yielded executor.
 
-        # Iterate through all parameters
-        param_str = ", ".join(
-            f"{key}: {value}" for key, value in strat.params._getitems()
-        )
-        for param in strat.params._getitems():
-            param_str = f"{param[0]}={param[1]}"
-            logger.debug(f"{param_str}, Sharpe: {sharpe}")
+    Workers are started with the "spawn" method because forking a process that
+    has already started Polars' thread pool can deadlock, so scripts using this
+    need an `if __name__ == "__main__":` guard.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_path = str(Path(tmp_dir) / "bars.arrow")
+        data.sort(["symbol", "timestamp"]).rechunk().write_ipc(data_path)
+
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_sweep_worker,
+            initargs=(data_path,),
+        ) as executor:
+            yield executor
+
+
+def optimize_strategy(
+    data: pl.DataFrame,
+    strategy: type[bt.Strategy],
+    param_grid: dict[str, Iterable],
+    timeframe: bt.TimeFrame = bt.TimeFrame.Days,
+    cash=10_0000,
+    commission=0.001,
+    max_workers: int | None = None,
+) -> pl.DataFrame:
+    """
+    Sweep strategy parameters over a grid in parallel.
+
+    The bars are shared with the workers through `shared_bars_pool`. Each grid
+    point runs as its own Cerebro in the process pool and results are collected
+    as they complete. Scripts calling this need an `if __name__ == "__main__":`
+    guard because the workers are spawned.
+
+    Args:
+        data: Long-format Polars DataFrame of bars
+        strategy: Backtrader Strategy class (must be importable by the workers)
+        param_grid: Mapping of parameter name to the values to try, e.g.
+                    {"rebalance_hours": [1, 5], "z_threshold": [0.25, 0.5]}
+        timeframe: Backtrader timeframe (default: Days)
+        cash: Starting capital
+        commission: Commission rate (0.001 = 0.1%) or 1 basis point (bps)
+        max_workers: Number of worker processes (default: CPU count)
+
+    Returns:
+        DataFrame with one row per grid point: the parameters followed by
+        `sharpe`, `max_drawdown`, `total_return`, `annual_return`, `final_value`
+    """
+    names = list(param_grid)
+    grid = [dict(zip(names, values)) for values in product(*param_grid.values())]
+    logger.info(f"Running optimization over {len(grid)} parameter sets...")
+
+    rows = []
+    with shared_bars_pool(data, max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(
+                _run_sweep_point, strategy, params, timeframe, cash, commission
+            )
+            for params in grid
+        ]
+        for i, future in enumerate(as_completed(futures), start=1):
+            result = future.result()
+            rows.append(result)
+            param_str = ", ".join(f"{key}={result[key]}" for key in names)
+            logger.debug(f"[{i}/{len(grid)}] {param_str}, Sharpe: {result['sharpe']}")
 
-    return results
+    return pl.DataFrame(rows).sort(names)
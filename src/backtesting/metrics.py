@@ -0,0 +1,114 @@
+import math
+
+import numpy as np
+
+# Periods per year used to annualize returns, matching bt.analyzers.Returns
+PERIODS_PER_YEAR = {"days": 252.0, "weeks": 52.0, "months": 12.0, "years": 1.0}
+
+
+def annual_returns(
+    equity: np.ndarray, timestamps: np.ndarray, start_value: float
+) -> dict[int, float]:
+    """
+    Calendar-year returns of an equity curve.
+
+    Each year's return is measured from the last value of the previous year (or
+    `start_value` for the first year) to the year's last value, like
+    `bt.analyzers.TimeReturn` with `timeframe=bt.TimeFrame.Years`.
+
+    Args:
+        equity: Portfolio value at each bar
+        timestamps: Bar timestamps as numpy datetime64 values
+        start_value: Portfolio value before the first bar
+
+    Returns:
+        Dictionary mapping year to return
+    """
+    years = np.asarray(timestamps).astype("datetime64[Y]").astype(int) + 1970
+    last_idx = np.flatnonzero(np.append(years[1:] != years[:-1], True))
+
+    returns = {}
+    value_start = start_value
+    for idx in last_idx:
+        returns[int(years[idx])] = equity[idx] / value_start - 1.0
+        value_start = equity[idx]
+    return returns
+
+
+def sharpe_ratio(
+    equity: np.ndarray,
+    timestamps: np.ndarray,
+    start_value: float,
+    riskfree_rate: float = 0.01,
+) -> float | None:
+    """
+    Sharpe ratio of calendar-year returns, matching the defaults of
+    `bt.analyzers.SharpeRatio` (yearly returns, population standard deviation,
+    no annualization).
+
+    Returns:
+        Sharpe ratio, or None if it is undefined (fewer than two distinct years)
+    """
+    returns = np.array(list(annual_returns(equity, timestamps, start_value).values()))
+    if len(returns) == 0:
+        return None
+
+    excess = returns - riskfree_rate
+    deviation = excess.std()
+    if deviation == 0 or not np.isfinite(deviation):
+        return None
+    return float(excess.mean() / deviation)
+
+
+def drawdown(equity: np.ndarray, start_value: float | None = None) -> np.ndarray:
+    """
+    Drawdown from the running peak at each bar, in percent; the peak starts at
+    `start_value` when given, so a loss on the first bar counts
+    """
+    peak = np.maximum.accumulate(equity)
+    if start_value is not None:
+        peak = np.maximum(peak, start_value)
+    return 100.0 * (peak - equity) / peak
+
+
+def max_drawdown(equity: np.ndarray, start_value: float | None = None) -> float:
+    """Maximum drawdown in percent, like `bt.analyzers.DrawDown`'s `max.drawdown`"""
+    return float(drawdown(equity, start_value).max()) if len(equity) else 0.0
+
+
+def total_return(equity: np.ndarray, start_value: float) -> float:
+    """Total log return, like `bt.analyzers.Returns`'s `rtot`"""
+    return math.log(equity[-1] / start_value)
+
+
+def annualized_return(
+    equity: np.ndarray, start_value: float, periods_per_year: float = 252.0
+) -> float:
+    """Annualized return from the average log return, like `Returns`'s `rnorm`"""
+    return math.expm1(
+        total_return(equity, start_value) / len(equity) * periods_per_year
+    )
+
+
+def performance_summary(
+    equity: np.ndarray,
+    timestamps: np.ndarray,
+    start_value: float,
+    periods_per_year: float = 252.0,
+    riskfree_rate: float = 0.01,
+) -> dict:
+    """
+    Summary statistics with the same keys `run_backtest` reports.
+
+    Returns:
+        Dictionary with `sharperatio`, `max_drawdown` (percent), `rtot`, `rnorm`
+        and `rnorm100`
+    """
+    rnorm = annualized_return(equity, start_value, periods_per_year)
+    return {
+        "sharperatio": sharpe_ratio(equity, timestamps, start_value, riskfree_rate),
+        "max_drawdown": max_drawdown(equity, start_value),
+        "rtot": total_return(equity, start_value),
+        "rnorm": rnorm,
+        "rnorm100": rnorm * 100.0,
+    }
@@ -0,0 +1,133 @@
+from collections.abc import Callable
+
+import numpy as np
+import polars as pl
+
+from backtesting.metrics import performance_summary
+from logger.logging import get_logger
+
+logger = get_logger(__name__)  # Creates 'backtesting.vectorized'
+
+
+def price_matrix(
+    df: pl.DataFrame,
+    field: str = "close",
+    timestamp_col: str = "timestamp",
+    symbol_col: str = "symbol",
+) -> tuple[np.ndarray, list[str], np.ndarray]:
+    """
+    Pivot a long-format bar frame into a (time × symbol) matrix.
+
+    Args:
+        df: Long-format bars with symbol, timestamp and `field` columns
+        field: Column to pivot (default: close)
+        timestamp_col: Name of the timestamp column
+        symbol_col: Name of the symbol column
+
+    Returns:
+        Tuple of (timestamps, symbols, matrix); missing bars are NaN
+    """
+    wide = df.pivot(
+        on=symbol_col, index=timestamp_col, values=field, sort_columns=True
+    ).sort(timestamp_col)
+
+    symbols = [col for col in wide.columns if col != timestamp_col]
+    timestamps = wide[timestamp_col].dt.replace_time_zone(None).to_numpy()
+    matrix = wide.select(symbols).to_numpy().astype(np.float64)
+    return timestamps, symbols, matrix
+
+
+def run_vectorized_backtest(
+    prices: np.ndarray,
+    weights_fn: Callable[[np.ndarray], np.ndarray],
+    timestamps: np.ndarray | None = None,
+    symbols: list[str] | None = None,
+    cash: float = 10_0000,
+    commission: float = 0.001,
+    periods_per_year: float = 252.0,
+) -> dict:
+    """
+    Backtest a cross-sectional strategy on a (time × symbol) price matrix.
+
+    `weights_fn` receives the whole price matrix and returns target portfolio
+    weights of the same shape, where row t may only use prices up to bar t. The
+    weights chosen at the close of bar t are held over bar t+1, drift with
+    prices, and are rebalanced back to the next target at the following close.
+    Commission is charged on traded value, like `broker.setcommission`.
+
+    Args:
+        prices: (T, N) matrix of prices, NaN where a symbol has no bar
+        weights_fn: Function mapping the price matrix to (T, N) target weights
+        timestamps: Bar timestamps as numpy datetime64 values, used for the
+                    yearly Sharpe ratio (default: daily bars from 1970-01-01)
+        symbols: Column labels for the result (default: integer positions)
+        cash: Starting capital
+        commission: Commission rate (0.001 = 0.1%) or 1 basis point (bps)
+        periods_per_year: Bars per year used to annualize returns
+
+    Returns:
+        Dictionary with time series `equity`, `returns`, `turnover`,
+        `commission`, the (T, N) `weights` and `positions` (in shares), and the
+        `summary` from `performance_summary`
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    n_bars, n_symbols = prices.shape
+    if timestamps is None:
+        timestamps = np.arange(n_bars).astype("datetime64[D]")
+    if symbols is None:
+        symbols = [str(i) for i in range(n_symbols)]
+
+    # Symbols can only be held on bars where they have a price
+    has_price = np.isfinite(prices) & (prices > 0)
+    weights = np.asarray(weights_fn(prices), dtype=np.float64)
+    weights = np.where(has_price & np.isfinite(weights), weights, 0.0)
+
+    # Bar-over-bar simple returns; missing bars contribute nothing
+    asset_returns = np.zeros_like(prices)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        asset_returns[1:] = prices[1:] / prices[:-1] - 1.0
+    asset_returns[~np.isfinite(asset_returns)] = 0.0
+
+    # Returns earned over bar t by the weights set at the close of bar t-1
+    gross_returns = np.zeros(n_bars)
+    gross_returns[1:] = np.einsum("tn,tn->t", weights[:-1], asset_returns[1:])
+
+    # Weights drift with prices until the next rebalance
+    drifted = np.zeros_like(weights)
+    drifted[1:] = (
+        weights[:-1] * (1.0 + asset_returns[1:]) / (1.0 + gross_returns[1:, None])
+    )
+    turnover = np.abs(weights - drifted).sum(axis=1)
+    costs = commission * turnover
+
+    equity = cash * np.cumprod((1.0 + gross_returns) * (1.0 - costs))
+    net_returns = np.empty(n_bars)
+    net_returns[0] = equity[0] / cash - 1.0
+    net_returns[1:] = equity[1:] / equity[:-1] - 1.0
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        positions = np.where(has_price, weights * equity[:, None] / prices, 0.0)
+
+    summary = performance_summary(
+        equity, timestamps, start_value=cash, periods_per_year=periods_per_year
+    )
+
+    logger.info(f"Vectorized backtest: {n_bars} bars x {n_symbols} symbols")
+    logger.info(f"Starting Portfolio Value: {cash:.2f}")
+    logger.info(f"Ending Portfolio Value: {equity[-1]:.2f}")
+    logger.info(f"Sharpe Ratio: {summary['sharperatio']}")
+    logger.info(f"Max Drawdown: {summary['max_drawdown']:.2f}%")
+    logger.info(f"Total Return: {summary['rtot'] * 100:.2f}%")
+    logger.info(f"Annual Return: {summary['rnorm100']}")
+
+    return {
+        "timestamps": timestamps,
+        "symbols": symbols,
+        "equity": equity,
+        "returns": net_returns,
+        "turnover": turnover,
+        "commission": costs * equity / (1.0 - costs),
+        "weights": weights,
+        "positions": positions,
+        "summary": summary,
+    }
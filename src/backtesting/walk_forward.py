@@ -0,0 +1,256 @@
+from collections.abc import Iterable
+from concurrent.futures import as_completed
+from datetime import datetime
+from itertools import product
+
+import backtrader as bt
+import numpy as np
+import polars as pl
+
+from backtesting.engine import _run_sweep_point, shared_bars_pool
+from logger.logging import get_logger
+
+logger = get_logger(__name__)  # Creates 'backtesting.walk_forward'
+
+
+def _offset(dt: datetime, by: str) -> datetime:
+    """Shift `dt` by a Polars duration string such as "1y", "6mo" or "2w"""
+    return pl.Series([dt]).dt.offset_by(by).item()
+
+
+def walk_forward_windows(
+    start: datetime,
+    end: datetime,
+    train_period: str,
+    test_period: str,
+    expanding: bool = False,
+) -> list[dict]:
+    """
+    Generate consecutive train/test windows covering [start, end).
+
+    Each test window starts where its train window ends, and successive windows
+    step forward by `test_period` so the test windows tile the history without
+    overlapping. Rolling windows keep a fixed `train_period`, while expanding
+    windows always train from `start`.
+
+    Args:
+        start: First timestamp of the history
+        end: End of the history (exclusive)
+        train_period: Length of the train window as a Polars duration ("2y")
+        test_period: Length of the test window as a Polars duration ("6mo")
+        expanding: If True, anchor every train window at `start`
+
+    Returns:
+        List of dictionaries with `train_start`, `train_end`, `test_start` and
+        `test_end`
+    """
+    windows = []
+    train_start = start
+    train_end = _offset(start, train_period)
+
+    while train_end < end:
+        test_end = min(_offset(train_end, test_period), end)
+        windows.append(
+            {
+                "train_start": train_start,
+                "train_end": train_end,
+                "test_start": train_end,
+                "test_end": test_end,
+            }
+        )
+        if not expanding:
+            train_start = _offset(train_start, test_period)
+        train_end = test_end
+
+    return windows
+
+
+def _score(result: dict, metric: str) -> float:
+    """Metric used to rank train results; undefined values rank last"""
+    value = result.get(metric)
+    return -np.inf if value is None or np.isnan(value) else value
+
+
+def walk_forward(
+    data: pl.DataFrame,
+    strategy: type[bt.Strategy],
+    param_grid: dict[str, Iterable],
+    train_period: str,
+    test_period: str,
+    expanding: bool = False,
+    metric: str = "sharpe",
+    timeframe: bt.TimeFrame = bt.TimeFrame.Days,
+    cash=10_0000,
+    commission=0.001,
+    max_workers: int | None = None,
+) -> dict:
+    """
+    Walk-forward optimization with out-of-sample evaluation.
+
+    Every parameter set is backtested on every train window, the best set by
+    `metric` is then backtested on the following test window, and the test
+    window returns are compounded into one out-of-sample equity curve.
+
+    All windows share one process pool and one memory-mapped copy of the bars
+    (see `shared_bars_pool`). Each worker cuts a window's slice once and reuses
+    it for every parameter set it runs on that window. Train runs for all
+    windows are submitted together, and each window's test run is submitted
+    as soon as its train runs are done.
+
+    Args:
+        data: Long-format Polars DataFrame of bars
+        strategy: Backtrader Strategy class (must be importable by the workers)
+        param_grid: Mapping of parameter name to the values to try
+        train_period: Length of the train window as a Polars duration ("2y")
+        test_period: Length of the test window as a Polars duration ("6mo")
+        expanding: If True, anchor every train window at the first bar
+        metric: Train result column to maximize (default: sharpe)
+        timeframe: Backtrader timeframe (default: Days)
+        cash: Starting capital of each window's backtest
+        commission: Commission rate (0.001 = 0.1%) or 1 basis point (bps)
+        max_workers: Number of worker processes (default: CPU count)
+
+    Returns:
+        Dictionary with `windows`, a DataFrame of window bounds, chosen
+        parameters, train score and test metrics, and `equity`, a DataFrame of
+        the stitched out-of-sample `timestamp`, `returns` and `equity`
+    """
+    names = list(param_grid)
+    grid = [dict(zip(names, values)) for values in product(*param_grid.values())]
+
+    timestamps = data["timestamp"]
+    windows = walk_forward_windows(
+        timestamps.min(),
+        _offset(timestamps.max(), "1us"),
+        train_period=train_period,
+        test_period=test_period,
+        expanding=expanding,
+    )
+    if not windows:
+        raise ValueError(f"History is shorter than the train period {train_period!r}")
+
+    # Windows falling in a gap of the data have nothing to train or test on
+    def has_bars(window_start: datetime, window_end: datetime) -> bool:
+        return timestamps.is_between(window_start, window_end, closed="left").any()
+
+    for i, window in enumerate(windows):
+        window["window"] = i
+    skipped = [
+        window["window"]
+        for window in windows
+        if not has_bars(window["train_start"], window["train_end"])
+        or not has_bars(window["test_start"], window["test_end"])
+    ]
+    if skipped:
+        logger.warning(f"Skipping walk-forward windows {skipped} without bars")
+    windows = [window for window in windows if window["window"] not in skipped]
+    if not windows:
+        raise ValueError("No walk-forward window has bars to train and test on")
+    logger.info(
+        f"Walk-forward over {len(windows)} windows x {len(grid)} parameter sets..."
+    )
+
+    train_results = {i: [] for i in range(len(windows))}
+    test_results = {}
+
+    with shared_bars_pool(data, max_workers=max_workers) as executor:
+        train_futures = {}
+        for i, window in enumerate(windows):
+            for params in grid:
+                future = executor.submit(
+                    _run_sweep_point,
+                    strategy,
+                    params,
+                    timeframe,
+                    cash,
+                    commission,
+                    start=window["train_start"],
+                    end=window["train_end"],
+                )
+                train_futures[future] = i
+
+        test_futures = {}
+        for future in as_completed(train_futures):
+            i = train_futures[future]
+            train_results[i].append(future.result())
+            if len(train_results[i]) < len(grid):
+                continue
+
+            # All train runs of this window are done: evaluate the best set
+            best = max(train_results[i], key=lambda result: _score(result, metric))
+            window = windows[i]
+            window["params"] = {key: best[key] for key in names}
+            window["train_score"] = best[metric]
+            logger.debug(
+                f"Window {i}: best {window['params']}, {metric}={best[metric]}"
+            )
+
+            test_future = executor.submit(
+                _run_sweep_point,
+                strategy,
+                window["params"],
+                timeframe,
+                cash,
+                commission,
+                start=window["test_start"],
+                end=window["test_end"],
+                record_equity=True,
+            )
+            test_futures[test_future] = i
+
+        for future in as_completed(test_futures):
+            test_results[test_futures[future]] = future.result()
+
+    # Stitch the test windows: each starts from `cash`, so chain their returns
+    window_rows = []
+    curves = []
+    for i, window in enumerate(windows):
+        result = test_results[i]
+        if result["equity"]:
+            epoch_us, values = map(np.array, zip(*result["equity"]))
+            previous = np.append(cash, values[:-1])
+            curves.append(
+                pl.DataFrame({"timestamp": epoch_us, "returns": values / previous - 1})
+            )
+
+        window_rows.append(
+            {
+                "window": window["window"],
+                "train_start": window["train_start"],
+                "train_end": window["train_end"],
+                "test_start": window["test_start"],
+                "test_end": window["test_end"],
+                **window["params"],
+                f"train_{metric}": window["train_score"],
+                **{
+                    f"test_{key}": result[key]
+                    for key in (
+                        "sharpe",
+                        "max_drawdown",
+                        "total_return",
+                        "annual_return",
+                    )
+                },
+            }
+        )
+
+    # Backtrader clocks are UTC; restore the timezone of the input bars
+    out_timestamp = pl.from_epoch("timestamp", time_unit="us")
+    time_zone = timestamps.dtype.time_zone
+    if time_zone is not None:
+        out_timestamp = out_timestamp.dt.replace_time_zone("UTC").dt.convert_time_zone(
+            time_zone
+        )
+
+    # Windows without bars record no equity, so there may be no curve at all
+    returns = (
+        pl.concat(curves)
+        if curves
+        else pl.DataFrame(schema={"timestamp": pl.Int64, "returns": pl.Float64})
+    )
+    equity = returns.sort("timestamp").with_columns(
+        out_timestamp.dt.cast_time_unit(timestamps.dtype.time_unit),
+        (cash * (1.0 + pl.col("returns")).cum_prod()).alias("equity"),
+    )
+
+    return {"windows": pl.DataFrame(window_rows), "equity": equity}
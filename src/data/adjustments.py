@@ -0,0 +1,359 @@
+import os
+import uuid
+from datetime import date
+from pathlib import Path
+
+import polars as pl
+
+from data.market_calendar import SESSION_TIMEZONE, attach_sessions
+from logger.logging import get_logger
+
+logger = get_logger(__name__)  # Creates 'data.adjustments'
+
+ACTION_SCHEMA = {
+    "symbol": pl.String,
+    "ex_date": pl.Date,
+    "split_ratio": pl.Float64,  # new shares per old share, e.g. 4.0 for a 4:1 split
+    "dividend": pl.Float64,  # cash per share
+}
+ADJUSTMENT_MODES = ["raw", "split", "all"]
+# Start of the first factor interval of every symbol, so bars stored or
+# backfilled after the actions were recorded are still adjusted
+OPEN_START = date.min
+PRICE_COLUMNS = ["open", "high", "low", "close", "vwap"]
+
+
+def compute_factors(
+    actions: pl.DataFrame,
+    bars: pl.LazyFrame,
+    timestamp_col: str = "timestamp",
+    symbol_col: str = "symbol",
+) -> pl.DataFrame:
+    """
+    Cumulative backward adjustment factors from a corporate actions table.
+
+    Each ex-date contributes a split factor `1 / split_ratio` and a dividend
+    factor `1 - dividend / close`, where `close` is the last regular-session raw
+    close before the ex-date (the CRSP convention also used by Alpaca's
+    `adjustment='all'`). Bars dated before an ex-date are multiplied by the
+    product of the factors of every later ex-date, computed with one reversed
+    cumulative product per symbol.
+
+    Parameters:
+    -----------
+    actions : pl.DataFrame
+        Corporate actions with the `ACTION_SCHEMA` columns
+    bars : pl.LazyFrame
+        Raw bars of the symbols in `actions`, with at least the close
+    timestamp_col : str
+        Name of the timestamp column (default: "timestamp")
+    symbol_col : str
+        Name of the symbol column (default: "symbol")
+
+    Returns:
+    --------
+    pl.DataFrame
+        One row per (symbol, interval) with the dates `start` (inclusive) and
+        `end` (the ex-date, exclusive) and the `split_factor` and
+        `dividend_factor` applying to bars dated in that interval. The first
+        interval of each symbol starts at `OPEN_START`, so it covers every
+        earlier bar whether or not it is stored yet. `missing_close` flags the
+        dividends at `end` that had no close yet and were left out (factor 1)
+    """
+    actions = (
+        actions.group_by("symbol", "ex_date")
+        .agg(
+            pl.col("split_ratio").fill_null(1.0).product(),
+            pl.col("dividend").fill_null(0.0).sum(),
+        )
+        .sort("symbol", "ex_date")
+        .with_columns(
+            # Ex-dates start at local midnight; earlier bars are adjusted
+            pl.col("ex_date")
+            .cast(pl.Datetime("us"))
+            .dt.replace_time_zone(SESSION_TIMEZONE)
+            .dt.convert_time_zone("UTC")
+            .alias("_ex_ts")
+        )
+    )
+
+    # Last regular-session close before each ex-date
+    closes = (
+        attach_sessions(
+            bars.filter(
+                pl.col(symbol_col).is_in(actions["symbol"].unique().implode())
+            ).select(
+                pl.col(symbol_col).alias("symbol"),
+                pl.col(timestamp_col)
+                .dt.convert_time_zone("UTC")
+                .dt.cast_time_unit("us")
+                .alias("_ts"),
+                "close",
+            ),
+            "_ts",
+        )
+        .select("symbol", "_ts", "close")
+        .sort("_ts")
+        .collect()
+    )
+    factors = (
+        actions.sort("_ex_ts")
+        .join_asof(
+            closes,
+            left_on="_ex_ts",
+            right_on="_ts",
+            by="symbol",
+            strategy="backward",
+            allow_exact_matches=False,
+            check_sortedness=False,
+        )
+        .sort("symbol", "ex_date")
+    )
+
+    missing = factors.filter((pl.col("dividend") > 0) & pl.col("close").is_null())
+    if not missing.is_empty():
+        logger.warning(
+            f"No close before {missing.height} dividend ex-dates, e.g. "
+            f"{missing.row(0, named=True)['symbol']}; those dividends are ignored "
+            f"until a close before them is stored"
+        )
+
+    return (
+        factors.with_columns(
+            (1.0 / pl.col("split_ratio")).alias("_split"),
+            (1.0 - pl.col("dividend") / pl.col("close")).fill_null(1.0).alias("_div"),
+        )
+        .with_columns(
+            pl.col("_split")
+            .cum_prod(reverse=True)
+            .over("symbol")
+            .alias("split_factor"),
+            pl.col("_div")
+            .cum_prod(reverse=True)
+            .over("symbol")
+            .alias("dividend_factor"),
+            pl.col("ex_date")
+            .shift(1)
+            .over("symbol")
+            .fill_null(OPEN_START)
+            .alias("start"),
+        )
+        .select(
+            "symbol",
+            "start",
+            pl.col("ex_date").alias("end"),
+            "split_factor",
+            "dividend_factor",
+            ((pl.col("dividend") > 0) & pl.col("close").is_null()).alias(
+                "missing_close"
+            ),
+        )
+    )
+
+
+class CorporateActions:
+    """
+    Splits/dividends table and the cumulative adjustment factors derived from it,
+    kept next to a store of raw bars.
+
+    Bars are stored unadjusted and never rewritten: adjusted prices are produced
+    on read by `adjust`, a per-(symbol, date) factor lookup followed by a
+    vectorized multiply. Adding an action only rebuilds the small factor table
+    of the affected symbols.
+    """
+
+    def __init__(
+        self,
+        root: str | Path,
+        timestamp_col: str = "timestamp",
+        symbol_col: str = "symbol",
+    ):
+        self.root = Path(root)
+        self.timestamp_col = timestamp_col
+        self.symbol_col = symbol_col
+        self.actions_path = self.root / "actions.parquet"
+        self.factors_path = self.root / "factors.parquet"
+
+    def actions(self) -> pl.DataFrame:
+        """Stored corporate actions"""
+        if not self.actions_path.exists():
+            return pl.DataFrame(schema=ACTION_SCHEMA)
+        return pl.read_parquet(self.actions_path)
+
+    def factors(self) -> pl.DataFrame:
+        """Stored adjustment factor intervals (see `compute_factors`)"""
+        if not self.factors_path.exists():
+            return pl.DataFrame(
+                schema={
+                    "symbol": pl.String,
+                    "start": pl.Date,
+                    "end": pl.Date,
+                    "split_factor": pl.Float64,
+                    "dividend_factor": pl.Float64,
+                    "missing_close": pl.Boolean,
+                }
+            )
+        return pl.read_parquet(self.factors_path)
+
+    def pending(self, bars: pl.DataFrame) -> list[str]:
+        """
+        Symbols whose factors should be rebuilt once `bars` are stored: those
+        with a dividend that had no close before its ex-date, when `bars` hold
+        an earlier bar that can now provide it.
+        """
+        factors = self.factors()
+        if "missing_close" not in factors.columns:
+            return []
+        first_dates = bars.group_by(self.symbol_col).agg(
+            pl.col(self.timestamp_col)
+            .min()
+            .dt.convert_time_zone(SESSION_TIMEZONE)
+            .dt.date()
+            .alias("_first_date")
+        )
+        return (
+            factors.filter("missing_close")
+            .join(first_dates, left_on="symbol", right_on=self.symbol_col)
+            .filter(pl.col("_first_date") < pl.col("end"))["symbol"]
+            .unique()
+            .sort()
+            .to_list()
+        )
+
+    def update(self, actions: pl.DataFrame, bars: pl.LazyFrame) -> pl.DataFrame:
+        """
+        Merge new corporate actions and rebuild the factors of their symbols.
+
+        Actions replace stored ones with the same (symbol, ex_date), so
+        re-adding a table is idempotent.
+
+        Args:
+            actions: Corporate actions with the `ACTION_SCHEMA` columns
+            bars: Lazy scan of the raw bars, used for the closes before
+                  dividend ex-dates
+
+        Returns:
+            The rebuilt factor rows of the affected symbols
+        """
+        actions = actions.select(
+            [pl.col(name).cast(dtype) for name, dtype in ACTION_SCHEMA.items()]
+        )
+        merged = (
+            pl.concat([self.actions(), actions])
+            .unique(subset=["symbol", "ex_date"], keep="last", maintain_order=True)
+            .sort("symbol", "ex_date")
+        )
+        symbols = actions["symbol"].unique()
+
+        rebuilt = compute_factors(
+            merged.filter(pl.col("symbol").is_in(symbols.implode())),
+            bars,
+            timestamp_col=self.timestamp_col,
+            symbol_col=self.symbol_col,
+        )
+        factors = pl.concat(
+            [self.factors().filter(~pl.col("symbol").is_in(symbols.implode())), rebuilt]
+        ).sort("symbol", "start")
+
+        self._write_atomic(merged, self.actions_path)
+        self._write_atomic(factors, self.factors_path)
+        logger.info(f"Rebuilt adjustment factors for {len(symbols)} symbols")
+        return rebuilt
+
+    def _write_atomic(self, df: pl.DataFrame, path: Path) -> None:
+        """Write `df` next to `path` and rename it into place"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            df.write_parquet(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    def adjust(self, lf: pl.LazyFrame, mode: str = "all") -> pl.LazyFrame:
+        """
+        Lazily adjust raw bars for corporate actions.
+
+        The factor intervals are expanded to one row per (symbol, date) and
+        equi-joined on the bar's local session date, and the open first
+        interval of each symbol is equi-joined on the symbol, so the plan needs
+        no sort and streams. Prices are multiplied by the price factor and volumes
+        divided by the split factor; bars after the last ex-date, and symbols
+        without actions, are unchanged.
+
+        Args:
+            lf: Raw bars
+            mode: 'split' for split-only adjustment, 'all' for splits and
+                  dividends, or 'raw' to return `lf` unchanged
+
+        Returns:
+            Adjusted bars with the same columns as `lf`
+        """
+        if mode not in ADJUSTMENT_MODES:
+            raise ValueError(f"mode must be one of {ADJUSTMENT_MODES}, got {mode!r}")
+        if mode == "raw" or not self.factors_path.exists():
+            return lf
+
+        price_factor = pl.col("split_factor")
+        if mode == "all":
+            price_factor = price_factor * pl.col("dividend_factor")
+
+        intervals = pl.scan_parquet(self.factors_path).select(
+            pl.col("symbol").alias(self.symbol_col),
+            "start",
+            "end",
+            price_factor.alias("_price_factor"),
+            (1.0 / pl.col("split_factor")).alias("_volume_factor"),
+        )
+        daily = (
+            intervals.filter(pl.col("start") > OPEN_START)
+            .with_columns(pl.date_ranges("start", "end", closed="left").alias("_date"))
+            .explode("_date")
+            .drop("start", "end")
+        )
+        # The open first interval is joined on the symbol alone
+        first = intervals.filter(pl.col("start") == OPEN_START).select(
+            self.symbol_col,
+            pl.col("end").alias("_first_end"),
+            pl.col("_price_factor").alias("_first_price_factor"),
+            pl.col("_volume_factor").alias("_first_volume_factor"),
+        )
+
+        def factor(name: str) -> pl.Expr:
+            return pl.coalesce(
+                pl.col(f"_{name}"),
+                pl.when(pl.col("_date") < pl.col("_first_end")).then(
+                    pl.col(f"_first_{name}")
+                ),
+                pl.lit(1.0),
+            )
+
+        columns = lf.collect_schema().names()
+        return (
+            lf.with_columns(
+                pl.col(self.timestamp_col)
+                .dt.convert_time_zone(SESSION_TIMEZONE)
+                .dt.date()
+                .alias("_date")
+            )
+            .join(
+                daily,
+                on=[self.symbol_col, "_date"],
+                how="left",
+                maintain_order="left",
+            )
+            .join(first, on=self.symbol_col, how="left", maintain_order="left")
+            .with_columns(
+                *[
+                    pl.col(c) * factor("price_factor")
+                    for c in PRICE_COLUMNS
+                    if c in columns
+                ],
+                *[
+                    pl.col(c) * factor("volume_factor")
+                    for c in ["volume"]
+                    if c in columns
+                ],
+            )
+            .select(columns)
+        )
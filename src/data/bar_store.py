@@ -0,0 +1,396 @@
+import os
+import uuid
+from datetime import date, datetime
+from pathlib import Path
+from urllib.parse import quote, unquote
+
+import polars as pl
+import pyarrow.parquet as pq
+
+from data.adjustments import CorporateActions
+from data.load_data import _to_datetime_bound, load_bars, scan_bars
+from logger.logging import get_logger
+
+logger = get_logger(__name__)  # Creates 'data.bar_store'
+
+PARTITION_FILE = "data.parquet"
+EMPTY_RANGES_FILE = "_empty_ranges.parquet"
+
+
+class BarStore:
+    """
+    Hive-partitioned on-disk store of raw bars laid out as
+    `<root>/symbol=<symbol>/year=<year>/data.parquet`.
+
+    Each partition file holds one symbol-year sorted by timestamp, so the parquet
+    row-group statistics on `timestamp` let the reader skip row groups outside a
+    query's date range. The `symbol` and `year` columns live in the directory
+    names only and are restored by Polars' hive partitioning on read.
+
+    Appends merge new rows into the affected partitions and swap each file in
+    with an atomic rename, so readers never observe a half-written partition.
+    Every append rewrites the partitions it touches, so writers should batch the
+    rows of a partition into one append (as `download_bars` does). The store
+    assumes a single writer at a time.
+    """
+
+    def __init__(
+        self,
+        root: str | Path,
+        timestamp_col: str = "timestamp",
+        symbol_col: str = "symbol",
+        row_group_size: int = 50_000,
+    ):
+        self.root = Path(root)
+        self.timestamp_col = timestamp_col
+        self.symbol_col = symbol_col
+        self.row_group_size = row_group_size
+        # Splits/dividends and their adjustment factors; bars stay raw on disk
+        self.actions = CorporateActions(
+            self.root / "_corporate_actions",
+            timestamp_col=timestamp_col,
+            symbol_col=symbol_col,
+        )
+
+    def partition_path(self, symbol: str, year: int) -> Path:
+        """Path of the parquet file holding `symbol` bars for `year`"""
+        # Percent-encode symbols such as "SOL/USD" so they map to one directory
+        return (
+            self.root
+            / f"{self.symbol_col}={quote(symbol, safe='')}"
+            / f"year={year}"
+            / PARTITION_FILE
+        )
+
+    def symbols(self) -> list[str]:
+        """Symbols that have at least one partition in the store"""
+        prefix = f"{self.symbol_col}="
+        if not self.root.exists():
+            return []
+        return sorted(
+            unquote(path.name[len(prefix) :])
+            for path in self.root.iterdir()
+            if path.is_dir() and path.name.startswith(prefix)
+        )
+
+    def years(self, symbol: str) -> list[int]:
+        """Years stored for `symbol`"""
+        symbol_dir = self.partition_path(symbol, 0).parent.parent
+        if not symbol_dir.exists():
+            return []
+        return sorted(
+            int(path.name.removeprefix("year="))
+            for path in symbol_dir.iterdir()
+            if path.name.startswith("year=") and (path / PARTITION_FILE).exists()
+        )
+
+    def partitions(
+        self,
+        symbols: list[str] | None = None,
+        start: str | date | datetime | None = None,
+        end: str | date | datetime | None = None,
+        timezone: str = "UTC",
+    ) -> list[Path]:
+        """
+        List the partition files a query over `symbols` and [start, end) touches.
+
+        Partitions are keyed by the UTC year of the timestamp, so naive bounds are
+        converted from `timezone` to UTC before selecting years.
+        """
+        utc = pl.Datetime("us", "UTC")
+        start_year = (
+            _to_datetime_bound(start, utc, timezone).year if start is not None else None
+        )
+        end_year = (
+            _to_datetime_bound(end, utc, timezone).year if end is not None else None
+        )
+
+        paths = []
+        for symbol in self.symbols() if symbols is None else symbols:
+            for year in self.years(symbol):
+                if start_year is not None and year < start_year:
+                    continue
+                if end_year is not None and year > end_year:
+                    continue
+                paths.append(self.partition_path(symbol, year))
+        return paths
+
+    def coverage(self, symbols: list[str] | None = None) -> pl.DataFrame:
+        """
+        First/last timestamp and row count of every partition, read from the
+        parquet footers without touching the data pages.
+
+        Args:
+            symbols: Symbols to inspect (default: all symbols)
+
+        Returns:
+            DataFrame with `symbol`, `year`, `rows`, `start` and `end` (UTC),
+            sorted by symbol and year
+        """
+        rows = []
+        for symbol in self.symbols() if symbols is None else symbols:
+            for year in self.years(symbol):
+                metadata = pq.read_metadata(self.partition_path(symbol, year))
+                column = metadata.schema.names.index(self.timestamp_col)
+                stats = [
+                    metadata.row_group(i).column(column).statistics
+                    for i in range(metadata.num_row_groups)
+                ]
+                if not stats or any(s is None or not s.has_min_max for s in stats):
+                    continue
+                rows.append(
+                    {
+                        "symbol": symbol,
+                        "year": year,
+                        "rows": metadata.num_rows,
+                        "start": min(s.min for s in stats),
+                        "end": max(s.max for s in stats),
+                    }
+                )
+
+        utc = pl.Datetime("us", "UTC")
+        return pl.DataFrame(
+            rows,
+            schema={
+                "symbol": pl.String,
+                "year": pl.Int32,
+                "rows": pl.Int64,
+                "start": utc,
+                "end": utc,
+            },
+        )
+
+    def append(self, df: pl.DataFrame) -> list[Path]:
+        """
+        Merge new bars into the store.
+
+        Rows are grouped by (symbol, UTC year) and merged with the existing
+        partition. Rows that share a timestamp with stored rows replace them, so
+        re-appending the same data is idempotent. Dividends recorded before any
+        close preceding them was stored get their factors rebuilt once such a
+        close is appended.
+
+        Args:
+            df: Long-format bars with symbol and timestamp columns
+
+        Returns:
+            List of partition files that were written
+        """
+        if df.is_empty():
+            return []
+
+        df = df.with_columns(
+            pl.col(self.timestamp_col)
+            .dt.convert_time_zone("UTC")
+            .dt.year()
+            .alias("_year")
+        )
+
+        written = []
+        for (symbol, year), part in df.group_by(
+            [self.symbol_col, "_year"], maintain_order=True
+        ):
+            path = self.partition_path(symbol, year)
+            part = part.drop([self.symbol_col, "_year"])
+
+            if path.exists():
+                part = pl.concat(
+                    [pl.read_parquet(path, hive_partitioning=False), part],
+                    how="diagonal_relaxed",
+                )
+
+            part = part.unique(
+                subset=self.timestamp_col, keep="last", maintain_order=True
+            ).sort(self.timestamp_col)
+
+            self._write_atomic(part, path)
+            written.append(path)
+
+        logger.info(f"Wrote {len(written)} partitions to {self.root}")
+
+        pending = self.actions.pending(df)
+        if pending:
+            self.update_actions(
+                self.actions.actions().filter(pl.col("symbol").is_in(pending))
+            )
+        return written
+
+    @property
+    def empty_ranges_path(self) -> Path:
+        return self.root / EMPTY_RANGES_FILE
+
+    def empty_ranges(self, symbols: list[str] | None = None) -> pl.DataFrame:
+        """
+        Ranges already requested from the data provider that returned no bars,
+        e.g. trading halts, as recorded by `record_empty`.
+
+        Args:
+            symbols: Symbols to keep (default: all symbols)
+
+        Returns:
+            DataFrame with `symbol`, `start` and `end` (UTC, end exclusive),
+            non-overlapping and sorted by symbol and start
+        """
+        utc = pl.Datetime("us", "UTC")
+        if not self.empty_ranges_path.exists():
+            return pl.DataFrame(schema={"symbol": pl.String, "start": utc, "end": utc})
+        ranges = pl.read_parquet(self.empty_ranges_path)
+        if symbols is not None:
+            ranges = ranges.filter(pl.col("symbol").is_in(symbols))
+        return ranges
+
+    def record_empty(self, ranges: pl.DataFrame) -> pl.DataFrame:
+        """
+        Remember requested ranges that returned no bars, so syncs do not ask for
+        them again. Overlapping and adjacent ranges of a symbol are merged.
+        Delete `empty_ranges_path` to have every gap requested again.
+
+        Args:
+            ranges: DataFrame with `symbol`, `start` and `end` (end exclusive)
+
+        Returns:
+            All recorded ranges after the merge
+        """
+        utc = pl.Datetime("us", "UTC")
+        ranges = pl.concat(
+            [
+                self.empty_ranges(),
+                ranges.select(
+                    pl.col("symbol").cast(pl.String),
+                    pl.col("start", "end").dt.convert_time_zone("UTC").cast(utc),
+                ),
+            ]
+        ).sort("symbol", "start")
+
+        # A range starts a new block unless it begins before the furthest end
+        # of the earlier ranges of its symbol
+        merged = (
+            ranges.with_columns(
+                (pl.col("start") > pl.col("end").cum_max().shift(1))
+                .fill_null(True)
+                .cum_sum()
+                .over("symbol")
+                .alias("_block")
+            )
+            .group_by("symbol", "_block", maintain_order=True)
+            .agg(pl.col("start").min(), pl.col("end").max())
+            .drop("_block")
+        )
+        self._write_atomic(merged, self.empty_ranges_path)
+        return merged
+
+    def _write_atomic(self, df: pl.DataFrame, path: Path) -> None:
+        """Write `df` next to `path` and rename it into place"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            df.write_parquet(
+                tmp_path, statistics=True, row_group_size=self.row_group_size
+            )
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    def update_actions(self, actions: pl.DataFrame) -> pl.DataFrame:
+        """
+        Record new splits/dividends and rebuild the adjustment factors of the
+        affected symbols from their stored raw closes. Actions of symbols
+        without stored bars are recorded too: their splits apply on read right
+        away and their dividends once bars before the ex-date are appended.
+
+        Args:
+            actions: Corporate actions with the `ACTION_SCHEMA` columns, e.g.
+                     from `download_data.fetch_corporate_actions`; the symbol
+                     column may also be named after this store's `symbol_col`
+
+        Returns:
+            The rebuilt factor rows
+        """
+        if self.symbol_col in actions.columns:
+            actions = actions.rename({self.symbol_col: "symbol"})
+        stored = self.symbols()
+        symbols = [s for s in actions["symbol"].unique().to_list() if s in stored]
+        bars = (
+            self.scan(symbols, columns=["close"])
+            if symbols
+            else pl.LazyFrame(
+                schema={
+                    self.symbol_col: pl.String,
+                    self.timestamp_col: pl.Datetime("us", "UTC"),
+                    "close": pl.Float64,
+                }
+            )
+        )
+        return self.actions.update(actions, bars)
+
+    def scan(
+        self,
+        symbols: list[str] | None = None,
+        start: str | date | datetime | None = None,
+        end: str | date | datetime | None = None,
+        columns: list[str] | None = None,
+        timezone: str = "UTC",
+        adjustment: str = "raw",
+    ) -> pl.LazyFrame:
+        """
+        Lazily scan bars, opening only the partitions the query needs.
+
+        Args:
+            symbols: Symbols to keep (default: all symbols)
+            start: Inclusive lower bound on the timestamp
+            end: Exclusive upper bound on the timestamp
+            columns: Bar columns to read besides symbol/timestamp
+            timezone: Timezone used to interpret naive `start`/`end` bounds
+            adjustment: 'raw', 'split' or 'all', applied on read from the
+                        stored adjustment factors (see `CorporateActions.adjust`)
+
+        Returns:
+            Lazy frame of bars with a `symbol` column
+        """
+        paths = self.partitions(symbols, start=start, end=end, timezone=timezone)
+        if not paths:
+            raise FileNotFoundError(f"No partitions in {self.root} match the query")
+
+        lf = pl.scan_parquet(
+            paths,
+            hive_partitioning=True,
+            hive_schema={self.symbol_col: pl.String, "year": pl.Int32},
+        ).drop("year")
+
+        lf = scan_bars(
+            lf,
+            start=start,
+            end=end,
+            columns=columns,
+            timestamp_col=self.timestamp_col,
+            symbol_col=self.symbol_col,
+            timezone=timezone,
+        )
+        return self.actions.adjust(lf, mode=adjustment)
+
+    def load(
+        self,
+        symbols: list[str] | None = None,
+        start: str | date | datetime | None = None,
+        end: str | date | datetime | None = None,
+        freq: str | None = None,
+        market_hours_only: bool = True,
+        timezone: str = "UTC",
+        clean: bool = False,
+        adjustment: str = "raw",
+    ) -> pl.LazyFrame:
+        """
+        Same as `load_bars` but reading from the partitions of this store, with
+        bars adjusted for corporate actions according to `adjustment`
+        """
+        return load_bars(
+            self.scan(
+                symbols, start=start, end=end, timezone=timezone, adjustment=adjustment
+            ),
+            freq=freq,
+            timestamp_col=self.timestamp_col,
+            symbol_col=self.symbol_col,
+            market_hours_only=market_hours_only,
+            timezone=timezone,
+            clean=clean,
+        )
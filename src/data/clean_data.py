@@ -0,0 +1,323 @@
+from datetime import timedelta
+
+import polars as pl
+
+PRICE_COLUMNS = ["open", "high", "low", "close", "vwap"]
+COUNT_COLUMNS = ["volume", "trade_count"]
+ISSUES = [
+    "duplicate",
+    "invalid",
+    "inconsistent_ohlc",
+    "outlier",
+    "zero_volume",
+    "filled",
+    "stale",
+    "halted",
+]
+FILL_POLICIES = ["forward", "drop", "none"]
+
+# Scale factor making the MAD a consistent estimator of a normal std
+MAD_TO_STD = 1.4826
+
+
+def flag_bars(
+    df: pl.DataFrame | pl.LazyFrame,
+    window: int = 31,
+    mad_threshold: float = 10.0,
+    min_mad: float = 1e-4,
+    fill: str = "forward",
+    max_fill: int | None = None,
+    stale_bars: int | None = 30,
+    halt_gap: timedelta | None = timedelta(minutes=30),
+    timestamp_col: str = "timestamp",
+    symbol_col: str = "symbol",
+) -> pl.LazyFrame:
+    """
+    Build a lazy plan that repairs raw bars and flags every issue it finds.
+
+    All symbols are processed together: the bars are sorted by (symbol,
+    timestamp) once and every per-symbol step is a window expression over the
+    symbol, so the plan has no Python-level loops. The steps, in order:
+
+    - duplicate: repeated (symbol, timestamp) rows are dropped, keeping the last
+      one received. The kept row counts how many copies were dropped
+    - invalid: non-finite or non-positive prices and negative volumes are nulled
+    - inconsistent_ohlc: high/low are widened to contain open and close
+    - outlier: prices further from the centred rolling median of log(close)
+      than `mad_threshold` robust per-bar volatilities (scaled MAD of one-bar
+      log returns) are clipped to that band. The centred median follows a split
+      or gap as soon as most of the window is past it, so level shifts are kept
+      while isolated bad ticks are clipped
+    - zero_volume: bars that printed no volume (flag only)
+    - filled: nulled prices are filled according to `fill`
+    - stale: the close has not changed for `stale_bars` consecutive bars
+    - halted: the bar follows a same-day gap longer than `halt_gap`
+
+    Parameters:
+    -----------
+    df : pl.DataFrame | pl.LazyFrame
+        Long-format raw bars
+    window : int
+        Bars in the centred rolling median/MAD window (default: 31)
+    mad_threshold : float
+        Clip prices beyond this many robust volatilities from the median
+        (default: 10.0)
+    min_mad : float
+        Floor on the MAD of log returns, so flat stretches are not clipped to a
+        zero-width band (default: 1e-4, i.e. 1bp)
+    fill : str
+        How to fill nulled prices: 'forward' carries the last close into the
+        missing prices and zeroes missing counts, 'drop' leaves them for
+        `clean_bars` to drop, 'none' leaves them null (default: 'forward')
+    max_fill : int | None
+        Longest run of consecutive bars forward-filled (default: no limit)
+    stale_bars : int | None
+        Run length of unchanged closes flagged as stale, None to disable
+        (default: 30)
+    halt_gap : timedelta | None
+        Same-day gap between bars flagged as a halt, None to disable
+        (default: 30 minutes)
+    timestamp_col : str
+        Name of the timestamp column (default: "timestamp")
+    symbol_col : str
+        Name of the symbol column (default: "symbol")
+
+    Returns:
+    --------
+    pl.LazyFrame
+        Repaired bars sorted by (symbol, timestamp) with one `issue_<name>`
+        column per entry of `ISSUES`
+    """
+    if fill not in FILL_POLICIES:
+        raise ValueError(f"fill must be one of {FILL_POLICIES}, got {fill!r}")
+
+    lf = df.lazy()
+    columns = lf.collect_schema().names()
+    prices = [c for c in PRICE_COLUMNS if c in columns]
+    counts = [c for c in COUNT_COLUMNS if c in columns]
+    ts = pl.col(timestamp_col)
+
+    def per_symbol(expr: pl.Expr) -> pl.Expr:
+        return expr.over(symbol_col)
+
+    # Duplicates: the stable sort keeps arrival order within a timestamp
+    lf = (
+        lf.sort([symbol_col, timestamp_col], maintain_order=True)
+        .with_columns(
+            (pl.len().over([symbol_col, timestamp_col]) - 1).alias("issue_duplicate")
+        )
+        .unique(subset=[symbol_col, timestamp_col], keep="last", maintain_order=True)
+    )
+
+    # Invalid values become nulls
+    valid_price = {c: (pl.col(c).is_finite() & (pl.col(c) > 0)) for c in prices}
+    valid_count = {c: (pl.col(c) >= 0) for c in counts}
+    valid = valid_price | valid_count
+    lf = lf.with_columns(
+        pl.any_horizontal([~expr.fill_null(False) for expr in valid.values()]).alias(
+            "issue_invalid"
+        ),
+        *[pl.when(expr).then(pl.col(c)).alias(c) for c, expr in valid.items()],
+    )
+
+    # High/low must contain open and close
+    ohlc = [pl.col(c) for c in ["open", "high", "low", "close"]]
+    lf = lf.with_columns(
+        (
+            (pl.col("high") < pl.max_horizontal(ohlc))
+            | (pl.col("low") > pl.min_horizontal(ohlc))
+        )
+        .fill_null(False)
+        .alias("issue_inconsistent_ohlc"),
+        pl.max_horizontal(ohlc).alias("high"),
+        pl.min_horizontal(ohlc).alias("low"),
+    )
+
+    # Outliers: band around the centred rolling median of log(close), scaled by
+    # the robust per-bar volatility (MAD of one-bar log returns)
+    rolling = {"window_size": window, "min_samples": window // 2 + 1, "center": True}
+    log_close = pl.col("close").log()
+    lf = lf.with_columns(
+        per_symbol(log_close.rolling_median(**rolling)).alias("_median"),
+        per_symbol(log_close.diff().abs().rolling_median(**rolling))
+        .clip(lower_bound=min_mad)
+        .alias("_mad"),
+    )
+    band = mad_threshold * MAD_TO_STD * pl.col("_mad")
+    lower = (pl.col("_median") - band).exp()
+    upper = (pl.col("_median") + band).exp()
+    lf = lf.with_columns(
+        pl.any_horizontal(
+            [
+                ((pl.col(c) < lower) | (pl.col(c) > upper)).fill_null(False)
+                for c in prices
+            ]
+        ).alias("issue_outlier"),
+        *[
+            pl.when(pl.col(c) > upper)
+            .then(upper)
+            .when(pl.col(c) < lower)
+            .then(lower)
+            .otherwise(pl.col(c))
+            .alias(c)
+            for c in prices
+        ],
+    ).drop(["_median", "_mad"])
+
+    lf = lf.with_columns(
+        (pl.col("volume") == 0).fill_null(False).alias("issue_zero_volume")
+    )
+
+    # Fill policy for nulled values
+    missing = pl.any_horizontal([pl.col(c).is_null() for c in prices + counts])
+    if fill == "forward":
+        last_close = per_symbol(pl.col("close").forward_fill(limit=max_fill))
+        lf = lf.with_columns(
+            missing.alias("issue_filled"),
+            last_close.alias("close"),
+        ).with_columns(
+            *[pl.col(c).fill_null(pl.col("close")) for c in prices if c != "close"],
+            *[pl.col(c).fill_null(0) for c in counts],
+        )
+    else:
+        lf = lf.with_columns(pl.lit(False).alias("issue_filled"))
+
+    # Stale quotes: runs of unchanged closes
+    if stale_bars is not None:
+        run = per_symbol(pl.col("close").rle_id())
+        lf = lf.with_columns(
+            (pl.len().over([symbol_col, run]) >= stale_bars).alias("issue_stale")
+        )
+    else:
+        lf = lf.with_columns(pl.lit(False).alias("issue_stale"))
+
+    # Halts: long gaps between bars of the same trading day
+    if halt_gap is not None:
+        previous = per_symbol(ts.shift(1))
+        lf = lf.with_columns(
+            ((ts.dt.date() == previous.dt.date()) & ((ts - previous) > halt_gap))
+            .fill_null(False)
+            .alias("issue_halted")
+        )
+    else:
+        lf = lf.with_columns(pl.lit(False).alias("issue_halted"))
+
+    return lf
+
+
+def clean_bars(
+    df: pl.DataFrame | pl.LazyFrame,
+    drop_stale: bool = False,
+    keep_flags: bool = False,
+    **kwargs,
+) -> pl.DataFrame | pl.LazyFrame:
+    """
+    Clean raw bars with `flag_bars` and drop the rows that cannot be repaired.
+
+    Rows whose close is still null after the fill policy are dropped (with
+    fill='drop', rows with any null price or count), as are stale bars when
+    `drop_stale` is set.
+
+    Example:
+    --------
+    >>> bars = clean_bars(pl.scan_parquet(path), mad_threshold=8.0)
+    >>> daily = resample_stock_bars(bars, freq="1d")
+
+    Parameters:
+    -----------
+    df : pl.DataFrame | pl.LazyFrame
+        Long-format raw bars
+    drop_stale : bool
+        Drop bars flagged as stale (default: False)
+    keep_flags : bool
+        Keep the `issue_<name>` columns in the output (default: False)
+    **kwargs
+        Passed on to `flag_bars`
+
+    Returns:
+    --------
+    pl.DataFrame | pl.LazyFrame
+        Cleaned bars sorted by (symbol, timestamp), eager if the input was eager
+        and lazy otherwise
+    """
+    is_lazy = isinstance(df, pl.LazyFrame)
+    lf = _drop_unrepaired(flag_bars(df, **kwargs), drop_stale, kwargs.get("fill"))
+    if not keep_flags:
+        lf = lf.drop([f"issue_{issue}" for issue in ISSUES])
+
+    return lf if is_lazy else lf.collect()
+
+
+def _drop_unrepaired(
+    flagged: pl.LazyFrame, drop_stale: bool, fill: str | None
+) -> pl.LazyFrame:
+    """Remove the rows `clean_bars` does not keep"""
+    columns = flagged.collect_schema().names()
+    if fill == "drop":
+        keep = pl.all_horizontal(
+            [
+                pl.col(c).is_not_null()
+                for c in PRICE_COLUMNS + COUNT_COLUMNS
+                if c in columns
+            ]
+        )
+    else:
+        keep = pl.col("close").is_not_null()
+    if drop_stale:
+        keep = keep & ~pl.col("issue_stale")
+    return flagged.filter(keep)
+
+
+def issue_counts(
+    flagged: pl.DataFrame | pl.LazyFrame, symbol_col: str = "symbol"
+) -> pl.DataFrame | pl.LazyFrame:
+    """
+    Per-symbol count of every issue found by `flag_bars`.
+
+    Parameters:
+    -----------
+    flagged : pl.DataFrame | pl.LazyFrame
+        Output of `flag_bars` (or `clean_bars(..., keep_flags=True)`)
+    symbol_col : str
+        Name of the symbol column (default: "symbol")
+
+    Returns:
+    --------
+    pl.DataFrame | pl.LazyFrame
+        One row per symbol with `rows` and one count column per issue
+    """
+    return (
+        flagged.group_by(symbol_col)
+        .agg(
+            pl.len().alias("rows"),
+            *[pl.col(f"issue_{issue}").sum().alias(issue) for issue in ISSUES],
+        )
+        .sort(symbol_col)
+    )
+
+
+def clean_with_report(
+    df: pl.DataFrame | pl.LazyFrame,
+    drop_stale: bool = False,
+    symbol_col: str = "symbol",
+    **kwargs,
+) -> tuple[pl.DataFrame, pl.DataFrame]:
+    """
+    Clean bars and count their issues in a single pass.
+
+    The cleaning plan is collected once with its flags, and both outputs are
+    derived from that frame instead of evaluating the plan twice.
+
+    Returns:
+    --------
+    tuple[pl.DataFrame, pl.DataFrame]
+        Cleaned bars (as `clean_bars`) and per-symbol issue counts (as
+        `issue_counts`)
+    """
+    flagged = flag_bars(df, symbol_col=symbol_col, **kwargs).collect()
+    cleaned = (
+        _drop_unrepaired(flagged.lazy(), drop_stale, kwargs.get("fill"))
+        .drop([f"issue_{issue}" for issue in ISSUES])
+        .collect()
+    )
+    return cleaned, issue_counts(flagged, symbol_col=symbol_col)
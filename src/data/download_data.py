@@ -0,0 +1,623 @@
+import os
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import UTC, date, datetime, timedelta
+from itertools import islice
+
+import polars as pl
+from alpaca.common.exceptions import APIError
+from alpaca.data.enums import Adjustment, CorporateActionsType
+from alpaca.data.historical import StockHistoricalDataClient
+from alpaca.data.historical.corporate_actions import CorporateActionsClient
+from alpaca.data.requests import CorporateActionsRequest, StockBarsRequest
+from alpaca.data.timeframe import TimeFrame
+from dotenv import load_dotenv
+
+from data.adjustments import ACTION_SCHEMA
+from data.bar_store import BarStore
+from logger.logging import get_logger
+
+logger = get_logger(__name__)  # Creates 'data.download_data'
+
+BAR_SCHEMA = {
+    "symbol": pl.String,
+    "timestamp": pl.Datetime("us", "UTC"),
+    "open": pl.Float64,
+    "high": pl.Float64,
+    "low": pl.Float64,
+    "close": pl.Float64,
+    "volume": pl.Float64,
+    "trade_count": pl.Float64,
+    "vwap": pl.Float64,
+}
+
+
+def make_client() -> StockHistoricalDataClient:
+    """Create an Alpaca historical data client from the keys in `.env`"""
+    load_dotenv()
+    return StockHistoricalDataClient(
+        api_key=os.getenv("APCA-API-KEY-ID"),
+        secret_key=os.getenv("APCA-API-SECRET-KEY"),
+    )
+
+
+def make_actions_client() -> CorporateActionsClient:
+    """Create an Alpaca corporate actions client from the keys in `.env`"""
+    load_dotenv()
+    return CorporateActionsClient(
+        api_key=os.getenv("APCA-API-KEY-ID"),
+        secret_key=os.getenv("APCA-API-SECRET-KEY"),
+    )
+
+
+class BarPayloadError(ValueError):
+    """An API response whose bars cannot be converted to `BAR_SCHEMA`"""
+
+
+# Failures of one chunk that are reported in the download summary instead of
+# aborting the run: API and network errors left after the retries, malformed
+# payloads and errors writing the chunk to the store. Anything else is a bug
+# and propagates.
+CHUNK_ERRORS = (APIError, OSError, BarPayloadError)
+
+
+class RateLimiter:
+    """
+    Thread-safe limiter allowing at most `max_calls` calls per `period` seconds.
+
+    Alpaca's free data plan allows 200 requests per minute.
+    """
+
+    def __init__(self, max_calls: int = 200, period: float = 60.0):
+        self.interval = period / max_calls
+        self._next_slot = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until the next call slot is available"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot, now)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def chunk_requests(
+    symbols: list[str],
+    start: datetime,
+    end: datetime,
+    chunk: timedelta = timedelta(days=30),
+) -> list[tuple[str, datetime, datetime]]:
+    """Split a download into (symbol, chunk_start, chunk_end) requests"""
+    requests = []
+    for symbol in symbols:
+        chunk_start = start
+        while chunk_start < end:
+            chunk_end = min(chunk_start + chunk, end)
+            requests.append((symbol, chunk_start, chunk_end))
+            chunk_start = chunk_end
+    return requests
+
+
+def bars_to_polars(barset) -> pl.DataFrame:
+    """
+    Convert an Alpaca `BarSet` to a long-format Polars frame without pandas.
+    Raises `BarPayloadError` if the bars miss a field or have the wrong types.
+    """
+    rows = {column: [] for column in BAR_SCHEMA}
+    try:
+        for symbol, bars in barset.data.items():
+            for bar in bars:
+                rows["symbol"].append(symbol)
+                for column in list(BAR_SCHEMA)[1:]:
+                    rows[column].append(getattr(bar, column))
+        return pl.DataFrame(rows, schema=BAR_SCHEMA)
+    except (AttributeError, TypeError, ValueError, pl.exceptions.PolarsError) as error:
+        raise BarPayloadError(f"Malformed bars payload: {error!r}") from error
+
+
+def _is_retryable(error: APIError | OSError) -> bool:
+    """Client errors other than rate limiting will not succeed on retry"""
+    if isinstance(error, APIError):
+        status = error.status_code
+        return status is None or status == 429 or status >= 500
+    return True
+
+
+def fetch_bars(
+    client: StockHistoricalDataClient,
+    symbol: str,
+    start: datetime,
+    end: datetime,
+    timeframe: TimeFrame = TimeFrame.Minute,
+    adjustment: Adjustment | str = Adjustment.RAW,
+    rate_limiter: RateLimiter | None = None,
+    max_retries: int = 5,
+    backoff: float = 1.0,
+) -> tuple[pl.DataFrame, int]:
+    """
+    Fetch one symbol/date chunk, retrying transient failures with exponential
+    backoff and jitter.
+
+    Parameters:
+    -----------
+    client : StockHistoricalDataClient
+        Alpaca client, or any object with a compatible `get_stock_bars`
+    symbol : str
+        Symbol to download
+    start, end : datetime
+        Chunk bounds
+    timeframe : TimeFrame
+        Bar timeframe (default: 1 minute)
+    adjustment : Adjustment | str
+        Corporate action adjustment (default: 'raw', adjusted on read by the
+        store's `CorporateActions`)
+    rate_limiter : RateLimiter | None
+        Shared limiter acquired before every attempt
+    max_retries : int
+        Attempts after the first one before giving up (default: 5)
+    backoff : float
+        Base delay in seconds, doubled after each failed attempt (default: 1.0)
+
+    Returns:
+    --------
+    tuple[pl.DataFrame, int]
+        The bars and the number of attempts used
+    """
+    request = StockBarsRequest(
+        symbol_or_symbols=symbol,
+        timeframe=timeframe,
+        start=start,
+        end=end,
+        adjustment=adjustment,
+    )
+
+    for attempt in range(max_retries + 1):
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        try:
+            return bars_to_polars(client.get_stock_bars(request)), attempt + 1
+        except (APIError, OSError) as error:
+            if attempt == max_retries or not _is_retryable(error):
+                raise
+            delay = backoff * 2**attempt * (1 + random.random())
+            logger.warning(
+                f"{symbol} {start:%Y-%m-%d}..{end:%Y-%m-%d} failed "
+                f"({error!r}), retrying in {delay:.1f}s"
+            )
+            time.sleep(delay)
+
+
+def download_bars(
+    client: StockHistoricalDataClient,
+    symbols: list[str],
+    start: datetime,
+    end: datetime,
+    store: BarStore,
+    timeframe: TimeFrame = TimeFrame.Minute,
+    adjustment: Adjustment | str = Adjustment.RAW,
+    chunk: timedelta = timedelta(days=30),
+    max_workers: int = 8,
+    max_calls_per_minute: int = 200,
+    max_retries: int = 5,
+    backoff: float = 1.0,
+    requests: list[tuple[str, datetime, datetime]] | None = None,
+    max_buffer_rows: int = 2_000_000,
+) -> pl.DataFrame:
+    """
+    Download bars for many symbols concurrently into a `BarStore`.
+
+    The range is split into one request per symbol and date chunk. Requests run on
+    a thread pool behind a shared rate limiter, at most `2 * max_workers` in
+    flight. An append rewrites every (symbol, year) partition it touches, so the
+    chunks of a symbol are buffered and appended together once all of them have
+    arrived, or once `max_buffer_rows` are buffered; a year of 30-day chunks is
+    then written once instead of a dozen times. Requests are issued symbol by
+    symbol, so only the few symbols in flight are buffered, and whatever is
+    buffered is still appended if the download is interrupted. Appends happen on
+    the calling thread, which keeps the store single-writer. A chunk that still
+    fails after its retries, or cannot be parsed or stored, is reported in the
+    summary and the other chunks carry on.
+
+    Parameters:
+    -----------
+    client : StockHistoricalDataClient
+        Alpaca client, or any object with a compatible `get_stock_bars`
+    symbols : list[str]
+        Symbols to download
+    start, end : datetime
+        Download range
+    store : BarStore
+        Destination store
+    timeframe : TimeFrame
+        Bar timeframe (default: 1 minute)
+    adjustment : Adjustment | str
+        Corporate action adjustment (default: 'raw', adjusted on read by the
+        store's `CorporateActions`)
+    chunk : timedelta
+        Date span of each request (default: 30 days)
+    max_workers : int
+        Concurrent requests (default: 8)
+    max_calls_per_minute : int
+        Rate limit shared by all workers (default: 200)
+    max_retries : int
+        Retries per chunk for transient errors (default: 5)
+    backoff : float
+        Base retry delay in seconds (default: 1.0)
+    requests : list[tuple[str, datetime, datetime]] | None
+        Explicit (symbol, start, end) requests overriding `symbols`/`start`/`end`
+        chunking, e.g. the gaps found by a catch-up sync
+    max_buffer_rows : int
+        Buffered rows of one symbol that trigger an append (default: 2,000,000)
+
+    Returns:
+    --------
+    pl.DataFrame
+        One row per request with `symbol`, `start`, `end`, `rows`, `attempts`
+        and `error` (null on success)
+    """
+    if requests is None:
+        requests = chunk_requests(symbols, start, end, chunk)
+    rate_limiter = RateLimiter(max_calls=max_calls_per_minute, period=60.0)
+    logger.info(f"Downloading {len(requests)} chunks with {max_workers} workers")
+
+    results = []
+    remaining = Counter(symbol for symbol, _, _ in requests)
+    buffers = defaultdict(list)
+
+    def flush(symbol: str) -> None:
+        """Append the buffered chunks of `symbol` in one write per partition"""
+        chunks = buffers.pop(symbol, [])
+        if not chunks:
+            return
+        try:
+            store.append(pl.concat([bars for bars, _ in chunks]))
+        except CHUNK_ERRORS as error:
+            logger.error(f"Failed to store {symbol} bars: {error!r}")
+            for _, result in chunks:
+                result.update(rows=0, error=repr(error))
+
+    pending = iter(requests)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {}
+
+        def submit(count: int) -> None:
+            for symbol, chunk_start, chunk_end in islice(pending, count):
+                future = executor.submit(
+                    fetch_bars,
+                    client,
+                    symbol,
+                    chunk_start,
+                    chunk_end,
+                    timeframe=timeframe,
+                    adjustment=adjustment,
+                    rate_limiter=rate_limiter,
+                    max_retries=max_retries,
+                    backoff=backoff,
+                )
+                futures[future] = (symbol, chunk_start, chunk_end)
+
+        # Bounded window of submissions so finished chunks are not held in memory
+        submit(2 * max_workers)
+        try:
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    symbol, chunk_start, chunk_end = futures.pop(future)
+                    remaining[symbol] -= 1
+                    result = {"symbol": symbol, "start": chunk_start, "end": chunk_end}
+                    try:
+                        bars, attempts = future.result()
+                        result.update(rows=bars.height, attempts=attempts, error=None)
+                        buffers[symbol].append((bars, result))
+                    except CHUNK_ERRORS as error:
+                        logger.error(f"Failed to download {symbol} chunk: {error!r}")
+                        result.update(rows=0, attempts=None, error=repr(error))
+                    results.append(result)
+
+                    buffered = sum(bars.height for bars, _ in buffers[symbol])
+                    if remaining[symbol] == 0 or buffered >= max_buffer_rows:
+                        flush(symbol)
+                submit(len(done))
+        finally:
+            for symbol in list(buffers):
+                flush(symbol)
+
+    summary = pl.DataFrame(
+        results,
+        schema={
+            "symbol": pl.String,
+            "start": pl.Datetime("us", "UTC"),
+            "end": pl.Datetime("us", "UTC"),
+            "rows": pl.Int64,
+            "attempts": pl.Int64,
+            "error": pl.String,
+        },
+    ).sort(["symbol", "start"])
+    logger.info(
+        f"Downloaded {summary['rows'].sum()} bars, "
+        f"{summary['error'].is_not_null().sum()} chunks failed"
+    )
+    return summary
+
+
+def find_gaps(
+    store: BarStore,
+    symbols: list[str],
+    start: datetime,
+    end: datetime,
+    max_gap: timedelta = timedelta(days=5),
+    fill_holes: bool = False,
+    backfill: bool = False,
+) -> list[tuple[str, datetime, datetime]]:
+    """
+    Ranges of [start, end) missing from the store for each symbol.
+
+    By default only the parquet footers are read: symbols missing from the
+    store get the whole range, stored symbols get the tail after their last bar
+    and the gaps longer than `max_gap` between consecutive partitions. With
+    `fill_holes=True` the stored timestamps in [start, end) are also scanned for
+    holes inside partitions, which reads the timestamp column of the whole
+    range and is meant for an occasional repair rather than every sync. The
+    range before a symbol's first stored bar is only requested with
+    `backfill=True`, since for a symbol listed after `start` it holds no data.
+
+    Ranges the store recorded as already requested and empty (see
+    `BarStore.record_empty`), such as trading halts, are left out, so they are
+    not requested again on every sync.
+
+    Parameters:
+    -----------
+    store : BarStore
+        Store to inspect
+    symbols : list[str]
+        Symbols to sync
+    start, end : datetime
+        Range that should be covered (timezone-aware)
+    max_gap : timedelta
+        Shortest gap between consecutive bars treated as missing data rather than
+        a weekend or holiday (default: 5 days)
+    fill_holes : bool
+        Scan stored timestamps for holes inside partitions (default: False)
+    backfill : bool
+        Also request the range before the first stored bar (default: False)
+
+    Returns:
+    --------
+    list[tuple[str, datetime, datetime]]
+        (symbol, gap_start, gap_end) ranges to download
+    """
+    coverage = store.coverage(symbols)
+    empty = store.empty_ranges(symbols)
+    gaps = []
+
+    for symbol in symbols:
+        spans = coverage.filter(pl.col("symbol") == symbol)
+        if spans.is_empty():
+            symbol_gaps = [(start, end)]
+        else:
+            symbol_gaps = _stored_gaps(
+                store, symbol, spans, start, end, max_gap, fill_holes, backfill
+            )
+
+        known_empty = (
+            empty.filter(pl.col("symbol") == symbol).select("start", "end").rows()
+        )
+        gaps.extend(
+            (symbol, part_start, part_end)
+            for gap_start, gap_end in symbol_gaps
+            for part_start, part_end in _subtract_ranges(
+                gap_start, gap_end, known_empty
+            )
+        )
+
+    return gaps
+
+
+def _stored_gaps(
+    store: BarStore,
+    symbol: str,
+    spans: pl.DataFrame,
+    start: datetime,
+    end: datetime,
+    max_gap: timedelta,
+    fill_holes: bool,
+    backfill: bool,
+) -> list[tuple[datetime, datetime]]:
+    """Gaps of a stored symbol, see `find_gaps`"""
+    gaps = []
+    first, last = spans["start"].min(), spans["end"].max()
+    if backfill and first - start > max_gap:
+        gaps.append((start, first))
+
+    # Partitions all outside [start, end), e.g. the first sync of a new year,
+    # have no stored timestamps to scan
+    if fill_holes and store.partitions([symbol], start=start, end=end):
+        stored = (
+            store.scan([symbol], start=start, end=end, columns=[])
+            .select(pl.col(store.timestamp_col).dt.convert_time_zone("UTC"))
+            .collect()
+            .to_series()
+        )
+        bounds = pl.DataFrame({"from": stored, "to": stored.shift(-1)})
+    else:
+        # Partitions are consecutive years: compare each end to the next start
+        bounds = spans.sort("year").select(
+            pl.col("end").alias("from"), pl.col("start").shift(-1).alias("to")
+        )
+
+    holes = bounds.filter(
+        (pl.col("to") - pl.col("from")) > max_gap,
+        pl.col("to") > start,
+        pl.col("from") < end,
+    )
+    gaps.extend(
+        (hole_start + timedelta(microseconds=1), hole_end)
+        for hole_start, hole_end in holes.iter_rows()
+    )
+
+    if last < end:
+        gaps.append((last + timedelta(microseconds=1), end))
+    return gaps
+
+
+def _subtract_ranges(
+    start: datetime, end: datetime, ranges: list[tuple[datetime, datetime]]
+) -> list[tuple[datetime, datetime]]:
+    """Parts of [start, end) not covered by the sorted, disjoint `ranges`"""
+    parts = []
+    for range_start, range_end in ranges:
+        if range_end <= start or range_start >= end:
+            continue
+        if range_start > start:
+            parts.append((start, range_start))
+        start = range_end
+        if start >= end:
+            break
+    if start < end:
+        parts.append((start, end))
+    return parts
+
+
+def sync_bars(
+    client: StockHistoricalDataClient,
+    symbols: list[str],
+    store: BarStore,
+    start: datetime,
+    end: datetime | None = None,
+    max_gap: timedelta = timedelta(days=5),
+    fill_holes: bool = False,
+    backfill: bool = False,
+    chunk: timedelta = timedelta(days=30),
+    **kwargs,
+) -> pl.DataFrame:
+    """
+    Catch the store up to `end` by downloading only the ranges it is missing.
+
+    Gaps come from `find_gaps`, are split into `chunk`-sized requests and go
+    through `download_bars`. Requests that succeed without returning any bars
+    are recorded in the store (`BarStore.record_empty`) and skipped by later
+    syncs. The store replaces rows with matching timestamps, so re-running a
+    sync, or overlapping with bars already stored, is harmless and the work
+    done is proportional to the missing data.
+
+    Parameters:
+    -----------
+    client : StockHistoricalDataClient
+        Alpaca client, or any object with a compatible `get_stock_bars`
+    symbols : list[str]
+        Symbols to sync
+    store : BarStore
+        Store to update
+    start : datetime
+        Start of the history the store should cover
+    end : datetime | None
+        End of the range (default: 15 minutes ago, the most recent SIP data the
+        free plan may query)
+    max_gap : timedelta
+        See `find_gaps` (default: 5 days)
+    fill_holes : bool
+        See `find_gaps` (default: False)
+    backfill : bool
+        See `find_gaps` (default: False)
+    chunk : timedelta
+        Date span of each request (default: 30 days)
+    **kwargs
+        Passed on to `download_bars`
+
+    Returns:
+    --------
+    pl.DataFrame
+        Download summary from `download_bars`
+    """
+    if end is None:
+        end = datetime.now(UTC) - timedelta(minutes=15)
+
+    gaps = find_gaps(
+        store,
+        symbols,
+        start,
+        end,
+        max_gap=max_gap,
+        fill_holes=fill_holes,
+        backfill=backfill,
+    )
+    requests = [
+        request
+        for symbol, gap_start, gap_end in gaps
+        for request in chunk_requests([symbol], gap_start, gap_end, chunk)
+    ]
+    logger.info(f"Found {len(gaps)} gaps across {len(symbols)} symbols")
+    summary = download_bars(
+        client, symbols, start, end, store, chunk=chunk, requests=requests, **kwargs
+    )
+
+    empty = summary.filter(pl.col("rows") == 0, pl.col("error").is_null())
+    if not empty.is_empty():
+        store.record_empty(empty.select("symbol", "start", "end"))
+    return summary
+
+
+def fetch_corporate_actions(
+    client: CorporateActionsClient,
+    symbols: list[str],
+    start: date,
+    end: date,
+) -> pl.DataFrame:
+    """
+    Download the splits and cash dividends of `symbols` in [start, end].
+
+    The result feeds `BarStore.update_actions`, which keeps the bars raw and
+    rebuilds only the adjustment factors of the symbols that changed.
+
+    Parameters:
+    -----------
+    client : CorporateActionsClient
+        Alpaca client, or any object with a compatible `get_corporate_actions`
+    symbols : list[str]
+        Symbols to look up
+    start, end : date
+        Range of ex-dates
+
+    Returns:
+    --------
+    pl.DataFrame
+        Actions with the `ACTION_SCHEMA` columns, one row per action
+    """
+    request = CorporateActionsRequest(
+        symbols=symbols,
+        types=[
+            CorporateActionsType.FORWARD_SPLIT,
+            CorporateActionsType.REVERSE_SPLIT,
+            CorporateActionsType.CASH_DIVIDEND,
+        ],
+        start=start,
+        end=end,
+    )
+    actions = client.get_corporate_actions(request).data
+
+    rows = [
+        {
+            "symbol": split.symbol,
+            "ex_date": split.ex_date,
+            "split_ratio": split.new_rate / split.old_rate,
+            "dividend": None,
+        }
+        for kind in ("forward_splits", "reverse_splits")
+        for split in actions.get(kind, [])
+    ]
+    rows.extend(
+        {
+            "symbol": dividend.symbol,
+            "ex_date": dividend.ex_date,
+            "split_ratio": None,
+            "dividend": dividend.rate,
+        }
+        for dividend in actions.get("cash_dividends", [])
+    )
+    logger.info(f"Fetched {len(rows)} corporate actions for {len(symbols)} symbols")
+    return pl.DataFrame(rows, schema=ACTION_SCHEMA).sort("symbol", "ex_date")
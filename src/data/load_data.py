@@ -0,0 +1,175 @@
+from datetime import date, datetime
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+import polars as pl
+
+from data.clean_data import clean_bars
+from data.resample_data import resample_stock_bars
+
+BAR_COLUMNS = ["open", "high", "low", "close", "volume", "trade_count", "vwap"]
+
+
+def _to_datetime_bound(
+    value: str | date | datetime, dtype: pl.DataType, timezone: str
+) -> datetime:
+    """Convert a date bound to a datetime comparable with the timestamp column"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    elif not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+
+    # Naive bounds are interpreted in the target timezone of the output
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=ZoneInfo(timezone))
+
+    column_tz = getattr(dtype, "time_zone", None)
+    if column_tz is None:
+        return value.astimezone(ZoneInfo(timezone)).replace(tzinfo=None)
+    return value.astimezone(ZoneInfo(column_tz))
+
+
+def scan_bars(
+    source: str | Path | pl.LazyFrame,
+    symbols: list[str] | None = None,
+    start: str | date | datetime | None = None,
+    end: str | date | datetime | None = None,
+    columns: list[str] | None = None,
+    timestamp_col: str = "timestamp",
+    symbol_col: str = "symbol",
+    timezone: str = "UTC",
+) -> pl.LazyFrame:
+    """
+    Build a lazy scan of raw bars with symbol/date predicates and column projection.
+
+    Nothing is read until the plan is collected, and Polars pushes the filters and
+    projection down into the parquet reader so row groups outside the requested
+    symbols and date range are skipped.
+
+    Parameters:
+    -----------
+    source : str | Path | pl.LazyFrame
+        Parquet file, directory/glob of parquet files, or an existing LazyFrame
+    symbols : list[str] | None
+        Symbols to keep (default: all symbols)
+    start : str | date | datetime | None
+        Inclusive lower bound on the timestamp (default: no lower bound)
+    end : str | date | datetime | None
+        Exclusive upper bound on the timestamp (default: no upper bound)
+    columns : list[str] | None
+        Bar columns to read besides symbol/timestamp (default: OHLCV, trade_count
+        and vwap)
+    timestamp_col : str
+        Name of the timestamp column (default: "timestamp")
+    symbol_col : str
+        Name of the symbol column (default: "symbol")
+    timezone : str
+        Timezone used to interpret naive `start`/`end` bounds (default: 'UTC')
+
+    Returns:
+    --------
+    pl.LazyFrame
+        Lazy frame of the selected raw bars
+    """
+    if isinstance(source, pl.LazyFrame):
+        lf = source
+    else:
+        lf = pl.scan_parquet(source)
+
+    columns = BAR_COLUMNS if columns is None else columns
+    lf = lf.select([symbol_col, timestamp_col, *columns])
+
+    timestamp_dtype = lf.collect_schema()[timestamp_col]
+    if symbols is not None:
+        lf = lf.filter(pl.col(symbol_col).is_in(symbols))
+    if start is not None:
+        start_bound = _to_datetime_bound(start, timestamp_dtype, timezone)
+        lf = lf.filter(pl.col(timestamp_col) >= start_bound)
+    if end is not None:
+        end_bound = _to_datetime_bound(end, timestamp_dtype, timezone)
+        lf = lf.filter(pl.col(timestamp_col) < end_bound)
+
+    return lf
+
+
+def load_bars(
+    source: str | Path | pl.LazyFrame,
+    symbols: list[str] | None = None,
+    start: str | date | datetime | None = None,
+    end: str | date | datetime | None = None,
+    freq: str | None = None,
+    timestamp_col: str = "timestamp",
+    symbol_col: str = "symbol",
+    market_hours_only: bool = True,
+    timezone: str = "UTC",
+    clean: bool = False,
+    aggregations: list[pl.Expr] | None = None,
+) -> pl.LazyFrame:
+    """
+    Lazily load raw bars, optionally clean them and resample them to `freq`.
+
+    Example:
+    --------
+    >>> bars = load_bars(path, symbols=["XOM", "CVX"], start="2022-01-01",
+    ...                  end="2023-01-01", freq="1d", timezone="America/New_York")
+    >>> df = bars.collect(engine="streaming")
+
+    Parameters:
+    -----------
+    source : str | Path | pl.LazyFrame
+        Parquet file, directory/glob of parquet files, or an existing LazyFrame
+    symbols : list[str] | None
+        Symbols to keep (default: all symbols)
+    start : str | date | datetime | None
+        Inclusive lower bound on the timestamp (default: no lower bound)
+    end : str | date | datetime | None
+        Exclusive upper bound on the timestamp (default: no upper bound)
+    freq : str | None
+        Target frequency passed to `resample_stock_bars`, or None to return the
+        raw bars (default: None)
+    timestamp_col : str
+        Name of the timestamp column (default: "timestamp")
+    symbol_col : str
+        Name of the symbol column (default: "symbol")
+    market_hours_only : bool
+        If True, only use market hours data for resampling (default: True)
+    timezone : str
+        Target timezone for the output data, also used for naive bounds
+        (default: 'UTC')
+    clean : bool
+        If True, run the raw bars through `clean_bars` with its default policies
+        before resampling (default: False)
+    aggregations : list[pl.Expr] | None
+        Extra per-bucket aggregations passed to `resample_stock_bars`
+        (default: None)
+
+    Returns:
+    --------
+    pl.LazyFrame
+        Lazy plan producing the (optionally resampled) bars
+    """
+    lf = scan_bars(
+        source,
+        symbols=symbols,
+        start=start,
+        end=end,
+        timestamp_col=timestamp_col,
+        symbol_col=symbol_col,
+        timezone=timezone,
+    )
+
+    if clean:
+        lf = clean_bars(lf, timestamp_col=timestamp_col, symbol_col=symbol_col)
+
+    if freq is None:
+        return lf
+
+    return resample_stock_bars(
+        lf,
+        freq=freq,
+        timestamp_col=timestamp_col,
+        symbol_col=symbol_col,
+        market_hours_only=market_hours_only,
+        timezone=timezone,
+        aggregations=aggregations,
+    )
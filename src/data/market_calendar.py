@@ -0,0 +1,246 @@
+import re
+from datetime import date, timedelta
+from functools import cache
+
+import numpy as np
+import polars as pl
+
+# Exchange whose sessions the calendar describes (ISO 10383 MIC)
+SESSION_CALENDAR = "XNYS"
+SESSION_TIMEZONE = "America/New_York"
+
+US_PER_DAY = 86_400_000_000
+US_PER_MINUTE = 60_000_000
+
+REGULAR_OPEN = (9, 30)
+REGULAR_CLOSE = (16, 0)
+EARLY_CLOSE = (13, 0)
+
+# Unscheduled full-day closures
+SPECIAL_CLOSURES = [
+    date(2001, 9, 11),
+    date(2001, 9, 12),
+    date(2001, 9, 13),
+    date(2001, 9, 14),
+    date(2004, 6, 11),  # Reagan funeral
+    date(2007, 1, 2),  # Ford funeral
+    date(2012, 10, 29),  # Hurricane Sandy
+    date(2012, 10, 30),
+    date(2018, 12, 5),  # G.H.W. Bush funeral
+    date(2025, 1, 9),  # Carter funeral
+]
+
+_UNIT_NS = {
+    "ns": 1,
+    "us": 1_000,
+    "ms": 1_000_000,
+    "s": 1_000_000_000,
+    "m": 1_000 * US_PER_MINUTE,
+    "h": 60_000 * US_PER_MINUTE,
+}
+
+
+def _easter(year: int) -> date:
+    """Gregorian Easter Sunday (anonymous Gregorian algorithm)"""
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = divmod(b, 4)
+    g = (8 * b + 13) // 25
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    shift = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 19 * shift) // 433
+    month = (h + shift - 7 * m + 90) // 25
+    day = (h + shift - 7 * m + 33 * month + 19) % 32
+    return date(year, month, day)
+
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    """`n`-th `weekday` (Monday=0) of the month, counting from the end if n < 0"""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7 + 7 * (-n - 1))
+
+
+def _observed(day: date) -> date:
+    """Saturday holidays are observed on Friday, Sunday holidays on Monday"""
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+def nyse_holidays(year: int) -> list[date]:
+    """Full-day NYSE closures in `year`, including special closures"""
+    holidays = [
+        _nth_weekday(year, 2, 0, 3),  # Washington's Birthday
+        _easter(year) - timedelta(days=2),  # Good Friday
+        _nth_weekday(year, 5, 0, -1),  # Memorial Day
+        _observed(date(year, 7, 4)),  # Independence Day
+        _nth_weekday(year, 9, 0, 1),  # Labor Day
+        _nth_weekday(year, 11, 3, 4),  # Thanksgiving
+        _observed(date(year, 12, 25)),  # Christmas
+    ]
+    # New Year's Day falling on a Saturday is not observed on the Friday before
+    if date(year, 1, 1).weekday() != 5:
+        holidays.append(_observed(date(year, 1, 1)))
+    if year >= 1998:
+        holidays.append(_nth_weekday(year, 1, 0, 3))  # Martin Luther King Jr. Day
+    if year >= 2022:
+        holidays.append(_observed(date(year, 6, 19)))  # Juneteenth
+    holidays.extend(day for day in SPECIAL_CLOSURES if day.year == year)
+    return sorted(holidays)
+
+
+def nyse_early_closes(year: int) -> list[date]:
+    """Sessions closing at 13:00 ET in `year`"""
+    early = [_nth_weekday(year, 11, 3, 4) + timedelta(days=1)]  # Black Friday
+    # Eves of Independence Day and Christmas, unless the eve is itself the
+    # observed holiday or a weekend
+    for eve in (date(year, 7, 3), date(year, 12, 24)):
+        if eve.weekday() < 4:
+            early.append(eve)
+    return sorted(early)
+
+
+@cache
+def session_calendar(start_year: int = 2000, end_year: int = 2040) -> pl.DataFrame:
+    """
+    NYSE regular sessions from `start_year` to `end_year`, computed once per
+    process.
+
+    Open and close are stored as int64 UTC epoch microseconds, so bars can be
+    matched to their session with integer comparisons. `day` is the UTC epoch
+    day of the session: every regular session lies within a single UTC day, so
+    `epoch_us // US_PER_DAY` of a bar is an exact equi-join key.
+
+    Parameters:
+    -----------
+    start_year : int
+        First year of the calendar (default: 2000)
+    end_year : int
+        Last year of the calendar (default: 2040)
+
+    Returns:
+    --------
+    pl.DataFrame
+        One row per session with `session` (Date), `day` (Int64), `open` and
+        `close` (Int64 epoch microseconds), sorted by session
+    """
+    closed = [
+        day for year in range(start_year, end_year + 1) for day in nyse_holidays(year)
+    ]
+    early = [
+        day
+        for year in range(start_year, end_year + 1)
+        for day in nyse_early_closes(year)
+    ]
+
+    def session_time(hour_minute: tuple[int, int]) -> pl.Expr:
+        hour, minute = hour_minute
+        return (
+            pl.col("session")
+            .dt.combine(pl.time(hour, minute))
+            .dt.replace_time_zone(SESSION_TIMEZONE)
+            .dt.epoch("us")
+        )
+
+    return (
+        pl.date_range(date(start_year, 1, 1), date(end_year, 12, 31), "1d", eager=True)
+        .alias("session")
+        .to_frame()
+        .filter(pl.col("session").dt.weekday() <= 5, ~pl.col("session").is_in(closed))
+        .with_columns(
+            session_time(REGULAR_OPEN).alias("open"),
+            pl.when(pl.col("session").is_in(early))
+            .then(session_time(EARLY_CLOSE))
+            .otherwise(session_time(REGULAR_CLOSE))
+            .alias("close"),
+        )
+        .with_columns((pl.col("open") // US_PER_DAY).alias("day"))
+        .select("session", "day", "open", "close")
+    )
+
+
+def session_bounds() -> tuple[np.ndarray, np.ndarray]:
+    """Session open and close times as int64 UTC epoch microsecond arrays"""
+    sessions = session_calendar()
+    return sessions["open"].to_numpy(), sessions["close"].to_numpy()
+
+
+def attach_sessions(
+    lf: pl.LazyFrame,
+    timestamp_col: str = "timestamp",
+    sessions: pl.DataFrame | None = None,
+) -> pl.LazyFrame:
+    """
+    Keep only bars inside a regular session and tag them with it.
+
+    Bars are joined to the calendar on their UTC epoch day and kept when
+    `open <= timestamp < close`, which drops weekends, holidays, pre-market
+    minutes and anything after an early close with integer comparisons only.
+
+    Parameters:
+    -----------
+    lf : pl.LazyFrame
+        Bars with a timestamp column (naive timestamps are taken as UTC)
+    timestamp_col : str
+        Name of the timestamp column (default: "timestamp")
+    sessions : pl.DataFrame | None
+        Calendar from `session_calendar` (default: the NYSE calendar)
+
+    Returns:
+    --------
+    pl.LazyFrame
+        Bars inside a session with `session`, `session_open` and `session_close`
+        columns added
+    """
+    sessions = session_calendar() if sessions is None else sessions
+    epoch_us = pl.col(timestamp_col).dt.epoch("us")
+    return (
+        lf.with_columns((epoch_us // US_PER_DAY).alias("_day"))
+        .join(
+            sessions.lazy().rename({"open": "session_open", "close": "session_close"}),
+            left_on="_day",
+            right_on="day",
+            how="inner",
+        )
+        .filter(
+            epoch_us >= pl.col("session_open"),
+            epoch_us < pl.col("session_close"),
+        )
+        .drop("_day")
+    )
+
+
+def intraday_frequency_us(freq: str) -> int | None:
+    """
+    Length of an intraday Polars duration such as "30m" or "1h30m" in
+    microseconds, or None for daily and longer frequencies. Raises ValueError
+    for frequencies that are not a positive whole number of microseconds, the
+    resolution of the bars.
+    """
+    parts = re.findall(r"(\d+)([a-z]+)", freq.lower())
+    if not parts or any(unit not in _UNIT_NS for _, unit in parts):
+        return None
+    freq_us, remainder = divmod(
+        sum(int(n) * _UNIT_NS[unit] for n, unit in parts), 1_000
+    )
+    if freq_us == 0 or remainder:
+        raise ValueError(f"Frequency {freq!r} is not a whole number of microseconds")
+    return freq_us
+
+
+def bars_per_session(freq: str, sessions: pl.DataFrame | None = None) -> float:
+    """
+    Average number of `freq` bars per session when buckets are anchored at the
+    session open, counting the shorter last bucket of each session
+    """
+    sessions = session_calendar() if sessions is None else sessions
+    freq_us = intraday_frequency_us(freq)
+    if freq_us is None:
+        return 1.0
+    lengths = sessions["close"].to_numpy() - sessions["open"].to_numpy()
+    return float(np.mean(-(-lengths // freq_us)))
@@ -0,0 +1,314 @@
+import hashlib
+import json
+import os
+import uuid
+from datetime import time
+from pathlib import Path
+
+import polars as pl
+
+from data.market_calendar import SESSION_TIMEZONE
+from data.resample_cache import source_fingerprint
+from logger.logging import get_logger
+
+logger = get_logger(__name__)  # Creates 'data.merge_macro'
+
+AVAILABLE_COL = "available_at"
+
+
+def read_macro_series(
+    path: str | Path,
+    name: str,
+    date_col: str = "date",
+    value_col: str = "value",
+    lag: str = "1d",
+    release_time: time = time(0, 0),
+    release_col: str | None = None,
+    timezone: str = SESSION_TIMEZONE,
+) -> pl.DataFrame:
+    """
+    Read one macro series and stamp every observation with the moment it became
+    public.
+
+    Observations are dated by the period they describe (e.g. FRED's
+    `observation_date`), not by when they could be traded on. Each value is
+    therefore made available at `date + lag` at `release_time` local time, or at
+    the timestamp in `release_col` when the file carries actual release dates
+    (e.g. ALFRED vintages).
+
+    Example:
+    --------
+    >>> cpi = read_macro_series("data/external/CPIAUCSL.csv", "cpi",
+    ...                         date_col="observation_date", value_col="CPIAUCSL",
+    ...                         lag="1mo14d", release_time=time(8, 30))
+
+    Parameters:
+    -----------
+    path : str | Path
+        CSV or parquet file with one row per observation
+    name : str
+        Name of the output value column
+    date_col : str
+        Observation date column (default: "date")
+    value_col : str
+        Value column (default: "value")
+    lag : str
+        Polars duration from the observation date to its publication, e.g. "1d"
+        for daily market series or "1mo14d" for monthly CPI (default: "1d")
+    release_time : time
+        Local time of day of the publication (default: midnight)
+    release_col : str | None
+        Column with the actual release date/time, overriding `lag` and
+        `release_time` (default: None)
+    timezone : str
+        Timezone of `release_time` and of naive release timestamps
+        (default: 'America/New_York')
+
+    Returns:
+    --------
+    pl.DataFrame
+        `available_at` (UTC) and `name` columns sorted by `available_at`, keeping
+        the latest revision when several observations share a release time
+    """
+    path = Path(path)
+    if path.suffix == ".csv":
+        # FRED marks missing observations with "."
+        lf = pl.scan_csv(path, null_values=["."], try_parse_dates=True)
+    else:
+        lf = pl.scan_parquet(path)
+
+    if release_col is not None:
+        available = pl.col(release_col).cast(pl.Datetime("us"))
+    else:
+        available = (
+            pl.col(date_col)
+            .cast(pl.Date)
+            .dt.offset_by(lag)
+            .dt.combine(release_time)
+            .cast(pl.Datetime("us"))
+        )
+
+    return (
+        lf.select(
+            available.dt.replace_time_zone(timezone)
+            .dt.convert_time_zone("UTC")
+            .alias(AVAILABLE_COL),
+            pl.col(value_col).cast(pl.Float64).alias(name),
+        )
+        .drop_nulls()
+        .unique(subset=AVAILABLE_COL, keep="last", maintain_order=True)
+        .sort(AVAILABLE_COL)
+        .collect()
+    )
+
+
+def align_macro(
+    timestamps: pl.Series,
+    series: list[pl.DataFrame],
+    tolerance: str | None = None,
+) -> pl.DataFrame:
+    """
+    Align macro series to bar timestamps without lookahead.
+
+    Each series is joined once against the sorted, de-duplicated timestamps
+    with a backward `join_asof` on `available_at`, so every timestamp gets the
+    latest value already published at that moment. The output is one column
+    block shared by all symbols; join it to bars on the timestamp instead of
+    re-aligning per symbol.
+
+    Parameters:
+    -----------
+    timestamps : pl.Series
+        Bar timestamps (timezone-aware, or naive UTC); duplicates are allowed
+    series : list[pl.DataFrame]
+        Frames from `read_macro_series`
+    tolerance : str | None
+        Polars duration after which a stale value is replaced by null, e.g. "45d"
+        (default: None, values never expire)
+
+    Returns:
+    --------
+    pl.DataFrame
+        Sorted unique `timestamps` with one column per macro series
+    """
+    utc = pl.col(timestamps.name)
+    if timestamps.dtype.time_zone is None:
+        utc = utc.dt.replace_time_zone("UTC")
+    else:
+        utc = utc.dt.convert_time_zone("UTC")
+    block = (
+        timestamps.unique()
+        .sort()
+        .to_frame()
+        .with_columns(utc.dt.cast_time_unit("us").alias("_utc"))
+    )
+
+    for values in series:
+        block = block.join_asof(
+            values,
+            left_on="_utc",
+            right_on=AVAILABLE_COL,
+            strategy="backward",
+            tolerance=tolerance,
+            check_sortedness=False,
+        ).drop(AVAILABLE_COL)
+
+    return block.drop("_utc")
+
+
+class MacroCache:
+    """
+    Disk cache of aligned macro blocks stored as Arrow IPC files.
+
+    A block is keyed by the fingerprints of its source files, the series specs
+    (lag, release time, columns) and the hash of the timestamps it is aligned
+    to, so a new bar range, a revised source file or a changed lag produces a
+    new entry. Hits are memory-mapped and refresh the file's modification time,
+    and the least recently used blocks are evicted once the cache grows past
+    `max_bytes`.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str | Path | None = None,
+        max_bytes: int = 1024**3,
+    ):
+        if cache_dir is None:
+            cache_dir = Path.cwd() / "data" / "cache" / "macro"
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+
+    def key(
+        self, timestamps: pl.Series, specs: list[dict], tolerance: str | None = None
+    ) -> str:
+        """Content address of an aligned block"""
+        params = {
+            "specs": [
+                {**spec, "path": source_fingerprint(spec["path"])} for spec in specs
+            ],
+            "timestamps": str(timestamps.dtype),
+            "timestamps_hash": hashlib.sha256(
+                timestamps.unique().sort().dt.epoch("us").to_numpy().tobytes()
+            ).hexdigest(),
+            "tolerance": tolerance,
+        }
+        return hashlib.sha256(
+            json.dumps(params, sort_keys=True, default=str).encode()
+        ).hexdigest()
+
+    def align(
+        self,
+        timestamps: pl.Series,
+        specs: list[dict],
+        tolerance: str | None = None,
+    ) -> pl.DataFrame:
+        """
+        Return the aligned macro block for `timestamps`, computing and caching it
+        on a miss.
+
+        Args:
+            timestamps: Bar timestamps, e.g. `bars["timestamp"]`
+            specs: Keyword arguments of `read_macro_series`, one dict per series
+            tolerance: Expiry of stale values passed to `align_macro`
+
+        Returns:
+            Sorted unique timestamps with one column per series
+        """
+        key = self.key(timestamps, specs, tolerance)
+        path = self.cache_dir / f"{key}.arrow"
+
+        if path.exists():
+            logger.debug(f"Macro cache hit {key[:12]}")
+            os.utime(path)
+            return pl.read_ipc(path, memory_map=True)
+
+        logger.debug(f"Macro cache miss {key[:12]}")
+        series = [read_macro_series(**spec) for spec in specs]
+        block = align_macro(timestamps, series, tolerance=tolerance)
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_dir / f".{key}.{uuid.uuid4().hex}.tmp"
+        try:
+            block.write_ipc(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        self.evict()
+        return block
+
+    def evict(self) -> int:
+        """Evict least recently used blocks until the cache fits `max_bytes`"""
+        if not self.cache_dir.exists():
+            return 0
+
+        blocks = sorted(
+            ((path.stat(), path) for path in self.cache_dir.glob("*.arrow")),
+            key=lambda block: block[0].st_mtime,
+        )
+        total = sum(stat.st_size for stat, _ in blocks)
+
+        evicted = 0
+        for stat, path in blocks:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= stat.st_size
+            evicted += 1
+
+        if evicted:
+            logger.info(f"Evicted {evicted} macro cache blocks")
+        return evicted
+
+    def invalidate(self) -> int:
+        """Remove every cached block"""
+        removed = 0
+        for path in self.cache_dir.glob("*.arrow"):
+            path.unlink()
+            removed += 1
+        return removed
+
+
+def merge_macro(
+    bars: pl.DataFrame | pl.LazyFrame,
+    specs: list[dict],
+    timestamp_col: str = "timestamp",
+    tolerance: str | None = None,
+    cache: MacroCache | None = None,
+) -> pl.DataFrame | pl.LazyFrame:
+    """
+    Add point-in-time macro columns to long-format bars.
+
+    The macro block is aligned once on the unique bar timestamps (through
+    `cache` when given) and attached to every symbol with an equi-join on the
+    timestamp.
+
+    Parameters:
+    -----------
+    bars : pl.DataFrame | pl.LazyFrame
+        Long-format bars
+    specs : list[dict]
+        Keyword arguments of `read_macro_series`, one dict per series
+    timestamp_col : str
+        Name of the timestamp column (default: "timestamp")
+    tolerance : str | None
+        Expiry of stale values passed to `align_macro` (default: None)
+    cache : MacroCache | None
+        Cache for the aligned block (default: no caching)
+
+    Returns:
+    --------
+    pl.DataFrame | pl.LazyFrame
+        Bars with one extra column per series, eager if the input was eager and
+        lazy otherwise
+    """
+    is_lazy = isinstance(bars, pl.LazyFrame)
+    timestamps = bars.lazy().select(timestamp_col).unique().collect().to_series()
+
+    if cache is not None:
+        block = cache.align(timestamps, specs, tolerance=tolerance)
+    else:
+        series = [read_macro_series(**spec) for spec in specs]
+        block = align_macro(timestamps, series, tolerance=tolerance)
+
+    merged = bars.lazy().join(block.lazy(), on=timestamp_col, how="left")
+    return merged if is_lazy else merged.collect()
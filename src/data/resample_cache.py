@@ -0,0 +1,223 @@
+import hashlib
+import json
+import os
+import uuid
+from datetime import date, datetime
+from pathlib import Path
+
+import polars as pl
+
+from data.load_data import load_bars
+from data.market_calendar import SESSION_CALENDAR
+from logger.logging import get_logger
+
+logger = get_logger(__name__)  # Creates 'data.resample_cache'
+
+# Bytes read from the end of each parquet file, which covers the footer metadata
+FOOTER_BYTES = 64 * 1024
+
+
+def source_fingerprint(source: str | Path) -> str:
+    """
+    Fingerprint a parquet file or a directory of parquet files without reading
+    the data pages.
+
+    Each file contributes its relative path, size, modification time and the
+    trailing bytes holding the parquet footer (schema, row counts and row-group
+    statistics), so a rewritten file gets a new fingerprint.
+    """
+    source = Path(source)
+    files = sorted(source.rglob("*.parquet")) if source.is_dir() else [source]
+
+    digest = hashlib.sha256()
+    for path in files:
+        stat = path.stat()
+        relative = path.relative_to(source) if source.is_dir() else path.name
+        digest.update(f"{relative}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+        with open(path, "rb") as f:
+            f.seek(max(0, stat.st_size - FOOTER_BYTES))
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+class ResampleCache:
+    """
+    Disk cache of `resample_stock_bars` outputs stored as Arrow IPC files.
+
+    Entries are keyed by the source fingerprint plus every parameter that
+    changes the output (frequency, market-hours filter, timezone, column set and
+    any symbol/date selection). Each entry is a `<key>.arrow` file with a
+    `<key>.json` sidecar describing it. Hits refresh the file's modification
+    time, and the least recently used entries are evicted once the cache grows
+    past `max_bytes`.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str | Path | None = None,
+        max_bytes: int = 5 * 1024**3,
+    ):
+        if cache_dir is None:
+            cache_dir = Path.cwd() / "data" / "cache" / "resampled"
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+
+    def key(
+        self,
+        source: str | Path,
+        freq: str,
+        symbols: list[str] | None = None,
+        start: str | date | datetime | None = None,
+        end: str | date | datetime | None = None,
+        timestamp_col: str = "timestamp",
+        symbol_col: str = "symbol",
+        market_hours_only: bool = True,
+        timezone: str = "UTC",
+        clean: bool = False,
+    ) -> str:
+        """Content address of a resample request"""
+        columns = pl.scan_parquet(source).collect_schema().names()
+
+        params = {
+            "source": source_fingerprint(source),
+            "columns": sorted(columns),
+            "freq": freq,
+            "symbols": sorted(symbols) if symbols is not None else None,
+            "start": str(start) if start is not None else None,
+            "end": str(end) if end is not None else None,
+            "timestamp_col": timestamp_col,
+            "symbol_col": symbol_col,
+            "market_hours_only": market_hours_only,
+            "calendar": SESSION_CALENDAR if market_hours_only else None,
+            "timezone": timezone,
+            "clean": clean,
+        }
+        return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+    def resample(
+        self,
+        source: str | Path,
+        freq: str,
+        symbols: list[str] | None = None,
+        start: str | date | datetime | None = None,
+        end: str | date | datetime | None = None,
+        timestamp_col: str = "timestamp",
+        symbol_col: str = "symbol",
+        market_hours_only: bool = True,
+        timezone: str = "UTC",
+        clean: bool = False,
+    ) -> pl.DataFrame:
+        """
+        Return resampled bars for `source`, computing and caching them on a miss.
+
+        Args:
+            source: Parquet file or directory of parquet files with raw bars
+            freq: Target frequency passed to `resample_stock_bars`
+            symbols: Symbols to keep (default: all symbols)
+            start: Inclusive lower bound on the timestamp
+            end: Exclusive upper bound on the timestamp
+            timestamp_col: Name of the timestamp column
+            symbol_col: Name of the symbol column
+            market_hours_only: If True, only use market hours data for resampling
+            timezone: Target timezone for the output data
+            clean: If True, clean the raw bars with `clean_bars` before resampling
+
+        Returns:
+            Resampled DataFrame
+        """
+        kwargs = {
+            "symbols": symbols,
+            "start": start,
+            "end": end,
+            "timestamp_col": timestamp_col,
+            "symbol_col": symbol_col,
+            "market_hours_only": market_hours_only,
+            "timezone": timezone,
+            "clean": clean,
+        }
+        key = self.key(source, freq, **kwargs)
+        path = self.cache_dir / f"{key}.arrow"
+
+        if path.exists():
+            logger.debug(f"Resample cache hit {key[:12]} ({source}, {freq})")
+            os.utime(path)
+            return pl.read_ipc(path, memory_map=True)
+
+        logger.debug(f"Resample cache miss {key[:12]} ({source}, {freq})")
+        df = load_bars(source, freq=freq, **kwargs).collect(engine="streaming")
+
+        self._write_entry(df, key, source=source, freq=freq, **kwargs)
+        self.evict()
+        return df
+
+    def _write_entry(self, df: pl.DataFrame, key: str, **meta) -> None:
+        """Atomically write the Arrow file and its metadata sidecar"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self.cache_dir / f"{key}.arrow"
+        tmp_path = self.cache_dir / f".{key}.{uuid.uuid4().hex}.tmp"
+        try:
+            df.write_ipc(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+        meta["source"] = str(Path(meta["source"]).resolve())
+        with open(self.cache_dir / f"{key}.json", "w") as f:
+            json.dump(meta, f, default=str)
+
+    def entries(self) -> list[dict]:
+        """Metadata for every cached entry, least recently used first"""
+        if not self.cache_dir.exists():
+            return []
+
+        entries = []
+        for path in self.cache_dir.glob("*.arrow"):
+            stat = path.stat()
+            meta_path = path.with_suffix(".json")
+            meta = json.loads(meta_path.read_text()) if meta_path.exists() else {}
+            meta.update(
+                key=path.stem, path=path, bytes=stat.st_size, atime=stat.st_mtime
+            )
+            entries.append(meta)
+        return sorted(entries, key=lambda entry: entry["atime"])
+
+    def evict(self) -> int:
+        """Evict least recently used entries until the cache fits `max_bytes`"""
+        entries = self.entries()
+        total = sum(entry["bytes"] for entry in entries)
+
+        evicted = 0
+        for entry in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(entry["key"])
+            total -= entry["bytes"]
+            evicted += 1
+
+        if evicted:
+            logger.info(f"Evicted {evicted} resample cache entries")
+        return evicted
+
+    def invalidate(self, source: str | Path | None = None) -> int:
+        """
+        Remove cached entries.
+
+        Args:
+            source: Only remove entries computed from this source, or every entry
+                    if None
+
+        Returns:
+            Number of entries removed
+        """
+        resolved = str(Path(source).resolve()) if source is not None else None
+
+        removed = 0
+        for entry in self.entries():
+            if resolved is None or entry.get("source") == resolved:
+                self._remove(entry["key"])
+                removed += 1
+        return removed
+
+    def _remove(self, key: str) -> None:
+        (self.cache_dir / f"{key}.arrow").unlink(missing_ok=True)
+        (self.cache_dir / f"{key}.json").unlink(missing_ok=True)
@@ -2,53 +2,88 @@ import re
 
 import polars as pl
 
+from data.market_calendar import (
+    attach_sessions,
+    bars_per_session,
+    intraday_frequency_us,
+    session_calendar,
+)
+
 
 # Calculate volatility window based on frequency
-def get_volatility_window(freq_str: str, vol_window_days: int) -> int:
-    """Convert volatility window from days to number of periods based on frequency"""
+def get_volatility_window(
+    freq_str: str, vol_window_days: int, sessions: pl.DataFrame | None = None
+) -> int:
+    """
+    Convert volatility window from trading days to number of periods based on
+    frequency, using the actual session lengths (early closes included) and
+    sessions per week of the NYSE calendar
+    """
     match = re.match(r"(\d+)([A-Za-z]+)", freq_str)
     if not match:
         return vol_window_days
 
     num = int(match.group(1))
     unit = match.group(2).lower()
+    sessions = session_calendar() if sessions is None else sessions
 
     if unit == "d":
         return vol_window_days
-    elif unit == "h":
-        hours_per_day = 6.5
-        total_hours = vol_window_days * hours_per_day
-        return int(total_hours / num)
+    elif unit in ["h", "m", "min"]:
+        if unit == "min":
+            freq_str = f"{num}m"
+        return int(vol_window_days * bars_per_session(freq_str, sessions))
     elif unit == "w":
-        return max(1, int(vol_window_days / 7))
-    elif unit in ["m", "min"]:
-        minutes_per_day = 6.5 * 60
-        total_minutes = vol_window_days * minutes_per_day
-        return int(total_minutes / num)
+        weeks = sessions["session"].dt.truncate("1w").n_unique()
+        return max(1, int(vol_window_days / (sessions.height / weeks) / num))
     else:
         return vol_window_days
 
 
+def _ohlcv_aggregations(timestamp_col: str = "timestamp") -> list[pl.Expr]:
+    """OHLCV aggregations for one (symbol, bucket) group, ordered by timestamp"""
+    return [
+        pl.col("open").sort_by(timestamp_col).first(),
+        pl.col("high").max(),
+        pl.col("low").min(),
+        pl.col("close").sort_by(timestamp_col).last(),
+        pl.col("volume").sum(),
+        pl.col("trade_count").sum(),
+        pl.col("vwap").mean(),
+    ]
+
+
 def resample_stock_bars(
-    df: pl.DataFrame,
+    df: pl.DataFrame | pl.LazyFrame,
     freq: str,
     timestamp_col: str = "timestamp",
     symbol_col: str = "symbol",
     volatility_window: int = 2,
     market_hours_only: bool = True,
     timezone: str = "UTC",
-) -> pl.DataFrame:
+    aggregations: list[pl.Expr] | None = None,
+) -> pl.DataFrame | pl.LazyFrame:
     """
     Resample stock bar data from minute/hourly to a specified frequency using Polars.
 
+    The bars are bucketed in a single group_by pass keyed on (symbol, truncated
+    timestamp). With `market_hours_only`, bars are matched to NYSE sessions from
+    `data.market_calendar`, so holidays, pre-market minutes and early closes are
+    excluded, and buckets follow the sessions: intraday buckets start at the
+    session open (9:30, 10:30, ... for '1h') and daily or longer buckets are
+    labelled with the session date. Passing a LazyFrame (e.g. from
+    `pl.scan_parquet`) returns a LazyFrame, which can be collected with
+    `engine="streaming"` to resample files larger than memory.
+
     Parameters:
     -----------
-    df : pl.DataFrame
+    df : pl.DataFrame | pl.LazyFrame
         DataFrame with stock bar data (must have timestamp and symbol columns)
     freq : str
         Target frequency for resampling. Examples:
         - '6h' for 6 hours
-        - '1d' or '24h' for daily
+        - '1d' for daily ('24h' is intraday: one bucket per session, labelled
+          with the session open instead of the session date)
         - '4h' for 4 hours
         - '1w' for weekly
     timestamp_col : str
@@ -58,69 +93,60 @@ def resample_stock_bars(
     volatility_window : int
         Frequency to calculate the volatility in days
     market_hours_only : bool
-        If True, only use market hours data for resampling (default: True)
+        If True, only use regular session data for resampling (default: True)
     timezone : str
         Target timezone for the output data (default: 'UTC')
+    aggregations : list[pl.Expr] | None
+        Extra per-bucket aggregations over the source bars, evaluated in the same
+        group_by as the OHLCV columns, e.g.
+        `factors.microstructure.intraday_aggregations()` (default: None)
 
     Returns:
     --------
-    pl.DataFrame
-        Resampled DataFrame with the same structure as input
+    pl.DataFrame | pl.LazyFrame
+        Resampled frame with the same structure as input, eager if the input was
+        eager and lazy otherwise
     """
+    is_lazy = isinstance(df, pl.LazyFrame)
+    lf = df.lazy()
 
     # Ensure timestamp is datetime and convert timezone
-    df = df.with_columns([pl.col(timestamp_col).dt.convert_time_zone(timezone)])
+    lf = lf.with_columns([pl.col(timestamp_col).dt.convert_time_zone(timezone)])
 
     # vol_window_periods = get_volatility_window(freq, volatility_window)
 
-    # Filter for market hours if requested
     if market_hours_only:
-        df = df.filter(
-            (pl.col(timestamp_col).dt.hour() >= 9)
-            & (pl.col(timestamp_col).dt.hour() < 16)  # Market closes at 4pm
-            & (pl.col(timestamp_col).dt.weekday() < 5)  # Monday=0, Friday=4
-        )
+        # Keep bars inside real NYSE sessions (holidays and early closes
+        # included) and bucket them by session: intraday buckets are anchored at
+        # the session open, longer buckets at the session date.
+        lf = attach_sessions(lf, timestamp_col)
+        time_unit = lf.collect_schema()[timestamp_col].time_unit
+        freq_us = intraday_frequency_us(freq)
+        if freq_us is not None:
+            offset_us = pl.col(timestamp_col).dt.epoch("us") - pl.col("session_open")
+            bucket = (
+                pl.from_epoch(
+                    pl.col("session_open") + offset_us // freq_us * freq_us,
+                    time_unit="us",
+                )
+                .dt.replace_time_zone("UTC")
+                .dt.convert_time_zone(timezone)
+            )
+        else:
+            bucket = (
+                pl.col("session")
+                .cast(pl.Datetime("us"))
+                .dt.replace_time_zone(timezone)
+                .dt.truncate(freq)
+            )
+        bucket = bucket.dt.cast_time_unit(time_unit)
+    else:
+        bucket = pl.col(timestamp_col).dt.truncate(freq)
 
-    # Resample using group_by_dynamic per symbol
-    resampled = (
-        df.sort([symbol_col, timestamp_col])
-        .group_by(symbol_col)
-        .agg(
-            [
-                pl.col(timestamp_col).dt.truncate(freq).alias(timestamp_col),
-                pl.col("open"),
-                pl.col("high"),
-                pl.col("low"),
-                pl.col("close"),
-                pl.col("volume"),
-                pl.col("trade_count"),
-                pl.col("vwap"),
-            ]
-        )
-        .explode(
-            [
-                timestamp_col,
-                "open",
-                "high",
-                "low",
-                "close",
-                "volume",
-                "trade_count",
-                "vwap",
-            ]
-        )
-        .group_by([symbol_col, timestamp_col])
-        .agg(
-            [
-                pl.col("open").first(),
-                pl.col("high").max(),
-                pl.col("low").min(),
-                pl.col("close").last(),
-                pl.col("volume").sum(),
-                pl.col("trade_count").sum(),
-                pl.col("vwap").mean(),
-            ]
-        )
+    # Single pass: bucket every bar by (symbol, bucket). Open/close are ordered
+    # within each bucket, so the input does not need a global sort.
+    resampled = lf.group_by([symbol_col, bucket.alias(timestamp_col)]).agg(
+        _ohlcv_aggregations(timestamp_col) + (aggregations or [])
     )
 
     # Calculate returns and volatility per symbol
@@ -149,4 +175,4 @@ def resample_stock_bars(
         #     .sort([timestamp_col, symbol_col])
     )
 
-    return resampled
+    return resampled if is_lazy else resampled.collect()
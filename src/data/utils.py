@@ -0,0 +1,142 @@
+import json
+import os
+import shutil
+import uuid
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+
+PANEL_FIELDS = ["open", "high", "low", "close", "volume", "trade_count", "vwap"]
+
+
+def write_panel(
+    df: pl.DataFrame,
+    path: str | Path,
+    fields: list[str] | None = None,
+    timestamp_col: str = "timestamp",
+    symbol_col: str = "symbol",
+) -> Path:
+    """
+    Write long-format bars as an aligned (time × symbol) panel of `.npy` blocks.
+
+    The panel directory holds one float64 `<field>.npy` block per field, with NaN
+    where a symbol has no bar, plus `timestamps.npy` (UTC datetime64[us]),
+    `symbols.npy` and a `meta.json` sidecar. Blocks are filled through
+    `np.lib.format.open_memmap`, so only one field is materialised at a time, and
+    the finished directory is swapped into place with a rename.
+
+    Parameters:
+    -----------
+    df : pl.DataFrame
+        Long-format bars with symbol, timestamp and field columns
+    path : str | Path
+        Output panel directory
+    fields : list[str] | None
+        Fields to store (default: OHLCV, trade_count and vwap)
+    timestamp_col : str
+        Name of the timestamp column (default: "timestamp")
+    symbol_col : str
+        Name of the symbol column (default: "symbol")
+
+    Returns:
+    --------
+    Path
+        The panel directory
+    """
+    path = Path(path)
+    fields = PANEL_FIELDS if fields is None else fields
+
+    time_zone = getattr(df.schema[timestamp_col], "time_zone", None)
+    timestamps = df[timestamp_col].unique().sort()
+    symbols = df[symbol_col].unique().sort()
+
+    # Row/column position of every bar in the panel
+    positions = df.select(
+        timestamps.search_sorted(df[timestamp_col]).alias("row"),
+        symbols.search_sorted(df[symbol_col]).alias("col"),
+    )
+    rows = positions["row"].to_numpy()
+    cols = positions["col"].to_numpy()
+    shape = (len(timestamps), len(symbols))
+
+    tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    old_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.old")
+    tmp_path.mkdir(parents=True)
+    try:
+        for field in fields:
+            block = np.lib.format.open_memmap(
+                tmp_path / f"{field}.npy", mode="w+", dtype=np.float64, shape=shape
+            )
+            block[:] = np.nan
+            block[rows, cols] = df[field].cast(pl.Float64).to_numpy()
+            block.flush()
+            del block
+
+        utc_timestamps = timestamps
+        if time_zone is not None:
+            utc_timestamps = timestamps.dt.convert_time_zone("UTC")
+        np.save(
+            tmp_path / "timestamps.npy",
+            utc_timestamps.dt.replace_time_zone(None)
+            .dt.cast_time_unit("us")
+            .to_numpy(),
+        )
+        np.save(tmp_path / "symbols.npy", symbols.to_numpy().astype(str))
+
+        meta = {"fields": fields, "shape": list(shape), "time_zone": time_zone}
+        with open(tmp_path / "meta.json", "w") as f:
+            json.dump(meta, f)
+
+        # Move the old panel aside before swapping the new one in, so the path is
+        # only missing between two renames and the old blocks are deleted last
+        # (readers that already memory-mapped them keep their pages)
+        if path.exists():
+            os.replace(path, old_path)
+        os.replace(tmp_path, path)
+    finally:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        if old_path.exists() and not path.exists():
+            os.replace(old_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+
+    return path
+
+
+def load_panel(
+    path: str | Path, fields: list[str] | None = None, mmap_mode: str | None = "r"
+) -> dict:
+    """
+    Open a panel written by `write_panel`.
+
+    With the default `mmap_mode="r"` nothing is read up front: each field is a
+    read-only `np.memmap`, so several processes opening the same panel share its
+    pages through the OS page cache.
+
+    Parameters:
+    -----------
+    path : str | Path
+        Panel directory
+    fields : list[str] | None
+        Fields to open (default: every stored field)
+    mmap_mode : str | None
+        Passed to `np.load`; None reads the blocks into memory (default: 'r')
+
+    Returns:
+    --------
+    dict
+        `timestamps` (UTC datetime64[us]), `symbols`, `time_zone` and one
+        (time × symbol) array per field
+    """
+    path = Path(path)
+    with open(path / "meta.json") as f:
+        meta = json.load(f)
+
+    panel = {
+        "timestamps": np.load(path / "timestamps.npy"),
+        "symbols": np.load(path / "symbols.npy"),
+        "time_zone": meta["time_zone"],
+    }
+    for field in meta["fields"] if fields is None else fields:
+        panel[field] = np.load(path / f"{field}.npy", mmap_mode=mmap_mode)
+    return panel
@@ -0,0 +1,114 @@
+import polars as pl
+
+# Trading days per year used to annualize daily factors
+PERIODS_PER_YEAR = 252
+
+
+def log_return_expr(price: pl.Expr) -> pl.Expr:
+    """Bar-over-bar log return of one symbol's prices"""
+    return price.log().diff()
+
+
+def log_returns(price_col: str = "close", symbol_col: str = "symbol") -> pl.Expr:
+    """Bar-over-bar log return of `price_col` within each symbol"""
+    return log_return_expr(pl.col(price_col)).over(symbol_col)
+
+
+def factor_frame(
+    df: pl.DataFrame | pl.LazyFrame,
+    factors: dict[str, pl.Expr],
+    timestamp_col: str = "timestamp",
+    symbol_col: str = "symbol",
+) -> pl.DataFrame | pl.LazyFrame:
+    """
+    Evaluate factor expressions over every symbol and bar in one lazy plan.
+
+    The bars are sorted once by (symbol, timestamp), so windowed expressions
+    ending in `.over(symbol_col)` see each symbol's history in time order.
+
+    Parameters:
+    -----------
+    df : pl.DataFrame | pl.LazyFrame
+        Long-format bars
+    factors : dict[str, pl.Expr]
+        Output column name to factor expression
+    timestamp_col : str
+        Name of the timestamp column (default: "timestamp")
+    symbol_col : str
+        Name of the symbol column (default: "symbol")
+
+    Returns:
+    --------
+    pl.DataFrame | pl.LazyFrame
+        `timestamp`, `symbol` and one column per factor, eager if the input was
+        eager and lazy otherwise
+    """
+    is_lazy = isinstance(df, pl.LazyFrame)
+    lf = (
+        df.lazy()
+        .sort([symbol_col, timestamp_col])
+        .select(
+            timestamp_col,
+            symbol_col,
+            *[expr.alias(name) for name, expr in factors.items()],
+        )
+    )
+    return lf if is_lazy else lf.collect()
+
+
+def join_point_in_time(
+    df: pl.DataFrame | pl.LazyFrame,
+    fundamentals: pl.DataFrame | pl.LazyFrame,
+    columns: list[str],
+    available_col: str = "available_at",
+    timestamp_col: str = "timestamp",
+    symbol_col: str = "symbol",
+) -> pl.LazyFrame:
+    """
+    Attach the fundamentals known at each bar with a backward as-of join per
+    symbol on the moment each report became public, so no bar sees a figure
+    before its release.
+
+    Parameters:
+    -----------
+    df : pl.DataFrame | pl.LazyFrame
+        Long-format bars
+    fundamentals : pl.DataFrame | pl.LazyFrame
+        One row per (symbol, report) with `available_col` and `columns`
+    columns : list[str]
+        Fundamental columns to attach
+    available_col : str
+        Publication timestamp of each report (default: "available_at")
+    timestamp_col : str
+        Name of the timestamp column (default: "timestamp")
+    symbol_col : str
+        Name of the symbol column (default: "symbol")
+
+    Returns:
+    --------
+    pl.LazyFrame
+        Bars with `columns` added, sorted by timestamp
+    """
+    timestamp_dtype = df.lazy().collect_schema()[timestamp_col]
+    reports = (
+        fundamentals.lazy()
+        .select(
+            pl.col(symbol_col),
+            pl.col(available_col).cast(timestamp_dtype),
+            *columns,
+        )
+        .sort(available_col)
+    )
+    return (
+        df.lazy()
+        .sort(timestamp_col)
+        .join_asof(
+            reports,
+            left_on=timestamp_col,
+            right_on=available_col,
+            by=symbol_col,
+            strategy="backward",
+            check_sortedness=False,
+        )
+        .drop(available_col)
+    )
@@ -0,0 +1,323 @@
+from datetime import date, datetime
+from pathlib import Path
+
+import polars as pl
+
+from data.load_data import load_bars
+from factors.common import factor_frame, log_returns
+
+
+def amihud_illiquidity(
+    df: pl.DataFrame | pl.LazyFrame,
+    window: int = 21,
+    price_col: str = "close",
+    name: str | None = None,
+    timestamp_col: str = "timestamp",
+    symbol_col: str = "symbol",
+) -> pl.DataFrame | pl.LazyFrame:
+    """
+    Amihud illiquidity: mean absolute return per million dollars traded over
+    `window` bars.
+
+    Parameters:
+    -----------
+    df : pl.DataFrame | pl.LazyFrame
+        Long-format bars with `volume`
+    window : int
+        Lookback in bars (default: 21)
+    price_col : str
+        Price column (default: "close")
+    name : str | None
+        Output column (default: "amihud_<window>")
+    timestamp_col : str
+        Name of the timestamp column (default: "timestamp")
+    symbol_col : str
+        Name of the symbol column (default: "symbol")
+
+    Returns:
+    --------
+    pl.DataFrame | pl.LazyFrame
+        (timestamp, symbol, factor) table, eager if the input was eager
+    """
+    dollar_volume = pl.col(price_col) * pl.col("volume")
+    impact = log_returns(price_col, symbol_col).abs() / dollar_volume * 1e6
+    factor = impact.rolling_mean(window).over(symbol_col)
+    return factor_frame(
+        df,
+        {name or f"amihud_{window}": factor},
+        timestamp_col=timestamp_col,
+        symbol_col=symbol_col,
+    )
+
+
+def vwap_deviation_expr(close: pl.Expr, vwap: pl.Expr, window: int = 5) -> pl.Expr:
+    """Mean premium of one symbol's closes over their VWAP across `window` bars"""
+    return (close / vwap - 1.0).rolling_mean(window)
+
+
+def abnormal_volume_expr(volume: pl.Expr, window: int = 21) -> pl.Expr:
+    """Log ratio of one symbol's volume to its mean over the previous `window` bars"""
+    return (volume / volume.rolling_mean(window).shift(1)).log()
+
+
+def vwap_deviation(
+    df: pl.DataFrame | pl.LazyFrame,
+    window: int = 5,
+    name: str | None = None,
+    timestamp_col: str = "timestamp",
+    symbol_col: str = "symbol",
+) -> pl.DataFrame | pl.LazyFrame:
+    """
+    Mean premium of the close over the bar's VWAP across `window` bars;
+    persistent closes above VWAP indicate buying pressure into the close.
+
+    Parameters:
+    -----------
+    df : pl.DataFrame | pl.LazyFrame
+        Long-format bars with `close` and `vwap`
+    window : int
+        Lookback in bars (default: 5)
+    name : str | None
+        Output column (default: "vwap_deviation_<window>")
+    timestamp_col : str
+        Name of the timestamp column (default: "timestamp")
+    symbol_col : str
+        Name of the symbol column (default: "symbol")
+
+    Returns:
+    --------
+    pl.DataFrame | pl.LazyFrame
+        (timestamp, symbol, factor) table, eager if the input was eager
+    """
+    factor = vwap_deviation_expr(pl.col("close"), pl.col("vwap"), window).over(
+        symbol_col
+    )
+    return factor_frame(
+        df,
+        {name or f"vwap_deviation_{window}": factor},
+        timestamp_col=timestamp_col,
+        symbol_col=symbol_col,
+    )
+
+
+def average_trade_size(
+    df: pl.DataFrame | pl.LazyFrame,
+    window: int = 21,
+    name: str | None = None,
+    timestamp_col: str = "timestamp",
+    symbol_col: str = "symbol",
+) -> pl.DataFrame | pl.LazyFrame:
+    """
+    Shares per trade over `window` bars (total volume over total trade count),
+    a proxy for the share of institutional flow.
+
+    Parameters:
+    -----------
+    df : pl.DataFrame | pl.LazyFrame
+        Long-format bars with `volume` and `trade_count`
+    window : int
+        Lookback in bars (default: 21)
+    name : str | None
+        Output column (default: "trade_size_<window>")
+    timestamp_col : str
+        Name of the timestamp column (default: "timestamp")
+    symbol_col : str
+        Name of the symbol column (default: "symbol")
+
+    Returns:
+    --------
+    pl.DataFrame | pl.LazyFrame
+        (timestamp, symbol, factor) table, eager if the input was eager
+    """
+    factor = (
+        pl.col("volume").rolling_sum(window) / pl.col("trade_count").rolling_sum(window)
+    ).over(symbol_col)
+    return factor_frame(
+        df,
+        {name or f"trade_size_{window}": factor},
+        timestamp_col=timestamp_col,
+        symbol_col=symbol_col,
+    )
+
+
+def abnormal_volume(
+    df: pl.DataFrame | pl.LazyFrame,
+    window: int = 21,
+    name: str | None = None,
+    timestamp_col: str = "timestamp",
+    symbol_col: str = "symbol",
+) -> pl.DataFrame | pl.LazyFrame:
+    """
+    Log ratio of the bar's volume to its average over the previous `window`
+    bars.
+
+    Parameters:
+    -----------
+    df : pl.DataFrame | pl.LazyFrame
+        Long-format bars with `volume`
+    window : int
+        Lookback in bars (default: 21)
+    name : str | None
+        Output column (default: "abnormal_volume_<window>")
+    timestamp_col : str
+        Name of the timestamp column (default: "timestamp")
+    symbol_col : str
+        Name of the symbol column (default: "symbol")
+
+    Returns:
+    --------
+    pl.DataFrame | pl.LazyFrame
+        (timestamp, symbol, factor) table, eager if the input was eager
+    """
+    factor = abnormal_volume_expr(pl.col("volume"), window).over(symbol_col)
+    return factor_frame(
+        df,
+        {name or f"abnormal_volume_{window}": factor},
+        timestamp_col=timestamp_col,
+        symbol_col=symbol_col,
+    )
+
+
+# Intraday features added to each resampled bar by `intraday_aggregations`
+INTRADAY_FEATURES = [
+    "intraday_vwap_deviation",
+    "intraday_amihud",
+    "intraday_trade_size",
+    "realized_variance",
+    "roll_spread",
+    "corwin_schultz_spread",
+]
+
+# 3 - 2·sqrt(2) from the Corwin-Schultz (2012) high-low spread estimator
+_CS_DENOMINATOR = 3.0 - 2.0 * 2.0**0.5
+
+
+def intraday_aggregations(timestamp_col: str = "timestamp") -> list[pl.Expr]:
+    """
+    Microstructure features of the source bars inside each resampled bar, as
+    aggregations for `resample_stock_bars(..., aggregations=...)` so they are
+    computed in the same group_by as the OHLCV columns, from one scan of the
+    minute file.
+
+    Every feature only uses bars of its own bucket, ordered by timestamp:
+
+    - `intraday_vwap_deviation`: last close over the volume-weighted VWAP, minus 1
+    - `intraday_amihud`: mean absolute log return per million dollars traded
+    - `intraday_trade_size`: shares per trade
+    - `realized_variance`: sum of squared log returns
+    - `roll_spread`: Roll (1984) relative spread, 2·sqrt(-cov(r_t, r_t-1)),
+      zero when the autocovariance is positive
+    - `corwin_schultz_spread`: mean Corwin-Schultz (2012) relative spread over
+      pairs of consecutive bars, negative estimates set to zero
+
+    Parameters:
+    -----------
+    timestamp_col : str
+        Name of the timestamp column (default: "timestamp")
+
+    Returns:
+    --------
+    list[pl.Expr]
+        One aggregation per name in `INTRADAY_FEATURES`
+    """
+
+    def ordered(col: str) -> pl.Expr:
+        return pl.col(col).sort_by(timestamp_col)
+
+    close, high, low, volume = (ordered(c) for c in ("close", "high", "low", "volume"))
+    returns = close.log().diff()
+    dollar_volume = close * volume
+
+    vwap = (pl.col("vwap") * pl.col("volume")).sum() / pl.col("volume").sum()
+    trade_count = pl.col("trade_count").sum()
+    impact = pl.when(dollar_volume > 0).then(returns.abs() / dollar_volume * 1e6)
+    autocov = pl.cov(returns, returns.shift(1))
+
+    # Two-bar high-low estimator: beta sums the squared log ranges of bars t and
+    # t+1, gamma is the squared log range of the two bars combined
+    beta = (high / low).log() ** 2 + (high.shift(-1) / low.shift(-1)).log() ** 2
+    gamma = (
+        pl.max_horizontal(high, high.shift(-1)) / pl.min_horizontal(low, low.shift(-1))
+    ).log() ** 2
+    alpha = ((2.0 * beta).sqrt() - beta.sqrt()) / _CS_DENOMINATOR - (
+        gamma / _CS_DENOMINATOR
+    ).sqrt()
+    corwin_schultz = 2.0 * (alpha.exp() - 1.0) / (1.0 + alpha.exp())
+
+    return [
+        (close.last() / vwap - 1.0).alias("intraday_vwap_deviation"),
+        impact.mean().alias("intraday_amihud"),
+        pl.when(trade_count > 0)
+        .then(pl.col("volume").sum() / trade_count)
+        .alias("intraday_trade_size"),
+        (returns**2).sum().alias("realized_variance"),
+        (2.0 * (-autocov).clip(lower_bound=0.0).sqrt()).alias("roll_spread"),
+        corwin_schultz.clip(lower_bound=0.0).mean().alias("corwin_schultz_spread"),
+    ]
+
+
+def load_microstructure_bars(
+    source: str | Path | pl.LazyFrame,
+    freq: str = "1d",
+    symbols: list[str] | None = None,
+    start: str | date | datetime | None = None,
+    end: str | date | datetime | None = None,
+    timestamp_col: str = "timestamp",
+    symbol_col: str = "symbol",
+    market_hours_only: bool = True,
+    timezone: str = "UTC",
+    clean: bool = False,
+) -> pl.LazyFrame:
+    """
+    Lazily resample minute bars to `freq` with the `INTRADAY_FEATURES` columns
+    added, reading the source once. The rolling factors above (e.g.
+    `amihud_illiquidity`) or a `FactorGraph` node can then smooth the features
+    across bars.
+
+    Example:
+    --------
+    >>> daily = load_microstructure_bars("data/raw/bars", freq="1d")
+    >>> df = daily.collect(engine="streaming")
+
+    Parameters:
+    -----------
+    source : str | Path | pl.LazyFrame
+        Parquet file, directory/glob of parquet files, or an existing LazyFrame
+        of minute bars with `trade_count` and `vwap`
+    freq : str
+        Target frequency (default: "1d")
+    symbols : list[str] | None
+        Symbols to keep (default: all symbols)
+    start : str | date | datetime | None
+        Inclusive lower bound on the timestamp (default: no lower bound)
+    end : str | date | datetime | None
+        Exclusive upper bound on the timestamp (default: no upper bound)
+    timestamp_col : str
+        Name of the timestamp column (default: "timestamp")
+    symbol_col : str
+        Name of the symbol column (default: "symbol")
+    market_hours_only : bool
+        If True, only use regular session bars (default: True)
+    timezone : str
+        Target timezone for the output data (default: 'UTC')
+    clean : bool
+        If True, run the minute bars through `clean_bars` first (default: False)
+
+    Returns:
+    --------
+    pl.LazyFrame
+        Resampled OHLCV bars with one column per intraday feature
+    """
+    return load_bars(
+        source,
+        symbols=symbols,
+        start=start,
+        end=end,
+        freq=freq,
+        timestamp_col=timestamp_col,
+        symbol_col=symbol_col,
+        market_hours_only=market_hours_only,
+        timezone=timezone,
+        clean=clean,
+        aggregations=intraday_aggregations(timestamp_col),
+    )
@@ -0,0 +1,184 @@
+import polars as pl
+
+from factors.common import factor_frame, log_returns
+
+
+def momentum_expr(price: pl.Expr, window: int = 252, skip: int = 21) -> pl.Expr:
+    """Return of one symbol's prices from `window` bars ago to `skip` bars ago"""
+    return price.shift(skip) / price.shift(window) - 1.0
+
+
+def reversal_expr(price: pl.Expr, window: int = 21) -> pl.Expr:
+    """Minus the return of one symbol's prices over the last `window` bars"""
+    return 1.0 - price / price.shift(window)
+
+
+def momentum(
+    df: pl.DataFrame | pl.LazyFrame,
+    window: int = 252,
+    skip: int = 21,
+    price_col: str = "close",
+    name: str | None = None,
+    timestamp_col: str = "timestamp",
+    symbol_col: str = "symbol",
+) -> pl.DataFrame | pl.LazyFrame:
+    """
+    Price momentum: return from `window` bars ago to `skip` bars ago, the
+    classic 12-1 month momentum with the defaults on daily bars. Skipping the
+    latest bars keeps short-term reversal out of the signal.
+
+    Parameters:
+    -----------
+    df : pl.DataFrame | pl.LazyFrame
+        Long-format bars
+    window : int
+        Formation period in bars (default: 252)
+    skip : int
+        Most recent bars left out (default: 21)
+    price_col : str
+        Price column (default: "close")
+    name : str | None
+        Output column (default: "momentum_<window>_<skip>")
+    timestamp_col : str
+        Name of the timestamp column (default: "timestamp")
+    symbol_col : str
+        Name of the symbol column (default: "symbol")
+
+    Returns:
+    --------
+    pl.DataFrame | pl.LazyFrame
+        (timestamp, symbol, factor) table, eager if the input was eager
+    """
+    factor = momentum_expr(pl.col(price_col), window, skip).over(symbol_col)
+    return factor_frame(
+        df,
+        {name or f"momentum_{window}_{skip}": factor},
+        timestamp_col=timestamp_col,
+        symbol_col=symbol_col,
+    )
+
+
+def short_term_reversal(
+    df: pl.DataFrame | pl.LazyFrame,
+    window: int = 21,
+    price_col: str = "close",
+    name: str | None = None,
+    timestamp_col: str = "timestamp",
+    symbol_col: str = "symbol",
+) -> pl.DataFrame | pl.LazyFrame:
+    """
+    Short-term reversal: minus the return over the last `window` bars, so
+    recent losers score high.
+
+    Parameters:
+    -----------
+    df : pl.DataFrame | pl.LazyFrame
+        Long-format bars
+    window : int
+        Lookback in bars (default: 21)
+    price_col : str
+        Price column (default: "close")
+    name : str | None
+        Output column (default: "reversal_<window>")
+    timestamp_col : str
+        Name of the timestamp column (default: "timestamp")
+    symbol_col : str
+        Name of the symbol column (default: "symbol")
+
+    Returns:
+    --------
+    pl.DataFrame | pl.LazyFrame
+        (timestamp, symbol, factor) table, eager if the input was eager
+    """
+    factor = reversal_expr(pl.col(price_col), window).over(symbol_col)
+    return factor_frame(
+        df,
+        {name or f"reversal_{window}": factor},
+        timestamp_col=timestamp_col,
+        symbol_col=symbol_col,
+    )
+
+
+def risk_adjusted_momentum(
+    df: pl.DataFrame | pl.LazyFrame,
+    window: int = 126,
+    price_col: str = "close",
+    name: str | None = None,
+    timestamp_col: str = "timestamp",
+    symbol_col: str = "symbol",
+) -> pl.DataFrame | pl.LazyFrame:
+    """
+    Sum of log returns over `window` bars divided by their standard deviation
+    times sqrt(window), i.e. the t-statistic of the trend.
+
+    Parameters:
+    -----------
+    df : pl.DataFrame | pl.LazyFrame
+        Long-format bars
+    window : int
+        Lookback in bars (default: 126)
+    price_col : str
+        Price column (default: "close")
+    name : str | None
+        Output column (default: "risk_adj_momentum_<window>")
+    timestamp_col : str
+        Name of the timestamp column (default: "timestamp")
+    symbol_col : str
+        Name of the symbol column (default: "symbol")
+
+    Returns:
+    --------
+    pl.DataFrame | pl.LazyFrame
+        (timestamp, symbol, factor) table, eager if the input was eager
+    """
+    returns = log_returns(price_col, symbol_col)
+    factor = (
+        returns.rolling_sum(window) / (returns.rolling_std(window) * window**0.5)
+    ).over(symbol_col)
+    return factor_frame(
+        df,
+        {name or f"risk_adj_momentum_{window}": factor},
+        timestamp_col=timestamp_col,
+        symbol_col=symbol_col,
+    )
+
+
+def trend(
+    df: pl.DataFrame | pl.LazyFrame,
+    window: int = 50,
+    price_col: str = "close",
+    name: str | None = None,
+    timestamp_col: str = "timestamp",
+    symbol_col: str = "symbol",
+) -> pl.DataFrame | pl.LazyFrame:
+    """
+    Distance of the price above its `window`-bar moving average.
+
+    Parameters:
+    -----------
+    df : pl.DataFrame | pl.LazyFrame
+        Long-format bars
+    window : int
+        Moving average length in bars (default: 50)
+    price_col : str
+        Price column (default: "close")
+    name : str | None
+        Output column (default: "trend_<window>")
+    timestamp_col : str
+        Name of the timestamp column (default: "timestamp")
+    symbol_col : str
+        Name of the symbol column (default: "symbol")
+
+    Returns:
+    --------
+    pl.DataFrame | pl.LazyFrame
+        (timestamp, symbol, factor) table, eager if the input was eager
+    """
+    price = pl.col(price_col)
+    factor = (price / price.rolling_mean(window) - 1.0).over(symbol_col)
+    return factor_frame(
+        df,
+        {name or f"trend_{window}": factor},
+        timestamp_col=timestamp_col,
+        symbol_col=symbol_col,
+    )
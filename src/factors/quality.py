@@ -0,0 +1,157 @@
+import polars as pl
+
+from factors.common import (
+    PERIODS_PER_YEAR,
+    factor_frame,
+    join_point_in_time,
+    log_returns,
+)
+
+
+def return_stability(
+    df: pl.DataFrame | pl.LazyFrame,
+    window: int = PERIODS_PER_YEAR,
+    price_col: str = "close",
+    periods_per_year: int = PERIODS_PER_YEAR,
+    name: str | None = None,
+    timestamp_col: str = "timestamp",
+    symbol_col: str = "symbol",
+) -> pl.DataFrame | pl.LazyFrame:
+    """
+    Annualized rolling Sharpe ratio of log returns, a price-based quality proxy
+    rewarding steady compounders over lottery-like names.
+
+    Parameters:
+    -----------
+    df : pl.DataFrame | pl.LazyFrame
+        Long-format bars
+    window : int
+        Lookback in bars (default: 252)
+    price_col : str
+        Price column (default: "close")
+    periods_per_year : int
+        Bars per year used to annualize (default: 252)
+    name : str | None
+        Output column (default: "return_stability_<window>")
+    timestamp_col : str
+        Name of the timestamp column (default: "timestamp")
+    symbol_col : str
+        Name of the symbol column (default: "symbol")
+
+    Returns:
+    --------
+    pl.DataFrame | pl.LazyFrame
+        (timestamp, symbol, factor) table, eager if the input was eager
+    """
+    returns = log_returns(price_col, symbol_col)
+    factor = (
+        returns.rolling_mean(window)
+        / returns.rolling_std(window)
+        * periods_per_year**0.5
+    ).over(symbol_col)
+    return factor_frame(
+        df,
+        {name or f"return_stability_{window}": factor},
+        timestamp_col=timestamp_col,
+        symbol_col=symbol_col,
+    )
+
+
+def positive_bar_ratio(
+    df: pl.DataFrame | pl.LazyFrame,
+    window: int = PERIODS_PER_YEAR,
+    price_col: str = "close",
+    name: str | None = None,
+    timestamp_col: str = "timestamp",
+    symbol_col: str = "symbol",
+) -> pl.DataFrame | pl.LazyFrame:
+    """
+    Fraction of the last `window` bars that closed up, a measure of how
+    consistently a trend was earned.
+
+    Parameters:
+    -----------
+    df : pl.DataFrame | pl.LazyFrame
+        Long-format bars
+    window : int
+        Lookback in bars (default: 252)
+    price_col : str
+        Price column (default: "close")
+    name : str | None
+        Output column (default: "positive_ratio_<window>")
+    timestamp_col : str
+        Name of the timestamp column (default: "timestamp")
+    symbol_col : str
+        Name of the symbol column (default: "symbol")
+
+    Returns:
+    --------
+    pl.DataFrame | pl.LazyFrame
+        (timestamp, symbol, factor) table, eager if the input was eager
+    """
+    up = (pl.col(price_col).diff() > 0).cast(pl.Float64)
+    factor = up.rolling_mean(window).over(symbol_col)
+    return factor_frame(
+        df,
+        {name or f"positive_ratio_{window}": factor},
+        timestamp_col=timestamp_col,
+        symbol_col=symbol_col,
+    )
+
+
+def fundamental_ratio(
+    df: pl.DataFrame | pl.LazyFrame,
+    fundamentals: pl.DataFrame | pl.LazyFrame,
+    numerator_col: str,
+    denominator_col: str,
+    name: str | None = None,
+    available_col: str = "available_at",
+    timestamp_col: str = "timestamp",
+    symbol_col: str = "symbol",
+) -> pl.DataFrame | pl.LazyFrame:
+    """
+    Ratio of two reported fundamentals as known at each bar, e.g. return on
+    equity (`net_income` / `total_equity`) or gross profitability
+    (`gross_profit` / `total_assets`).
+
+    Parameters:
+    -----------
+    df : pl.DataFrame | pl.LazyFrame
+        Long-format bars
+    fundamentals : pl.DataFrame | pl.LazyFrame
+        One row per (symbol, report) with `available_col` and both columns
+    numerator_col : str
+        Numerator column
+    denominator_col : str
+        Denominator column
+    name : str | None
+        Output column (default: "<numerator_col>_to_<denominator_col>")
+    available_col : str
+        Publication timestamp of each report (default: "available_at")
+    timestamp_col : str
+        Name of the timestamp column (default: "timestamp")
+    symbol_col : str
+        Name of the symbol column (default: "symbol")
+
+    Returns:
+    --------
+    pl.DataFrame | pl.LazyFrame
+        (timestamp, symbol, factor) table, eager if the input was eager
+    """
+    is_lazy = isinstance(df, pl.LazyFrame)
+    lf = join_point_in_time(
+        df.lazy().select(timestamp_col, symbol_col),
+        fundamentals,
+        [numerator_col, denominator_col],
+        available_col=available_col,
+        timestamp_col=timestamp_col,
+        symbol_col=symbol_col,
+    )
+    factor = pl.col(numerator_col) / pl.col(denominator_col)
+    result = factor_frame(
+        lf,
+        {name or f"{numerator_col}_to_{denominator_col}": factor},
+        timestamp_col=timestamp_col,
+        symbol_col=symbol_col,
+    )
+    return result if is_lazy else result.collect()
@@ -0,0 +1,650 @@
+import hashlib
+import json
+import os
+import uuid
+from collections.abc import Callable
+from graphlib import CycleError, TopologicalSorter
+from itertools import zip_longest
+from pathlib import Path
+
+import polars as pl
+import yaml
+
+from factors.common import PERIODS_PER_YEAR, log_return_expr
+from factors.microstructure import abnormal_volume_expr, vwap_deviation_expr
+from factors.momentum import momentum_expr, reversal_expr
+from factors.volatility import beta_expr, realized_volatility_expr
+from logger.logging import get_logger
+
+logger = get_logger(__name__)  # Creates 'factors.registry'
+
+# Node operations by name: builder of the expression, the column it is
+# partitioned by ("symbol", "timestamp" or None for row-wise operations) and the
+# rows of history it reads given its params
+OPS: dict[str, tuple[Callable[..., pl.Expr], str | None, Callable[..., int]]] = {}
+
+ROLLING_STATS = ["mean", "std", "var", "sum", "min", "max"]
+
+
+def register_op(
+    name: str, over: str | None = None, lookback: Callable[..., int] | None = None
+):
+    """
+    Register an expression builder as a graph operation.
+
+    The builder receives one `pl.Expr` per input (the bar column or upstream
+    node named in the config) plus the node's params as keyword arguments, and
+    returns the expression of one symbol's series; the graph adds the
+    `.over(symbol)` or `.over(timestamp)` partition given by `over`. `lookback`
+    maps the params to the number of earlier rows of the same symbol a value
+    reads (default: none), which sizes the history kept for incremental updates.
+    """
+    if over not in ("symbol", "timestamp", None):
+        raise ValueError(f"over must be 'symbol', 'timestamp' or None, got {over}")
+
+    def decorator(builder: Callable[..., pl.Expr]) -> Callable[..., pl.Expr]:
+        OPS[name] = (builder, over, lookback or (lambda **params: 0))
+        return builder
+
+    return decorator
+
+
+# Factor definitions live in the factor library (factors.common, momentum,
+# volatility, microstructure), which is authoritative: these ops register its
+# per-symbol expressions, so a graph node and the library function of the same
+# name compute the same values. The generic ops below compose new factors.
+register_op("log_return", over="symbol", lookback=lambda: 1)(log_return_expr)
+register_op(
+    "momentum",
+    over="symbol",
+    lookback=lambda window=252, skip=21: max(window, skip),
+)(momentum_expr)
+register_op("short_term_reversal", over="symbol", lookback=lambda window=21: window)(
+    reversal_expr
+)
+register_op(
+    "realized_volatility",
+    over="symbol",
+    lookback=lambda window=21, **params: window - 1,
+)(realized_volatility_expr)
+register_op("rolling_beta", over="symbol", lookback=lambda window: window - 1)(
+    beta_expr
+)
+register_op("vwap_deviation", over="symbol", lookback=lambda window=5: window - 1)(
+    vwap_deviation_expr
+)
+register_op("abnormal_volume", over="symbol", lookback=lambda window=21: window)(
+    abnormal_volume_expr
+)
+
+
+@register_op(
+    "pct_change", over="symbol", lookback=lambda window=1, skip=0: max(window, skip)
+)
+def _pct_change(price: pl.Expr, window: int = 1, skip: int = 0) -> pl.Expr:
+    """Return from `window` bars ago to `skip` bars ago"""
+    return price.shift(skip) / price.shift(window) - 1.0
+
+
+@register_op("rolling", over="symbol", lookback=lambda window, **params: window - 1)
+def _rolling(
+    x: pl.Expr, window: int, stat: str = "mean", annualize: bool = False
+) -> pl.Expr:
+    """
+    Rolling statistic over `window` bars; with `annualize`, standard deviations
+    are scaled by sqrt(252) and the other statistics by 252
+    """
+    if stat not in ROLLING_STATS:
+        raise ValueError(f"stat must be one of {ROLLING_STATS}, got {stat}")
+    expr = getattr(x, f"rolling_{stat}")(window)
+    if annualize:
+        expr = expr * (PERIODS_PER_YEAR**0.5 if stat == "std" else PERIODS_PER_YEAR)
+    return expr
+
+
+@register_op("zscore", over="symbol", lookback=lambda window, lag=0: window - 1 + lag)
+def _zscore(x: pl.Expr, window: int, lag: int = 0) -> pl.Expr:
+    """Deviation from the rolling mean in rolling standard deviations, with the
+    moments taken `lag` bars back so a bar can be scored against its past only"""
+    return (x - x.rolling_mean(window).shift(lag)) / x.rolling_std(window).shift(lag)
+
+
+@register_op("cross_sectional_mean", over="timestamp")
+def _cross_sectional_mean(x: pl.Expr) -> pl.Expr:
+    """Equal-weighted mean across the symbols of each bar"""
+    return x.mean()
+
+
+@register_op("ratio")
+def _ratio(
+    numerator: pl.Expr, denominator: pl.Expr, scale: float = 1.0, offset: float = 0.0
+) -> pl.Expr:
+    """`scale * numerator / denominator + offset`"""
+    return numerator / denominator * scale + offset
+
+
+@register_op("linear")
+def _linear(x: pl.Expr, scale: float = 1.0, offset: float = 0.0) -> pl.Expr:
+    """`scale * x + offset`"""
+    return x * scale + offset
+
+
+@register_op("clip")
+def _clip(
+    x: pl.Expr, lower: float | None = None, upper: float | None = None
+) -> pl.Expr:
+    """`x` bounded to [lower, upper]"""
+    return x.clip(lower, upper)
+
+
+def column_fingerprint(frame: pl.DataFrame, column: str) -> str:
+    """Order-sensitive digest of one column's values and dtype"""
+    digest = hashlib.sha256(f"{column}:{frame.schema[column]}".encode())
+    digest.update(frame[column].hash(seed=0).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+class FactorGraph:
+    """
+    Dependency graph of named factor intermediates, evaluated once per node and
+    cached on disk.
+
+    Every node applies a registered operation (see `OPS`) to inputs that are
+    either bar columns or other nodes, e.g. `log_return` feeds rolling
+    volatility, Sharpe-style ratios and market beta. Nodes are evaluated in
+    topological order on one frame sorted by (symbol, timestamp), each node
+    materialized as a column before its dependents read it, so a shared
+    intermediate is computed once however many factors use it.
+
+    Each node's output is stored as a `<key>.arrow` file whose key hashes the
+    operation, its params, the fingerprints of the bar columns it reads and the
+    keys of its input nodes. Changing one node's lookback therefore changes the
+    key of that node and its descendants only; every other node is read back
+    memory-mapped. New bars change every key, so hits refresh the file's
+    modification time and the least recently used entries are evicted once the
+    cache grows past `max_bytes`.
+    """
+
+    def __init__(
+        self,
+        nodes: dict[str, dict],
+        outputs: list[str] | None = None,
+        cache_dir: str | Path | None = None,
+        timestamp_col: str = "timestamp",
+        symbol_col: str = "symbol",
+        max_bytes: int = 5 * 1024**3,
+    ):
+        if cache_dir is None:
+            cache_dir = Path.cwd() / "data" / "cache" / "factors"
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.timestamp_col = timestamp_col
+        self.symbol_col = symbol_col
+
+        self.nodes = {}
+        for name, spec in nodes.items():
+            if spec.get("op") not in OPS:
+                raise ValueError(f"Unknown op {spec.get('op')!r} for node {name!r}")
+            self.nodes[name] = {
+                "op": spec["op"],
+                "inputs": dict(spec.get("inputs") or {}),
+                "params": dict(spec.get("params") or {}),
+            }
+        self.outputs = list(self.nodes) if outputs is None else list(outputs)
+
+        unknown = [name for name in self.outputs if name not in self.nodes]
+        if unknown:
+            raise ValueError(f"Outputs {unknown} are not nodes of the graph")
+        try:
+            self.order = list(TopologicalSorter(self.dependencies()).static_order())
+        except CycleError as e:
+            raise ValueError(f"Factor graph has a cycle: {e.args[1]}") from e
+
+    @classmethod
+    def from_config(
+        cls,
+        config_path: str | Path | None = None,
+        cache_dir: str | Path | None = None,
+        timestamp_col: str = "timestamp",
+        symbol_col: str = "symbol",
+        max_bytes: int = 5 * 1024**3,
+    ) -> "FactorGraph":
+        """
+        Build the graph from a YAML file with `intermediates` and `factors`
+        sections mapping node names to `op`, `inputs` and `params`. Both
+        sections are nodes; the factors are the default outputs.
+
+        Parameters:
+        -----------
+        config_path : str | Path | None
+            Config file (default: config/factors.yaml under the working directory)
+        cache_dir : str | Path | None
+            Node cache (default: data/cache/factors under the working directory)
+        timestamp_col : str
+            Name of the timestamp column (default: "timestamp")
+        symbol_col : str
+            Name of the symbol column (default: "symbol")
+        max_bytes : int
+            Size above which least recently used nodes are evicted (default: 5 GiB)
+
+        Returns:
+        --------
+        FactorGraph
+        """
+        if config_path is None:
+            config_path = Path.cwd() / "config" / "factors.yaml"
+        with open(config_path, "r") as f:
+            config = yaml.safe_load(f) or {}
+
+        intermediates = config.get("intermediates") or {}
+        factors = config.get("factors") or {}
+        duplicated = sorted(set(intermediates) & set(factors))
+        if duplicated:
+            raise ValueError(f"Nodes defined twice in {config_path}: {duplicated}")
+
+        return cls(
+            {**intermediates, **factors},
+            outputs=list(factors),
+            cache_dir=cache_dir,
+            timestamp_col=timestamp_col,
+            symbol_col=symbol_col,
+            max_bytes=max_bytes,
+        )
+
+    def dependencies(self) -> dict[str, set[str]]:
+        """Upstream nodes of every node (bar columns are not listed)"""
+        return {
+            name: {source for source in spec["inputs"].values() if source in self.nodes}
+            for name, spec in self.nodes.items()
+        }
+
+    def ancestors(self, names: list[str]) -> list[str]:
+        """`names` and every node they depend on, in evaluation order"""
+        dependencies = self.dependencies()
+        needed, stack = set(), list(names)
+        while stack:
+            name = stack.pop()
+            if name not in needed:
+                needed.add(name)
+                stack.extend(dependencies[name])
+        return [name for name in self.order if name in needed]
+
+    def keys(self, frame: pl.DataFrame, names: list[str]) -> dict[str, str]:
+        """
+        Cache key of `names` and their ancestors for bars `frame` sorted by
+        (symbol, timestamp)
+        """
+        fingerprints, keys = {}, {}
+
+        def source_key(source: str) -> str:
+            if source in self.nodes:
+                return keys[source]
+            if source not in frame.columns:
+                raise ValueError(f"Input {source!r} is neither a node nor a column")
+            if source not in fingerprints:
+                fingerprints[source] = column_fingerprint(frame, source)
+            return fingerprints[source]
+
+        index = [source_key(self.symbol_col), source_key(self.timestamp_col)]
+        for name in self.ancestors(names):
+            spec = self.nodes[name]
+            params = {
+                "op": spec["op"],
+                "params": spec["params"],
+                "inputs": {
+                    arg: source_key(source) for arg, source in spec["inputs"].items()
+                },
+                "index": index,
+                "polars": pl.__version__,
+            }
+            keys[name] = hashlib.sha256(
+                json.dumps(params, sort_keys=True, default=str).encode()
+            ).hexdigest()
+        return keys
+
+    def expression(self, name: str) -> pl.Expr:
+        """Expression of node `name` over the columns of its inputs"""
+        spec = self.nodes[name]
+        builder, over, _ = OPS[spec["op"]]
+        inputs = {arg: pl.col(source) for arg, source in spec["inputs"].items()}
+        expr = builder(**inputs, **spec["params"])
+        if over == "symbol":
+            expr = expr.over(self.symbol_col)
+        elif over == "timestamp":
+            expr = expr.over(self.timestamp_col)
+        return expr.alias(name)
+
+    def columns(self, names: list[str]) -> list[str]:
+        """Bar columns read by `names` and their ancestors"""
+        return sorted(
+            {
+                source
+                for name in self.ancestors(names)
+                for source in self.nodes[name]["inputs"].values()
+                if source not in self.nodes
+            }
+        )
+
+    def lookback(self, names: list[str]) -> list[int]:
+        """
+        History needed to evaluate `names` at a new bar, one entry per level of
+        cross-sectional (per-timestamp) operations on a path: the first is the
+        most earlier rows of the new bar's symbol read before reaching such an
+        operation, the next the most earlier rows every symbol it reads needs
+        below it, and so on
+        """
+        levels = {}
+        for name in self.ancestors(names):
+            spec = self.nodes[name]
+            _, over, lookback = OPS[spec["op"]]
+            upstream = [levels[s] for s in spec["inputs"].values() if s in self.nodes]
+            below = [max(rows) for rows in zip_longest(*upstream, fillvalue=0)] or [0]
+            if over == "timestamp":
+                levels[name] = [lookback(**spec["params"]), *below]
+            else:
+                levels[name] = [lookback(**spec["params"]) + below[0], *below[1:]]
+        return [
+            max(rows)
+            for rows in zip_longest(*(levels[name] for name in names), fillvalue=0)
+        ]
+
+    def _sorted_frame(self, df: pl.DataFrame | pl.LazyFrame) -> pl.DataFrame:
+        """Collect the bars sorted by (symbol, timestamp)"""
+        clashes = [name for name in self.nodes if name in df.lazy().collect_schema()]
+        if clashes:
+            raise ValueError(f"Nodes {clashes} shadow columns of the bars")
+        return (
+            df.lazy()
+            .sort([self.symbol_col, self.timestamp_col], maintain_order=True)
+            .collect()
+        )
+
+    def compute(
+        self, df: pl.DataFrame | pl.LazyFrame, names: list[str] | None = None
+    ) -> pl.DataFrame:
+        """
+        Evaluate nodes over long-format bars, reading cached nodes from disk and
+        computing and caching the others.
+
+        Parameters:
+        -----------
+        df : pl.DataFrame | pl.LazyFrame
+            Long-format bars with every column the graph reads
+        names : list[str] | None
+            Nodes to return (default: the graph outputs)
+
+        Returns:
+        --------
+        pl.DataFrame
+            `timestamp`, `symbol` and one column per node in `names`, sorted by
+            (symbol, timestamp)
+        """
+        names = self.outputs if names is None else names
+        frame = self._sorted_frame(df)
+        keys = self.keys(frame, names)
+
+        hits = 0
+        for name, key in keys.items():
+            path = self.cache_dir / f"{key}.arrow"
+            if path.exists():
+                os.utime(path)
+                column = pl.read_ipc(path, memory_map=True).to_series()
+                hits += 1
+            else:
+                column = frame.select(self.expression(name)).to_series()
+                self._write_entry(column, key, name)
+            frame = frame.with_columns(column.alias(name))
+        if hits < len(keys):
+            self.evict()
+
+        logger.info(
+            f"Factor graph: {hits} of {len(keys)} nodes cached, "
+            f"{len(keys) - hits} computed"
+        )
+        return frame.select(self.timestamp_col, self.symbol_col, *names)
+
+    def _write_entry(self, column: pl.Series, key: str, name: str) -> None:
+        """Atomically write a node's column and its metadata sidecar"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self.cache_dir / f"{key}.arrow"
+        tmp_path = self.cache_dir / f".{key}.{uuid.uuid4().hex}.tmp"
+        try:
+            column.to_frame(name).write_ipc(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+        with open(self.cache_dir / f"{key}.json", "w") as f:
+            json.dump({"node": name, **self.nodes[name]}, f, default=str)
+
+    def invalidate(self, names: list[str] | None = None) -> int:
+        """
+        Remove cached node outputs.
+
+        Parameters:
+        -----------
+        names : list[str] | None
+            Only remove entries of these nodes, or every entry if None
+
+        Returns:
+        --------
+        int
+            Number of entries removed
+        """
+        removed = 0
+        for entry in self.entries():
+            if names is None or entry.get("node") in names:
+                self._remove(entry["key"])
+                removed += 1
+        return removed
+
+    def entries(self) -> list[dict]:
+        """Metadata for every cached node output, least recently used first"""
+        if not self.cache_dir.exists():
+            return []
+
+        entries = []
+        for path in self.cache_dir.glob("*.arrow"):
+            stat = path.stat()
+            meta_path = path.with_suffix(".json")
+            meta = json.loads(meta_path.read_text()) if meta_path.exists() else {}
+            meta.update(
+                key=path.stem, path=path, bytes=stat.st_size, atime=stat.st_mtime
+            )
+            entries.append(meta)
+        return sorted(entries, key=lambda entry: entry["atime"])
+
+    def evict(self) -> int:
+        """Evict least recently used entries until the cache fits `max_bytes`"""
+        entries = self.entries()
+        total = sum(entry["bytes"] for entry in entries)
+
+        evicted = 0
+        for entry in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(entry["key"])
+            total -= entry["bytes"]
+            evicted += 1
+
+        if evicted:
+            logger.info(f"Evicted {evicted} factor cache entries")
+        return evicted
+
+    def _remove(self, key: str) -> None:
+        (self.cache_dir / f"{key}.arrow").unlink(missing_ok=True)
+        (self.cache_dir / f"{key}.json").unlink(missing_ok=True)
+
+    def tail(
+        self,
+        frame: pl.DataFrame,
+        names: list[str] | None = None,
+        delisted: list[str] | None = None,
+    ) -> pl.DataFrame:
+        """
+        Fewest bars from which `names` evaluate at a later bar exactly as on the
+        full history.
+
+        Each symbol needs its last bars up to the first level of `lookback`,
+        however old they are, so a symbol resuming after a halt reads the same
+        history as in a full recompute. A cross-sectional operation at the
+        timestamps of the kept bars reads every symbol there, and each of those
+        bars needs the rows of the next level before it, so the kept set grows
+        once per level. Only the symbols in `delisted` are dropped.
+
+        Parameters:
+        -----------
+        frame : pl.DataFrame
+            Long-format bars
+        names : list[str] | None
+            Nodes to cover (default: the graph outputs)
+        delisted : list[str] | None
+            Symbols that will not trade again
+
+        Returns:
+        --------
+        pl.DataFrame
+            The kept bars, sorted by (symbol, timestamp)
+        """
+        names = self.outputs if names is None else names
+        levels = self.lookback(names)
+        if delisted:
+            frame = frame.filter(~pl.col(self.symbol_col).is_in(delisted))
+        if frame.is_empty():
+            return frame
+
+        frame = self._sorted_frame(frame)
+        # Last rows of every symbol
+        keep = frame.select(
+            (pl.int_range(pl.len()).reverse() < max(levels[0], 1)).over(self.symbol_col)
+        ).to_series()
+        for rows in levels[1:]:
+            timestamps = frame.filter(keep)[self.timestamp_col].unique()
+            read = pl.col(self.timestamp_col).is_in(timestamps.implode())
+            # A row is needed if a read row of its symbol is at most `rows` later
+            needed = (
+                read.cast(pl.Int8)
+                .reverse()
+                .rolling_max(rows + 1, min_samples=1)
+                .reverse()
+                .over(self.symbol_col)
+                == 1
+            )
+            keep = keep | frame.select(needed).to_series()
+        return frame.filter(keep)
+
+    def update(
+        self,
+        df: pl.DataFrame | pl.LazyFrame,
+        path: str | Path,
+        names: list[str] | None = None,
+        full: bool = False,
+        delisted: list[str] | None = None,
+    ) -> pl.DataFrame:
+        """
+        Append the values of `names` at bars newer than the last update to a
+        factor directory, evaluating only those bars plus the history they read.
+
+        The directory holds one `part-<first timestamp>.parquet` file per update
+        and a `_state.arrow` snapshot of the bar columns the graph reads over
+        `tail` of the history, so a nightly refresh evaluates a few hundred rows
+        per symbol instead of the full history and matches a full recompute.
+        The first update (or `full=True`, which discards existing parts) computes
+        the whole of `df` through `compute` and its node cache.
+
+        Bars at or before the last processed timestamp are ignored, since
+        revising them would change values already written; rebuild with
+        `full=True` after a backfill. Pass a lazy frame such as
+        `BarStore.scan(...)` so the timestamp filter is pushed into the scan.
+
+        Parameters:
+        -----------
+        df : pl.DataFrame | pl.LazyFrame
+            Long-format bars
+        path : str | Path
+            Factor directory
+        names : list[str] | None
+            Nodes to write (default: the graph outputs)
+        full : bool
+            If True, recompute from `df` alone and replace the directory contents
+        delisted : list[str] | None
+            Symbols to drop from the snapshot; every other symbol keeps its
+            history however long ago it last traded (see `tail`)
+
+        Returns:
+        --------
+        pl.DataFrame
+            The appended factor rows
+        """
+        names = self.outputs if names is None else names
+        path = Path(path)
+        state_path = path / "_state.arrow"
+        meta_path = path / "_state.json"
+        columns = [self.timestamp_col, self.symbol_col, *self.columns(names)]
+        signature = hashlib.sha256(
+            json.dumps(
+                {"nodes": {n: self.nodes[n] for n in self.ancestors(names)}},
+                sort_keys=True,
+                default=str,
+            ).encode()
+        ).hexdigest()
+
+        if full or not state_path.exists():
+            for part in path.glob("part-*.parquet"):
+                part.unlink()
+            history = self._sorted_frame(df.lazy().select(columns))
+            out = self.compute(history, names)
+        else:
+            meta = json.loads(meta_path.read_text())
+            if meta["signature"] != signature:
+                raise ValueError(
+                    f"The factor graph changed since {path} was written, "
+                    "rebuild it with full=True"
+                )
+            state = pl.read_ipc(state_path, memory_map=False)
+            last = state[self.timestamp_col].max()
+            new = (
+                df.lazy()
+                .select(columns)
+                .filter(pl.col(self.timestamp_col) > last)
+                .collect()
+            )
+            if new.is_empty():
+                logger.info(f"No bars after {last} for {path}")
+                return state.clear().select(self.timestamp_col, self.symbol_col)
+
+            history = self._sorted_frame(
+                pl.concat([state, new], how="vertical_relaxed")
+            )
+            frame = history
+            for name in self.ancestors(names):
+                frame = frame.with_columns(self.expression(name))
+            out = frame.filter(pl.col(self.timestamp_col) > last).select(
+                self.timestamp_col, self.symbol_col, *names
+            )
+
+        path.mkdir(parents=True, exist_ok=True)
+        if not out.is_empty():
+            first = out[self.timestamp_col].dt.epoch("us").min()
+            self._write_atomic(out, path / f"part-{first:020d}.parquet")
+        self._write_atomic(self.tail(history, names, delisted=delisted), state_path)
+        meta_path.write_text(json.dumps({"signature": signature, "names": names}))
+
+        logger.info(f"Appended {len(out)} factor rows to {path}")
+        return out
+
+    def scan(self, path: str | Path) -> pl.LazyFrame:
+        """Lazily read every part written to a factor directory by `update`"""
+        return pl.scan_parquet(Path(path) / "part-*.parquet")
+
+    def _write_atomic(self, df: pl.DataFrame, path: Path) -> None:
+        """Write `df` next to `path` and rename it into place"""
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            if path.suffix == ".arrow":
+                df.write_ipc(tmp_path)
+            else:
+                df.write_parquet(tmp_path, statistics=True)
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
@@ -0,0 +1,152 @@
+import polars as pl
+
+from factors.common import PERIODS_PER_YEAR, factor_frame, join_point_in_time
+
+
+def long_term_reversal(
+    df: pl.DataFrame | pl.LazyFrame,
+    window: int = 3 * PERIODS_PER_YEAR,
+    skip: int = PERIODS_PER_YEAR,
+    price_col: str = "close",
+    name: str | None = None,
+    timestamp_col: str = "timestamp",
+    symbol_col: str = "symbol",
+) -> pl.DataFrame | pl.LazyFrame:
+    """
+    Long-term reversal, a price-only value proxy: minus the return from
+    `window` bars ago to `skip` bars ago, so long-run losers score as cheap.
+
+    Parameters:
+    -----------
+    df : pl.DataFrame | pl.LazyFrame
+        Long-format bars
+    window : int
+        Formation period in bars (default: 3 years of daily bars)
+    skip : int
+        Most recent bars left out, which belong to momentum (default: 1 year)
+    price_col : str
+        Price column (default: "close")
+    name : str | None
+        Output column (default: "lt_reversal_<window>_<skip>")
+    timestamp_col : str
+        Name of the timestamp column (default: "timestamp")
+    symbol_col : str
+        Name of the symbol column (default: "symbol")
+
+    Returns:
+    --------
+    pl.DataFrame | pl.LazyFrame
+        (timestamp, symbol, factor) table, eager if the input was eager
+    """
+    price = pl.col(price_col)
+    factor = (1.0 - price.shift(skip) / price.shift(window)).over(symbol_col)
+    return factor_frame(
+        df,
+        {name or f"lt_reversal_{window}_{skip}": factor},
+        timestamp_col=timestamp_col,
+        symbol_col=symbol_col,
+    )
+
+
+def distance_from_high(
+    df: pl.DataFrame | pl.LazyFrame,
+    window: int = PERIODS_PER_YEAR,
+    name: str | None = None,
+    timestamp_col: str = "timestamp",
+    symbol_col: str = "symbol",
+) -> pl.DataFrame | pl.LazyFrame:
+    """
+    How far the close sits below its `window`-bar high, as a positive fraction
+    (0 at the high).
+
+    Parameters:
+    -----------
+    df : pl.DataFrame | pl.LazyFrame
+        Long-format bars with `high` and `close`
+    window : int
+        Lookback in bars (default: 252)
+    name : str | None
+        Output column (default: "distance_from_high_<window>")
+    timestamp_col : str
+        Name of the timestamp column (default: "timestamp")
+    symbol_col : str
+        Name of the symbol column (default: "symbol")
+
+    Returns:
+    --------
+    pl.DataFrame | pl.LazyFrame
+        (timestamp, symbol, factor) table, eager if the input was eager
+    """
+    factor = (1.0 - pl.col("close") / pl.col("high").rolling_max(window)).over(
+        symbol_col
+    )
+    return factor_frame(
+        df,
+        {name or f"distance_from_high_{window}": factor},
+        timestamp_col=timestamp_col,
+        symbol_col=symbol_col,
+    )
+
+
+def fundamental_yield(
+    df: pl.DataFrame | pl.LazyFrame,
+    fundamentals: pl.DataFrame | pl.LazyFrame,
+    per_share_col: str,
+    price_col: str = "close",
+    name: str | None = None,
+    available_col: str = "available_at",
+    timestamp_col: str = "timestamp",
+    symbol_col: str = "symbol",
+) -> pl.DataFrame | pl.LazyFrame:
+    """
+    Per-share fundamental over price, e.g. book-to-price from
+    `book_value_per_share` or earnings yield from `eps_ttm`.
+
+    Each bar uses the latest report published before it (see
+    `join_point_in_time`), so restated or late filings never leak backwards.
+
+    Example:
+    --------
+    >>> book_to_price = fundamental_yield(bars, fundamentals, "book_value_per_share")
+
+    Parameters:
+    -----------
+    df : pl.DataFrame | pl.LazyFrame
+        Long-format bars
+    fundamentals : pl.DataFrame | pl.LazyFrame
+        One row per (symbol, report) with `available_col` and `per_share_col`
+    per_share_col : str
+        Per-share fundamental column
+    price_col : str
+        Price column (default: "close")
+    name : str | None
+        Output column (default: "<per_share_col>_yield")
+    available_col : str
+        Publication timestamp of each report (default: "available_at")
+    timestamp_col : str
+        Name of the timestamp column (default: "timestamp")
+    symbol_col : str
+        Name of the symbol column (default: "symbol")
+
+    Returns:
+    --------
+    pl.DataFrame | pl.LazyFrame
+        (timestamp, symbol, factor) table, eager if the input was eager
+    """
+    is_lazy = isinstance(df, pl.LazyFrame)
+    lf = join_point_in_time(
+        df.lazy().select(timestamp_col, symbol_col, price_col),
+        fundamentals,
+        [per_share_col],
+        available_col=available_col,
+        timestamp_col=timestamp_col,
+        symbol_col=symbol_col,
+    )
+    factor = pl.col(per_share_col) / pl.col(price_col)
+    result = factor_frame(
+        lf,
+        {name or f"{per_share_col}_yield": factor},
+        timestamp_col=timestamp_col,
+        symbol_col=symbol_col,
+    )
+    return result if is_lazy else result.collect()
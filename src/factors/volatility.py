@@ -0,0 +1,802 @@
+import hashlib
+import math
+import multiprocessing
+import os
+import uuid
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+from arch import arch_model
+from arch.utility.exceptions import StartingValueWarning
+from scipy.signal import lfilter
+
+from factors.common import PERIODS_PER_YEAR, factor_frame, log_returns
+from logger.logging import get_logger
+
+logger = get_logger(__name__)  # Creates 'factors.volatility'
+
+# Columns of a GARCH(1,1) fit besides symbol/timestamp, see `fit_garch`
+GARCH_PARAMS = ["mu", "omega", "alpha", "beta", "variance", "loglik", "converged"]
+
+# Schema of the `fit_garch` parameter cache, whose timestamps are stored in UTC
+_GARCH_SCHEMA = {
+    "symbol": pl.String,
+    "timestamp": pl.Datetime("us", "UTC"),
+    **{col: pl.Float64 for col in GARCH_PARAMS[:-1]},
+    "converged": pl.Boolean,
+    "window": pl.Int64,
+    "scale": pl.Float64,
+    "fingerprint": pl.String,
+}
+
+
+def realized_volatility_expr(
+    returns: pl.Expr, window: int = 21, periods_per_year: int = PERIODS_PER_YEAR
+) -> pl.Expr:
+    """Annualized rolling standard deviation of one symbol's returns"""
+    return returns.rolling_std(window) * periods_per_year**0.5
+
+
+def beta_expr(returns: pl.Expr, market: pl.Expr, window: int) -> pl.Expr:
+    """Rolling covariance of one symbol's returns with the market over its variance"""
+    return pl.rolling_cov(returns, market, window_size=window) / market.rolling_var(
+        window
+    )
+
+
+def realized_volatility(
+    df: pl.DataFrame | pl.LazyFrame,
+    window: int = 21,
+    price_col: str = "close",
+    periods_per_year: int = PERIODS_PER_YEAR,
+    name: str | None = None,
+    timestamp_col: str = "timestamp",
+    symbol_col: str = "symbol",
+) -> pl.DataFrame | pl.LazyFrame:
+    """
+    Annualized standard deviation of log returns over `window` bars.
+
+    Parameters:
+    -----------
+    df : pl.DataFrame | pl.LazyFrame
+        Long-format bars
+    window : int
+        Lookback in bars (default: 21)
+    price_col : str
+        Price column (default: "close")
+    periods_per_year : int
+        Bars per year used to annualize (default: 252)
+    name : str | None
+        Output column (default: "volatility_<window>")
+    timestamp_col : str
+        Name of the timestamp column (default: "timestamp")
+    symbol_col : str
+        Name of the symbol column (default: "symbol")
+
+    Returns:
+    --------
+    pl.DataFrame | pl.LazyFrame
+        (timestamp, symbol, factor) table, eager if the input was eager
+    """
+    returns = log_returns(price_col, symbol_col)
+    factor = realized_volatility_expr(returns, window, periods_per_year).over(
+        symbol_col
+    )
+    return factor_frame(
+        df,
+        {name or f"volatility_{window}": factor},
+        timestamp_col=timestamp_col,
+        symbol_col=symbol_col,
+    )
+
+
+def downside_volatility(
+    df: pl.DataFrame | pl.LazyFrame,
+    window: int = 63,
+    price_col: str = "close",
+    periods_per_year: int = PERIODS_PER_YEAR,
+    name: str | None = None,
+    timestamp_col: str = "timestamp",
+    symbol_col: str = "symbol",
+) -> pl.DataFrame | pl.LazyFrame:
+    """
+    Annualized semi-deviation: root mean square of the negative log returns
+    over `window` bars (positive returns count as zero).
+
+    Parameters:
+    -----------
+    df : pl.DataFrame | pl.LazyFrame
+        Long-format bars
+    window : int
+        Lookback in bars (default: 63)
+    price_col : str
+        Price column (default: "close")
+    periods_per_year : int
+        Bars per year used to annualize (default: 252)
+    name : str | None
+        Output column (default: "downside_volatility_<window>")
+    timestamp_col : str
+        Name of the timestamp column (default: "timestamp")
+    symbol_col : str
+        Name of the symbol column (default: "symbol")
+
+    Returns:
+    --------
+    pl.DataFrame | pl.LazyFrame
+        (timestamp, symbol, factor) table, eager if the input was eager
+    """
+    downside = log_returns(price_col, symbol_col).clip(upper_bound=0.0)
+    factor = (
+        ((downside**2).rolling_mean(window) * periods_per_year).sqrt().over(symbol_col)
+    )
+    return factor_frame(
+        df,
+        {name or f"downside_volatility_{window}": factor},
+        timestamp_col=timestamp_col,
+        symbol_col=symbol_col,
+    )
+
+
+def market_beta(
+    df: pl.DataFrame | pl.LazyFrame,
+    window: int = PERIODS_PER_YEAR,
+    price_col: str = "close",
+    name: str | None = None,
+    timestamp_col: str = "timestamp",
+    symbol_col: str = "symbol",
+) -> pl.DataFrame | pl.LazyFrame:
+    """
+    Rolling beta of each symbol to the equal-weighted market of the frame.
+
+    The market return is the cross-sectional mean log return of each bar
+    (`over(timestamp)`), and the beta the rolling covariance of the symbol's
+    return with it over the market's rolling variance, all in one lazy plan.
+
+    Parameters:
+    -----------
+    df : pl.DataFrame | pl.LazyFrame
+        Long-format bars
+    window : int
+        Lookback in bars (default: 252)
+    price_col : str
+        Price column (default: "close")
+    name : str | None
+        Output column (default: "beta_<window>")
+    timestamp_col : str
+        Name of the timestamp column (default: "timestamp")
+    symbol_col : str
+        Name of the symbol column (default: "symbol")
+
+    Returns:
+    --------
+    pl.DataFrame | pl.LazyFrame
+        (timestamp, symbol, factor) table, eager if the input was eager
+    """
+    is_lazy = isinstance(df, pl.LazyFrame)
+    # Window expressions cannot nest, so the returns and the market are
+    # materialized as columns before the per-symbol rolling moments
+    lf = (
+        df.lazy()
+        .sort([symbol_col, timestamp_col])
+        .with_columns(log_returns(price_col, symbol_col).alias("_return"))
+        .with_columns(pl.col("_return").mean().over(timestamp_col).alias("_market"))
+    )
+    factor = beta_expr(pl.col("_return"), pl.col("_market"), window).over(symbol_col)
+    result = factor_frame(
+        lf,
+        {name or f"beta_{window}": factor},
+        timestamp_col=timestamp_col,
+        symbol_col=symbol_col,
+    )
+    return result if is_lazy else result.collect()
+
+
+def _log_ranges() -> tuple[pl.Expr, pl.Expr, pl.Expr, pl.Expr]:
+    """Log high/open, low/open, close/open and high/low of each bar"""
+    open_ = pl.col("open")
+    return (
+        (pl.col("high") / open_).log(),
+        (pl.col("low") / open_).log(),
+        (pl.col("close") / open_).log(),
+        (pl.col("high") / pl.col("low")).log(),
+    )
+
+
+def parkinson_volatility(
+    df: pl.DataFrame | pl.LazyFrame,
+    window: int = 21,
+    periods_per_year: int = PERIODS_PER_YEAR,
+    name: str | None = None,
+    timestamp_col: str = "timestamp",
+    symbol_col: str = "symbol",
+) -> pl.DataFrame | pl.LazyFrame:
+    """
+    Annualized Parkinson (1980) volatility from the high-low range,
+    sqrt(mean(ln(H/L)²) / (4 ln 2)) over `window` bars. About five times as
+    efficient as close-to-close for a driftless diffusion, but ignores
+    overnight gaps.
+
+    Parameters:
+    -----------
+    df : pl.DataFrame | pl.LazyFrame
+        Long-format OHLC bars
+    window : int
+        Lookback in bars (default: 21)
+    periods_per_year : int
+        Bars per year used to annualize (default: 252)
+    name : str | None
+        Output column (default: "parkinson_<window>")
+    timestamp_col : str
+        Name of the timestamp column (default: "timestamp")
+    symbol_col : str
+        Name of the symbol column (default: "symbol")
+
+    Returns:
+    --------
+    pl.DataFrame | pl.LazyFrame
+        (timestamp, symbol, factor) table, eager if the input was eager
+    """
+    *_, high_low = _log_ranges()
+    variance = (high_low**2).rolling_mean(window) / (4.0 * math.log(2.0))
+    factor = (variance * periods_per_year).sqrt().over(symbol_col)
+    return factor_frame(
+        df,
+        {name or f"parkinson_{window}": factor},
+        timestamp_col=timestamp_col,
+        symbol_col=symbol_col,
+    )
+
+
+def garman_klass_volatility(
+    df: pl.DataFrame | pl.LazyFrame,
+    window: int = 21,
+    periods_per_year: int = PERIODS_PER_YEAR,
+    name: str | None = None,
+    timestamp_col: str = "timestamp",
+    symbol_col: str = "symbol",
+) -> pl.DataFrame | pl.LazyFrame:
+    """
+    Annualized Garman-Klass (1980) volatility,
+    sqrt(mean(0.5·ln(H/L)² - (2 ln 2 - 1)·ln(C/O)²)) over `window` bars.
+    Uses the open and close on top of the range; ignores overnight gaps.
+
+    Parameters:
+    -----------
+    df : pl.DataFrame | pl.LazyFrame
+        Long-format OHLC bars
+    window : int
+        Lookback in bars (default: 21)
+    periods_per_year : int
+        Bars per year used to annualize (default: 252)
+    name : str | None
+        Output column (default: "garman_klass_<window>")
+    timestamp_col : str
+        Name of the timestamp column (default: "timestamp")
+    symbol_col : str
+        Name of the symbol column (default: "symbol")
+
+    Returns:
+    --------
+    pl.DataFrame | pl.LazyFrame
+        (timestamp, symbol, factor) table, eager if the input was eager
+    """
+    _, _, close_open, high_low = _log_ranges()
+    bar_variance = 0.5 * high_low**2 - (2.0 * math.log(2.0) - 1.0) * close_open**2
+    factor = (
+        (bar_variance.rolling_mean(window) * periods_per_year).sqrt().over(symbol_col)
+    )
+    return factor_frame(
+        df,
+        {name or f"garman_klass_{window}": factor},
+        timestamp_col=timestamp_col,
+        symbol_col=symbol_col,
+    )
+
+
+def rogers_satchell_volatility(
+    df: pl.DataFrame | pl.LazyFrame,
+    window: int = 21,
+    periods_per_year: int = PERIODS_PER_YEAR,
+    name: str | None = None,
+    timestamp_col: str = "timestamp",
+    symbol_col: str = "symbol",
+) -> pl.DataFrame | pl.LazyFrame:
+    """
+    Annualized Rogers-Satchell (1991) volatility,
+    sqrt(mean(ln(H/C)·ln(H/O) + ln(L/C)·ln(L/O))) over `window` bars, which
+    stays unbiased when prices drift.
+
+    Parameters:
+    -----------
+    df : pl.DataFrame | pl.LazyFrame
+        Long-format OHLC bars
+    window : int
+        Lookback in bars (default: 21)
+    periods_per_year : int
+        Bars per year used to annualize (default: 252)
+    name : str | None
+        Output column (default: "rogers_satchell_<window>")
+    timestamp_col : str
+        Name of the timestamp column (default: "timestamp")
+    symbol_col : str
+        Name of the symbol column (default: "symbol")
+
+    Returns:
+    --------
+    pl.DataFrame | pl.LazyFrame
+        (timestamp, symbol, factor) table, eager if the input was eager
+    """
+    high_open, low_open, close_open, _ = _log_ranges()
+    bar_variance = high_open * (high_open - close_open) + low_open * (
+        low_open - close_open
+    )
+    factor = (
+        (bar_variance.rolling_mean(window) * periods_per_year).sqrt().over(symbol_col)
+    )
+    return factor_frame(
+        df,
+        {name or f"rogers_satchell_{window}": factor},
+        timestamp_col=timestamp_col,
+        symbol_col=symbol_col,
+    )
+
+
+def yang_zhang_volatility(
+    df: pl.DataFrame | pl.LazyFrame,
+    window: int = 21,
+    periods_per_year: int = PERIODS_PER_YEAR,
+    name: str | None = None,
+    timestamp_col: str = "timestamp",
+    symbol_col: str = "symbol",
+) -> pl.DataFrame | pl.LazyFrame:
+    """
+    Annualized Yang-Zhang (2000) volatility over `window` bars: the variance of
+    overnight returns ln(O_t / C_t-1) plus a weighted sum of the open-to-close
+    variance and the Rogers-Satchell variance, with the weight
+    k = 0.34 / (1.34 + (n + 1) / (n - 1)) that minimizes the estimator's
+    variance. Handles both drift and overnight gaps.
+
+    Parameters:
+    -----------
+    df : pl.DataFrame | pl.LazyFrame
+        Long-format OHLC bars
+    window : int
+        Lookback in bars (default: 21)
+    periods_per_year : int
+        Bars per year used to annualize (default: 252)
+    name : str | None
+        Output column (default: "yang_zhang_<window>")
+    timestamp_col : str
+        Name of the timestamp column (default: "timestamp")
+    symbol_col : str
+        Name of the symbol column (default: "symbol")
+
+    Returns:
+    --------
+    pl.DataFrame | pl.LazyFrame
+        (timestamp, symbol, factor) table, eager if the input was eager
+    """
+    if window < 2:
+        raise ValueError(f"window must be >= 2, got {window}")
+    high_open, low_open, close_open, _ = _log_ranges()
+    overnight = (pl.col("open") / pl.col("close").shift(1)).log()
+    rogers_satchell = high_open * (high_open - close_open) + low_open * (
+        low_open - close_open
+    )
+    k = 0.34 / (1.34 + (window + 1) / (window - 1))
+    variance = (
+        overnight.rolling_var(window)
+        + k * close_open.rolling_var(window)
+        + (1.0 - k) * rogers_satchell.rolling_mean(window)
+    )
+    factor = (variance * periods_per_year).sqrt().over(symbol_col)
+    return factor_frame(
+        df,
+        {name or f"yang_zhang_{window}": factor},
+        timestamp_col=timestamp_col,
+        symbol_col=symbol_col,
+    )
+
+
+def _garch_fit_ends(n_returns: int, window: int, refit_every: int) -> list[int]:
+    """Indices of the last return of every refit window of one symbol"""
+    if n_returns < window:
+        return []
+    ends = list(range(window - 1, n_returns, refit_every))
+    # Always fit the latest window so a daily refresh sees today's params
+    if ends[-1] != n_returns - 1:
+        ends.append(n_returns - 1)
+    return ends
+
+
+def _window_fingerprint(returns: np.ndarray) -> str:
+    """Digest of the scaled returns of one fit window"""
+    return hashlib.sha256(np.ascontiguousarray(returns).tobytes()).hexdigest()
+
+
+def _fit_garch_windows(
+    returns: np.ndarray,
+    ends: list[int],
+    window: int,
+    starting_values: np.ndarray | None,
+) -> list[tuple]:
+    """
+    Fit GARCH(1,1) with a constant mean on the `window` returns ending at each
+    index of `ends`, in order, each fit starting from the previous one's params
+    when they are stationary (alpha + beta < 1) and arch's own guess otherwise
+    """
+    fits = []
+    for end in ends:
+        model = arch_model(
+            returns[end - window + 1 : end + 1],
+            mean="Constant",
+            vol="GARCH",
+            p=1,
+            q=1,
+            rescale=False,
+        )
+        a, b = model.volatility.constraints()
+        warm_start = (
+            starting_values
+            if starting_values is not None and np.all(a @ starting_values[1:] - b > 0)
+            else None
+        )
+        try:
+            # Warm starts outside the data-dependent bounds of this window fall
+            # back to arch's guess as well, which it reports as a warning
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", StartingValueWarning)
+                result = model.fit(
+                    starting_values=warm_start, disp="off", show_warning=False
+                )
+        except (ValueError, np.linalg.LinAlgError) as e:
+            logger.debug(f"GARCH fit failed at {end}: {e}")
+            fits.append((end, *[np.nan] * 6, False))
+            continue
+        params = np.asarray(result.params, dtype=np.float64)
+        fits.append(
+            (
+                end,
+                *params,
+                float(np.asarray(result.conditional_volatility)[-1] ** 2),
+                float(result.loglikelihood),
+                result.convergence_flag == 0,
+            )
+        )
+        if np.all(np.isfinite(params)):
+            starting_values = params
+    return fits
+
+
+def fit_garch(
+    df: pl.DataFrame | pl.LazyFrame,
+    window: int = 500,
+    refit_every: int = 21,
+    price_col: str = "close",
+    scale: float = 100.0,
+    cache_path: str | Path | None = None,
+    max_workers: int | None = None,
+    timestamp_col: str = "timestamp",
+    symbol_col: str = "symbol",
+) -> pl.DataFrame:
+    """
+    Rolling GARCH(1,1) fits of every symbol's log returns with `arch`.
+
+    Each symbol is refitted every `refit_every` bars (and on its latest bar) on
+    the last `window` returns scaled by `scale`, as in notebook 03. The windows
+    of one symbol are fitted in order, each warm-started from the previous
+    window's params, which cuts the optimizer iterations for overlapping
+    windows; symbols are spread over a process pool. With `cache_path`, fitted
+    params are stored in a parquet file keyed by (symbol, window end, window,
+    scale) together with a fingerprint of the window's returns, so a daily
+    refresh only fits each symbol's newest window, starting from its cached
+    params, and windows whose prices were revised are refitted. Cached fits of
+    a symbol that fall inside its returns but off the current refit grid, such
+    as yesterday's latest window, are dropped when the cache is written.
+
+    Workers are spawned, so scripts calling this need an
+    `if __name__ == "__main__":` guard; `max_workers=1` fits in the calling
+    process instead.
+
+    Parameters:
+    -----------
+    df : pl.DataFrame | pl.LazyFrame
+        Long-format bars
+    window : int
+        Returns per fit (default: 500)
+    refit_every : int
+        Bars between refits (default: 21)
+    price_col : str
+        Price column (default: "close")
+    scale : float
+        Multiplier applied to log returns before fitting (default: 100)
+    cache_path : str | Path | None
+        Parquet file of fitted params (default: no cache)
+    max_workers : int | None
+        Number of worker processes (default: CPU count)
+    timestamp_col : str
+        Name of the timestamp column (default: "timestamp")
+    symbol_col : str
+        Name of the symbol column (default: "symbol")
+
+    Returns:
+    --------
+    pl.DataFrame
+        One row per fit: `symbol`, `timestamp` (last bar of the window), `mu`,
+        `omega`, `alpha`, `beta` (in scaled units), `variance` (conditional
+        variance at the last bar), `loglik` and `converged`
+    """
+    if window < 20:
+        raise ValueError(f"window must be >= 20, got {window}")
+    returns = (
+        df.lazy()
+        .sort([symbol_col, timestamp_col])
+        .select(
+            timestamp_col,
+            symbol_col,
+            (log_returns(price_col, symbol_col) * scale).alias("_return"),
+        )
+        .drop_nulls("_return")
+        .filter(pl.col("_return").is_finite())
+        .collect()
+    )
+
+    # Cached timestamps are UTC; naive input timestamps are taken as UTC
+    timestamp_dtype = returns.schema[timestamp_col]
+    input_tz = getattr(timestamp_dtype, "time_zone", None)
+    cached = pl.DataFrame(schema=_GARCH_SCHEMA)
+    if cache_path is not None and Path(cache_path).exists():
+        cached = pl.concat(
+            [cached, pl.read_parquet(cache_path)], how="diagonal_relaxed"
+        )
+    cached_ts = pl.col("timestamp").dt.convert_time_zone(input_tz or "UTC")
+    if input_tz is None:
+        cached_ts = cached_ts.dt.replace_time_zone(None)
+    settings = (pl.col("window") == window) & (pl.col("scale") == scale)
+    known = {
+        (symbol, ts): (fingerprint, row)
+        for symbol, ts, fingerprint, *row in cached.filter(settings)
+        .select(
+            "symbol",
+            cached_ts.cast(timestamp_dtype),
+            "fingerprint",
+            *GARCH_PARAMS,
+        )
+        .iter_rows()
+    }
+
+    tasks, rows, grid, spans = [], [], [], []
+    for (symbol,), part in returns.group_by(symbol_col, maintain_order=True):
+        timestamps = part[timestamp_col].to_list()
+        values = part["_return"].to_numpy()
+        ends = _garch_fit_ends(len(part), window, refit_every)
+        grid.extend((symbol, timestamps[end]) for end in ends)
+        spans.append((symbol, timestamps[0], timestamps[-1]))
+        fingerprints = {
+            end: _window_fingerprint(values[end - window + 1 : end + 1]) for end in ends
+        }
+        hits = {
+            end: known[(symbol, timestamps[end])][1]
+            for end in ends
+            if known.get((symbol, timestamps[end]), (None,))[0] == fingerprints[end]
+        }
+        done = [end for end in ends if end in hits]
+        rows.extend((symbol, timestamps[end], *hits[end]) for end in done)
+        missing = [end for end in ends if end not in hits]
+        if not missing:
+            continue
+
+        # Warm-start from the latest cached fit before the first missing window
+        previous = [hits[end][:4] for end in done if end < missing[0]]
+        previous = [params for params in previous if np.all(np.isfinite(params))]
+        first = missing[0] - window + 1
+        tasks.append(
+            (
+                symbol,
+                timestamps[first:],
+                values[first:],
+                [end - first for end in missing],
+                np.array(previous[-1]) if previous else None,
+                [fingerprints[end] for end in missing],
+            )
+        )
+
+    logger.info(
+        f"GARCH: {sum(len(t[3]) for t in tasks)} windows to fit for {len(tasks)} "
+        f"symbols, {len(rows)} cached"
+    )
+    if max_workers == 1 or len(tasks) <= 1:
+        results = [
+            _fit_garch_windows(task[2], task[3], window, task[4]) for task in tasks
+        ]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as executor:
+            results = list(
+                executor.map(
+                    _fit_garch_windows,
+                    [task[2] for task in tasks],
+                    [task[3] for task in tasks],
+                    [window] * len(tasks),
+                    [task[4] for task in tasks],
+                )
+            )
+
+    fitted = [
+        (symbol, timestamps[end], *fit)
+        for (symbol, timestamps, *_), fits in zip(tasks, results)
+        for end, *fit in fits
+    ]
+    columns = [symbol_col, timestamp_col, *GARCH_PARAMS]
+    schema = {
+        symbol_col: pl.String,
+        timestamp_col: timestamp_dtype,
+        **{col: _GARCH_SCHEMA[col] for col in GARCH_PARAMS},
+    }
+    new = pl.DataFrame(fitted, schema=schema, orient="row")
+    params = pl.concat([pl.DataFrame(rows, schema=schema, orient="row"), new]).sort(
+        columns[:2]
+    )
+
+    if cache_path is not None and not new.is_empty():
+
+        def to_utc(column: str) -> pl.Expr:
+            """Input timestamps as the cache's UTC timestamps"""
+            ts = pl.col(column)
+            if input_tz is None:
+                ts = ts.dt.replace_time_zone("UTC")
+            return ts.dt.convert_time_zone("UTC").dt.cast_time_unit("us").alias(column)
+
+        new = new.select(
+            pl.col(symbol_col).alias("symbol"),
+            to_utc(timestamp_col).alias("timestamp"),
+            *GARCH_PARAMS,
+            window=pl.lit(window),
+            scale=pl.lit(scale),
+            fingerprint=pl.Series(
+                [fingerprint for task in tasks for fingerprint in task[5]],
+                dtype=pl.String,
+            ),
+        )
+        # Fits inside a symbol's returns that are not on the current grid will
+        # never be read again, e.g. the latest window of an earlier refresh
+        utc = _GARCH_SCHEMA["timestamp"]
+        grid = pl.DataFrame(
+            grid,
+            schema={"symbol": pl.String, "timestamp": timestamp_dtype},
+            orient="row",
+        ).with_columns(to_utc("timestamp"))
+        spans = pl.DataFrame(
+            spans,
+            schema={
+                "symbol": pl.String,
+                "_first": timestamp_dtype,
+                "_last": timestamp_dtype,
+            },
+            orient="row",
+        ).with_columns(to_utc("_first"), to_utc("_last"))
+        orphans = (
+            cached.filter(settings)
+            .select("symbol", pl.col("timestamp").cast(utc), "window", "scale")
+            .join(spans, on="symbol")
+            .filter(pl.col("timestamp").is_between("_first", "_last"))
+            .join(grid, on=["symbol", "timestamp"], how="anti")
+            .drop("_first", "_last")
+        )
+        cached = cached.with_columns(pl.col("timestamp").cast(utc)).join(
+            orphans, on=["symbol", "timestamp", "window", "scale"], how="anti"
+        )
+        merged = pl.concat([cached, new], how="diagonal_relaxed").unique(
+            subset=["symbol", "timestamp", "window", "scale"],
+            keep="last",
+            maintain_order=True,
+        )
+        cache_path = Path(cache_path)
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_name(f".{cache_path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            merged.write_parquet(tmp_path)
+            os.replace(tmp_path, cache_path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    return params.select(columns)
+
+
+def garch_volatility(
+    df: pl.DataFrame | pl.LazyFrame,
+    params: pl.DataFrame,
+    price_col: str = "close",
+    scale: float = 100.0,
+    periods_per_year: int = PERIODS_PER_YEAR,
+    name: str | None = None,
+    timestamp_col: str = "timestamp",
+    symbol_col: str = "symbol",
+) -> pl.DataFrame:
+    """
+    Annualized one-step-ahead GARCH(1,1) volatility forecast of every bar,
+    point-in-time: each bar uses the params of the latest fit ending at or
+    before it (from `fit_garch`), with the conditional variance carried forward
+    from that fit by the recursion
+    sigma²_t+1 = omega + alpha·(r_t - mu)² + beta·sigma²_t.
+
+    Parameters:
+    -----------
+    df : pl.DataFrame | pl.LazyFrame
+        Long-format bars
+    params : pl.DataFrame
+        Fits from `fit_garch` with the same `scale`
+    price_col : str
+        Price column (default: "close")
+    scale : float
+        Multiplier the returns were fitted with (default: 100)
+    periods_per_year : int
+        Bars per year used to annualize (default: 252)
+    name : str | None
+        Output column (default: "garch_volatility")
+    timestamp_col : str
+        Name of the timestamp column (default: "timestamp")
+    symbol_col : str
+        Name of the symbol column (default: "symbol")
+
+    Returns:
+    --------
+    pl.DataFrame
+        (timestamp, symbol, factor) table, null before a symbol's first fit
+    """
+    name = name or "garch_volatility"
+    bars = (
+        df.lazy()
+        .sort([symbol_col, timestamp_col])
+        .select(
+            timestamp_col,
+            symbol_col,
+            (log_returns(price_col, symbol_col) * scale).alias("_return"),
+        )
+        .collect()
+    )
+    fits = params.filter(
+        pl.all_horizontal(pl.col(GARCH_PARAMS[:5]).is_finite())
+    ).with_columns(pl.col(timestamp_col).cast(bars.schema[timestamp_col]))
+    bars = bars.join(
+        fits.select(symbol_col, timestamp_col, pl.lit(True).alias("_refit")),
+        on=[symbol_col, timestamp_col],
+        how="left",
+        maintain_order="left",
+    ).join_asof(
+        fits.select(symbol_col, timestamp_col, *GARCH_PARAMS[:5]),
+        on=timestamp_col,
+        by=symbol_col,
+        strategy="backward",
+        check_sortedness=False,
+    )
+
+    forecast = np.full(len(bars), np.nan)
+    returns, refit = bars["_return"].to_numpy(), bars["_refit"].is_not_null().to_numpy()
+    mu, omega, alpha, beta, variance = (bars[c].to_numpy() for c in GARCH_PARAMS[:5])
+    # A segment starts at every fitted bar and runs until the next one
+    offsets = bars.group_by(symbol_col, maintain_order=True).len()["len"].cum_sum()
+    starts = np.flatnonzero(refit & np.isfinite(variance))
+    stops = np.minimum(np.append(starts[1:], len(bars)), _next_offset(starts, offsets))
+    for start, stop in zip(starts, stops):
+        shocks = omega[start] + alpha[start] * (returns[start:stop] - mu[start]) ** 2
+        forecast[start:stop], _ = lfilter(
+            [1.0], [1.0, -beta[start]], shocks, zi=[beta[start] * variance[start]]
+        )
+
+    with np.errstate(invalid="ignore"):
+        factor = np.sqrt(forecast * periods_per_year) / scale
+    return bars.select(timestamp_col, symbol_col).with_columns(
+        pl.Series(name, factor, nan_to_null=True)
+    )
+
+
+def _next_offset(starts: np.ndarray, offsets: pl.Series) -> np.ndarray:
+    """End of the symbol block each row index belongs to"""
+    offsets = offsets.to_numpy()
+    return offsets[np.searchsorted(offsets, starts, side="right")]
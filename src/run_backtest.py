@@ -4,7 +4,8 @@ import backtrader as bt
 import polars as pl
 
 from backtesting.engine import run_backtest
-from data.resample_data import resample_stock_bars
+from data.load_data import load_bars
+from data.resample_cache import ResampleCache
 from logger.logging import setup_logging
 from strategies.sample import SampleStrategy_Backtesting
 from visualization.plots import backtester_plot_portfolio_value
@@ -19,37 +20,29 @@ data_path_raw = (
     Path.cwd() / "data/external" / "bars_data_20190106_to_20251219__20251224.parquet"
 )
 
-bars = pl.read_parquet(data_path_raw)
-
-df_bars = resample_stock_bars(
-    bars,
-    timestamp_col="timestamp",
-    symbol_col="symbol",
+# Resampled splits are cached on disk and only recomputed when the source changes
+resample_cache = ResampleCache()
+df_first_half = resample_cache.resample(
+    data_path_raw,
+    end="2023-01-01",
     freq="1d",
     market_hours_only=True,
     timezone="America/New_York",
 )
-
-df_first_half = (
-    df_bars.filter(pl.col("timestamp") < pl.lit("2023-01-01").str.to_date())
-    .to_pandas()
-    .set_index("timestamp")
-)
-df_second_half = (
-    df_bars.filter(pl.col("timestamp") > pl.lit("2023-01-01").str.to_date())
-    .to_pandas()
-    .set_index("timestamp")
+# Held out-of-sample split stays lazy until it is backtested
+df_second_half = load_bars(
+    data_path_raw,
+    start="2023-01-01",
+    freq="1d",
+    market_hours_only=True,
+    timezone="America/New_York",
 )
 
-# Load your own data:
-data_dict = {}
-for symbol, data in df_first_half.groupby("symbol"):
-    if symbol not in ["EXE", "XLE"]:
-        data_dict[symbol] = data
-# print(data_dict)
+# Load your own data, fed to Backtrader straight from the Polars frame
+data = df_first_half.filter(~pl.col("symbol").is_in(["EXE", "XLE"]))
 # Run backtest
 cerebro = run_backtest(
-    data_dict,
+    data,
     strategy=SampleStrategy_Backtesting,
     timeframe=bt.TimeFrame.Days,
     cash=1_000,
@@ -57,14 +50,34 @@ cerebro = run_backtest(
 )
 backtester_plot_portfolio_value(cerebro)
 
-# Uncomment to run optimization
-# optimize_cerebro = run_backtest(data_dict, strategy=strat, cash=1_000, commission=0.002)
+# Uncomment to run optimization (workers are spawned, so run it from under an
+# `if __name__ == "__main__":` guard)
+# from backtesting.engine import optimize_strategy
+#
+# sweep_results = optimize_strategy(
+#     data,
+#     strategy=SampleStrategy_Backtesting,
+#     param_grid={
+#         "rebalance_hours": range(1, 11),
+#         "z_threshold": [0.25, 0.50, 0.75, 1.00],
+#     },
+#     cash=1_000,
+#     commission=0.002,
+# )
+# print(sweep_results.sort("sharpe", descending=True, nulls_last=True))
 
-# cerebro_results = optimize_strategy(
-#     data_dict,
-#     cerebro=optimize_cerebro,
+# Uncomment to run a walk-forward evaluation instead of the fixed 2023 split
+# from backtesting.walk_forward import walk_forward
+#
+# wf_results = walk_forward(
+#     resample_cache.resample(
+#         data_path_raw, freq="1d", market_hours_only=True, timezone="America/New_York"
+#     ).filter(~pl.col("symbol").is_in(["EXE", "XLE"])),
+#     strategy=SampleStrategy_Backtesting,
+#     param_grid={"rebalance_hours": [1, 5, 10], "z_threshold": [0.25, 0.50, 1.00]},
+#     train_period="2y",
+#     test_period="6mo",
 #     cash=1_000,
 #     commission=0.002,
-#     param_name="maperiod",
-#     param_range=range(10, 31, 5),  # Example: 10, 15, 20, 25, 30
 # )
+# print(wf_results["windows"])
@@ -1,19 +1,270 @@
+import os
+from pathlib import Path
+
 import backtrader as bt
+import numpy as np
+import polars as pl
+
+from backtesting.engine import PolarsData
+from data.utils import load_panel, write_panel
+from logger.logging import get_logger
+
+logger = get_logger(__name__)  # Creates 'strategies.cross_sectional_mr'
+
+RESIDUAL_FIELD = "residual"
+
+# Residual panels already opened in this process, keyed by path, so the tasks of
+# a parameter sweep share one memory map per worker. Each entry keeps the
+# (inode, mtime) of the panel directory it was opened from: `write_panel` swaps
+# in a new directory, so a rewritten panel is opened again.
+_residual_panels: dict[str, tuple[tuple[int, int], dict]] = {}
+
+
+def factor_exposures(
+    symbols: list[str], sectors: dict[str, str] | None = None
+) -> np.ndarray:
+    """
+    Market and sector exposures of `symbols` as an (N, K) matrix.
+
+    Without `sectors` the only factor is the market (a column of ones). With
+    `sectors`, each sector gets a dummy column and the market is their sum, so
+    it is left out; symbols missing from the mapping form an "other" sector.
+    """
+    if not sectors:
+        return np.ones((len(symbols), 1))
+    labels = [sectors.get(symbol, "other") for symbol in symbols]
+    names = sorted(set(labels))
+    exposures = np.zeros((len(symbols), len(names)))
+    exposures[np.arange(len(symbols)), [names.index(label) for label in labels]] = 1.0
+    return exposures
+
+
+def residual_returns(
+    prices: np.ndarray, exposures: np.ndarray, lookback: int = 1
+) -> np.ndarray:
+    """
+    Cross-sectional residuals of log returns on factor exposures for every bar
+    in one batched pass.
+
+    For each bar t the returns of the symbols with a price are regressed on
+    their exposures, `r_t = X b_t + e_t`. The normal equations of all bars are
+    built with one einsum and solved as a stack with `np.linalg.pinv`, so the
+    cost is O(T·N·K²) without a Python loop over bars. The residuals are then
+    summed over the last `lookback` bars.
+
+    Args:
+        prices: (T, N) matrix of prices, NaN where a symbol has no bar
+        exposures: (N, K) factor exposures, e.g. from `factor_exposures`
+        lookback: Bars of residual returns to accumulate (default: 1)
+
+    Returns:
+        (T, N) matrix of residual returns, NaN where a return in the lookback
+        window is missing
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_prices = np.log(np.where(prices > 0, prices, np.nan))
+    returns = np.full(prices.shape, np.nan)
+    returns[1:] = np.diff(log_prices, axis=0)
+
+    valid = np.isfinite(returns)
+    filled = np.where(valid, returns, 0.0)
+    xtx = np.einsum("tn,nk,nj->tkj", valid.astype(np.float64), exposures, exposures)
+    xty = filled @ exposures
+    coef = np.einsum("tkj,tj->tk", np.linalg.pinv(xtx), xty)
+    residuals = np.where(valid, filled - coef @ exposures.T, 0.0)
+
+    # Rolling sum over `lookback` bars from cumulative sums of values and gaps
+    sums = np.cumsum(residuals, axis=0)
+    gaps = np.cumsum(~valid, axis=0)
+    sums[lookback:] = sums[lookback:] - sums[:-lookback]
+    gaps[lookback:] = gaps[lookback:] - gaps[:-lookback]
+    sums[: lookback - 1] = np.nan
+    return np.where(gaps == 0, sums, np.nan)
+
+
+def residual_weights(residuals: np.ndarray, entry_z: float = 1.0) -> np.ndarray:
+    """
+    Mean-reversion target weights from residual returns, one row per bar.
+
+    Residuals are z-scored across the symbols of each row; symbols beyond
+    `entry_z` get a weight opposite to their z-score, demeaned so the book is
+    dollar-neutral and scaled to a gross exposure of 1.
+
+    Args:
+        residuals: (T, N) residual returns, NaN where unavailable
+        entry_z: Minimum absolute z-score to hold a position
+
+    Returns:
+        (T, N) target weights, 0 where a symbol is not held
+    """
+    residuals = np.atleast_2d(np.asarray(residuals, dtype=np.float64))
+    valid = np.isfinite(residuals)
+    count = valid.sum(axis=1, keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.where(valid, residuals, 0.0).sum(axis=1, keepdims=True) / count
+        dev = np.where(valid, residuals - mean, 0.0)
+        z = dev / np.sqrt((dev**2).sum(axis=1, keepdims=True) / count)
+
+        active = np.abs(z) > entry_z
+        signal = np.where(active, -z, 0.0)
+        signal -= np.where(
+            active, signal.sum(axis=1, keepdims=True) / active.sum(1, keepdims=True), 0
+        )
+        gross = np.abs(signal).sum(axis=1, keepdims=True)
+        weights = np.where(gross > 0, signal / gross, 0.0)
+    return np.where(np.isfinite(weights), weights, 0.0)
+
+
+def write_residuals(
+    df: pl.DataFrame,
+    path: str | Path,
+    sectors: dict[str, str] | None = None,
+    lookback: int = 5,
+    field: str = "close",
+    timestamp_col: str = "timestamp",
+    symbol_col: str = "symbol",
+) -> Path:
+    """
+    Compute the residual matrix of long-format bars and store it as a panel.
+
+    The panel holds a single `residual` field and is opened memory-mapped by
+    `CrossSectionalMRStrategy`, so every backtest of a sweep reads the same
+    pages instead of recomputing or pickling the matrix.
+
+    Args:
+        df: Long-format bars
+        path: Output panel directory
+        sectors: Symbol to sector mapping (default: market factor only)
+        lookback: Bars of residual returns to accumulate
+        field: Price column (default: close)
+        timestamp_col: Name of the timestamp column
+        symbol_col: Name of the symbol column
+
+    Returns:
+        The panel directory
+    """
+    wide = df.pivot(
+        on=symbol_col, index=timestamp_col, values=field, sort_columns=True
+    ).sort(timestamp_col)
+    symbols = [col for col in wide.columns if col != timestamp_col]
+
+    residuals = residual_returns(
+        wide.select(symbols).to_numpy().astype(np.float64),
+        factor_exposures(symbols, sectors),
+        lookback=lookback,
+    )
+    long = pl.DataFrame(
+        {
+            timestamp_col: np.repeat(wide[timestamp_col].to_numpy(), len(symbols)),
+            symbol_col: np.tile(symbols, len(wide)),
+            RESIDUAL_FIELD: residuals.ravel(),
+        },
+        schema_overrides={timestamp_col: wide.schema[timestamp_col]},
+    ).drop_nans(RESIDUAL_FIELD)
+
+    logger.info(f"Residual matrix: {len(wide)} bars x {len(symbols)} symbols")
+    return write_panel(
+        long,
+        path,
+        fields=[RESIDUAL_FIELD],
+        timestamp_col=timestamp_col,
+        symbol_col=symbol_col,
+    )
+
+
+def _open_residuals(residuals: str | Path | dict) -> dict:
+    """Open a residual panel once per process, or pass a loaded one through"""
+    if isinstance(residuals, dict):
+        return residuals
+    key = str(Path(residuals).resolve())
+    stat = os.stat(key)
+    version = (stat.st_ino, stat.st_mtime_ns)
+    cached = _residual_panels.get(key)
+    if cached is None or cached[0] != version:
+        _residual_panels[key] = (version, load_panel(key, fields=[RESIDUAL_FIELD]))
+    return _residual_panels[key][1]
 
 
 class CrossSectionalMRStrategy(bt.Strategy):
     """
     Cross-Sectional Mean Reversion Strategy.
     Implements logic to identify and trade mean-reverting assets based on residuals.
+
+    The residuals of returns on market/sector factors are computed up front for
+    all bars by `write_residuals` and passed as the `residuals` panel path (or a
+    panel dict from `load_panel`). `next()` only advances a cursor to the row of
+    the current bar and turns it into weights with `residual_weights`, so the
+    per-bar work does not grow with the history.
     """
 
+    params = (
+        ("residuals", None),  # Panel written by `write_residuals`
+        ("entry_z", 1.0),  # Minimum |z| of a residual to hold a position
+        ("rebalance_bars", 1),  # Rebalance every N bars
+        ("min_trade", 0.02),  # Skip trades smaller than this fraction of value
+    )
+
     def __init__(self):
-        pass
-        # Additional initialization for cross-sectional mean reversion can be added here
+        if self.p.residuals is None:
+            raise ValueError("CrossSectionalMRStrategy needs a `residuals` panel")
+        panel = _open_residuals(self.p.residuals)
+        self.residuals = panel[RESIDUAL_FIELD]
+        self.timestamps = panel["timestamps"].astype("datetime64[us]").astype(np.int64)
+
+        # Panel column of every feed, -1 for symbols without residuals
+        columns = {str(symbol): i for i, symbol in enumerate(panel["symbols"])}
+        self.columns = np.array([columns.get(data._name, -1) for data in self.datas])
+        missing = [d._name for d, c in zip(self.datas, self.columns) if c < 0]
+        if missing:
+            logger.warning(f"No residuals for {missing}, they are never traded")
+
+        self.row = 0
+        self.bar_count = 0
+        self.closes = np.full(len(self.datas), np.nan)
+        self.weights = np.zeros(len(self.datas))
+
+    def _current_row(self) -> int | None:
+        """Row of the residual matrix for the current bar, if there is one"""
+        # Float day clocks only resolve a few microseconds, so round to the ms
+        days = self.data.datetime[0] - PolarsData._EPOCH_ORDINAL
+        epoch_us = round(days * PolarsData._US_PER_DAY / 1000) * 1000
+
+        # Bars arrive in time order, so the cursor only moves forward
+        while self.row < len(self.timestamps) and self.timestamps[self.row] < epoch_us:
+            self.row += 1
+        if self.row < len(self.timestamps) and self.timestamps[self.row] == epoch_us:
+            return self.row
+        return None
 
     def prenext(self):
-        pass
+        # Symbols start trading as soon as they have residuals
+        self.next()
 
     def next(self):
-        # Implement the cross-sectional mean reversion logic here
-        pass
+        row = self._current_row()
+        self.bar_count += 1
+        if row is None or self.bar_count % self.p.rebalance_bars != 0:
+            return
+
+        self.closes[:] = [
+            data.close[0] if len(data) > 0 else np.nan for data in self.datas
+        ]
+        residuals = np.where(
+            (self.columns >= 0) & np.isfinite(self.closes),
+            self.residuals[row, np.maximum(self.columns, 0)],
+            np.nan,
+        )
+        self.weights[:] = residual_weights(residuals, entry_z=self.p.entry_z)[0]
+
+        portfolio_value = self.broker.getvalue()
+        sizes = np.array([self.getposition(data).size for data in self.datas])
+        current = np.where(np.isfinite(self.closes), sizes * self.closes, 0.0)
+        value_diff = portfolio_value * self.weights - current
+
+        rebalance = np.isfinite(self.closes) & (
+            np.abs(value_diff) > portfolio_value * self.p.min_trade
+        )
+        for i in np.flatnonzero(rebalance):
+            size = value_diff[i] / self.closes[i]
+            self.order_target_size(data=self.datas[i], target=sizes[i] + size)
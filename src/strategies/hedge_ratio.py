@@ -0,0 +1,248 @@
+import numpy as np
+
+from strategies.indicators import RollingWindow
+
+
+class RollingOLS:
+    """
+    Hedge ratio and intercept of `y = alpha + beta * x` over the last `window`
+    bars of `n_pairs` pairs, like refitting `LinearRegression` on every window.
+
+    The window sums of x, y, x² and xy are updated in O(1) per bar from two
+    ring buffers and re-summed every `window` updates so floating-point drift
+    cannot accumulate. A NaN anywhere in the window makes the output NaN until it
+    rolls out. Use this as the exact reference for the recursive estimators.
+
+    Inside a Backtrader strategy, feed the closes of the two legs of every pair
+    once per bar, e.g. `ols.update(closes[y_idx], closes[x_idx], mask=new_bar)`.
+    """
+
+    def __init__(self, window: int, n_pairs: int):
+        if window < 2:
+            raise ValueError(f"window must be >= 2, got {window}")
+        self.window = window
+        self.n_pairs = n_pairs
+        self._y = RollingWindow(window, n_pairs)
+        self._x = RollingWindow(window, n_pairs)
+        self._sums = np.zeros((4, n_pairs))  # x, y, x², xy
+        self._nans = np.zeros(n_pairs, dtype=np.intp)
+        self._updates = 0
+
+    @staticmethod
+    def _terms(y: np.ndarray, x: np.ndarray) -> np.ndarray:
+        return np.stack([x, y, x * x, x * y])
+
+    def update(
+        self, y: np.ndarray, x: np.ndarray, mask: np.ndarray | None = None
+    ) -> np.ndarray:
+        """Push the new prices of the selected pairs and return the hedge ratios"""
+        cols, evicted_y, was_full = self._y.push(y, mask)
+        _, evicted_x, _ = self._x.push(x, mask)
+        slot = (self._y.pos[cols] - 1) % self.window
+        added_y = self._y.buffer[slot, cols]
+        added_x = self._x.buffer[slot, cols]
+
+        added_nan = np.isnan(added_y) | np.isnan(added_x)
+        evicted_nan = (np.isnan(evicted_y) | np.isnan(evicted_x)) & was_full
+        added = self._terms(
+            np.where(added_nan, 0.0, added_y), np.where(added_nan, 0.0, added_x)
+        )
+        evicted_zero = np.isnan(evicted_y) | np.isnan(evicted_x)
+        evicted = self._terms(
+            np.where(evicted_zero, 0.0, evicted_y),
+            np.where(evicted_zero, 0.0, evicted_x),
+        )
+        self._sums[:, cols] += added - evicted
+        self._nans[cols] += added_nan.astype(np.intp) - evicted_nan
+
+        self._updates += 1
+        if self._updates % self.window == 0:
+            ys, xs = self._y.buffer, self._x.buffer
+            nan = np.isnan(ys) | np.isnan(xs)
+            self._sums = self._terms(
+                np.where(nan, 0.0, ys), np.where(nan, 0.0, xs)
+            ).sum(axis=1)
+
+        return self.beta
+
+    @property
+    def valid(self) -> np.ndarray:
+        return self._y.ready & (self._nans == 0)
+
+    def _fit(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        sx, sy, sxx, sxy = self._sums / self.window
+        var_x = sxx - sx**2
+        with np.errstate(divide="ignore", invalid="ignore"):
+            beta = (sxy - sx * sy) / var_x
+        alpha = sy - beta * sx
+        return beta, alpha, var_x
+
+    @property
+    def beta(self) -> np.ndarray:
+        beta, _, var_x = self._fit()
+        return np.where(self.valid & (var_x > 0), beta, np.nan)
+
+    @property
+    def alpha(self) -> np.ndarray:
+        _, alpha, var_x = self._fit()
+        return np.where(self.valid & (var_x > 0), alpha, np.nan)
+
+    @property
+    def value(self) -> np.ndarray:
+        return self.beta
+
+
+class KalmanHedgeRatio:
+    """
+    Time-varying hedge ratio of `y = alpha + beta * x` for `n_pairs` pairs,
+    tracked by a Kalman filter whose state (beta, alpha) follows a random walk.
+
+    Each update is a closed-form 2-state filter step vectorized over the pairs,
+    O(1) per bar. `delta` sets how fast the state may drift: the state noise is
+    `delta / (1 - delta)` times the identity, and `obs_var` is the variance of
+    the observation noise. The innovation `y - (alpha + beta * x)` and its
+    variance are kept, so `innovation / sqrt(innovation_var)` is a ready-made
+    spread z-score. Pairs with a NaN price, or outside `mask`, keep their state.
+
+    Inside a Backtrader strategy, call `update` once per bar with the closes of
+    the two legs of every pair, e.g. `kf.update(closes[y_idx], closes[x_idx])`.
+    """
+
+    def __init__(
+        self,
+        n_pairs: int,
+        delta: float = 1e-4,
+        obs_var: float = 1e-3,
+        initial_var: float = 1.0,
+    ):
+        self.n_pairs = n_pairs
+        self.obs_var = obs_var
+        self.state_var = delta / (1.0 - delta)
+        self.count = np.zeros(n_pairs, dtype=np.intp)
+        self._state = np.zeros((n_pairs, 2))  # beta, alpha
+        self._cov = np.tile(np.eye(2) * initial_var, (n_pairs, 1, 1))
+        self.innovation = np.full(n_pairs, np.nan)
+        self.innovation_var = np.full(n_pairs, np.nan)
+        self._pairs = np.arange(n_pairs)
+
+    def _predict(self, cov: np.ndarray) -> np.ndarray:
+        """Covariance of the state before the new observation"""
+        return cov + self.state_var * np.eye(2)
+
+    def update(
+        self, y: np.ndarray, x: np.ndarray, mask: np.ndarray | None = None
+    ) -> np.ndarray:
+        """Filter the new prices of the selected pairs and return the hedge ratios"""
+        y = np.asarray(y, dtype=np.float64)
+        x = np.asarray(x, dtype=np.float64)
+        cols = self._pairs if mask is None else self._pairs[mask]
+        cols = cols[np.isfinite(y[cols]) & np.isfinite(x[cols])]
+
+        h = np.stack([x[cols], np.ones(len(cols))], axis=1)
+        cov = self._predict(self._cov[cols])
+        cov_h = np.einsum("nij,nj->ni", cov, h)
+        innovation_var = np.einsum("ni,ni->n", h, cov_h) + self.obs_var
+        innovation = y[cols] - np.einsum("ni,ni->n", h, self._state[cols])
+
+        gain = cov_h / innovation_var[:, None]
+        self._state[cols] += gain * innovation[:, None]
+        self._cov[cols] = cov - gain[:, :, None] * cov_h[:, None, :]
+
+        self.innovation[cols] = innovation
+        self.innovation_var[cols] = innovation_var
+        self.count[cols] += 1
+        return self.beta
+
+    @property
+    def beta(self) -> np.ndarray:
+        return np.where(self.count > 0, self._state[:, 0], np.nan)
+
+    @property
+    def alpha(self) -> np.ndarray:
+        return np.where(self.count > 0, self._state[:, 1], np.nan)
+
+    @property
+    def value(self) -> np.ndarray:
+        return self.beta
+
+
+class RecursiveLeastSquares(KalmanHedgeRatio):
+    """
+    Exponentially weighted least-squares hedge ratio, updated in O(1) per bar.
+
+    Observations `k` bars old get weight `forgetting ** k`, so the effective
+    window is about `1 / (1 - forgetting)` bars (0.99 ≈ 100 bars). This is the
+    Kalman filter above with the state covariance inflated by `1 / forgetting`
+    at every step instead of a fixed state noise, and unit observation variance;
+    `initial_var` is the (large) prior variance of beta and alpha.
+    """
+
+    def __init__(
+        self, n_pairs: int, forgetting: float = 0.99, initial_var: float = 1e4
+    ):
+        if not 0.0 < forgetting <= 1.0:
+            raise ValueError(f"forgetting must be in (0, 1], got {forgetting}")
+        super().__init__(n_pairs, obs_var=1.0, initial_var=initial_var)
+        self.forgetting = forgetting
+
+    def _predict(self, cov: np.ndarray) -> np.ndarray:
+        return cov / self.forgetting
+
+
+def rolling_ols(
+    y: np.ndarray, x: np.ndarray, window: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Rolling OLS hedge ratios refitted from scratch on every window, O(window)
+    per bar. Slow but independent of the streaming estimators, for validating
+    them.
+
+    Args:
+        y: (T, P) prices of the dependent legs
+        x: (T, P) prices of the regressor legs
+        window: Bars per regression
+
+    Returns:
+        Tuple of (T, P) matrices (beta, alpha); the first `window - 1` rows and
+        windows containing NaN are NaN
+    """
+    y = np.asarray(y, dtype=np.float64).reshape(len(y), -1)
+    x = np.asarray(x, dtype=np.float64).reshape(len(x), -1)
+    beta = np.full(y.shape, np.nan)
+    alpha = np.full(y.shape, np.nan)
+
+    for t in range(window - 1, len(y)):
+        y_win = y[t - window + 1 : t + 1]
+        x_win = x[t - window + 1 : t + 1]
+        x_mean = x_win.mean(axis=0)
+        y_mean = y_win.mean(axis=0)
+        x_dev = x_win - x_mean
+        with np.errstate(divide="ignore", invalid="ignore"):
+            beta[t] = (x_dev * (y_win - y_mean)).sum(axis=0) / (x_dev**2).sum(axis=0)
+        alpha[t] = y_mean - beta[t] * x_mean
+    return beta, alpha
+
+
+def hedge_ratio_paths(
+    estimator: RollingOLS | KalmanHedgeRatio, y: np.ndarray, x: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Run a streaming estimator over whole price matrices, e.g. to build spreads
+    for `run_vectorized_backtest`. Row t of the output only uses bars up to t.
+
+    Args:
+        estimator: Fresh estimator created with `n_pairs = P`
+        y: (T, P) prices of the dependent legs
+        x: (T, P) prices of the regressor legs
+
+    Returns:
+        Tuple of (T, P) matrices (beta, alpha)
+    """
+    y = np.asarray(y, dtype=np.float64)
+    x = np.asarray(x, dtype=np.float64)
+    beta = np.empty(y.shape)
+    alpha = np.empty(y.shape)
+    for t in range(len(y)):
+        beta[t] = estimator.update(y[t], x[t])
+        alpha[t] = estimator.alpha
+    return beta, alpha
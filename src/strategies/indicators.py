@@ -0,0 +1,204 @@
+import numpy as np
+
+
+class RollingWindow:
+    """
+    Ring buffer holding the last `window` values of `n_symbols` series.
+
+    Every kernel below updates all symbols at once from a (n_symbols,) array of
+    new values in O(1) per symbol. Passing a boolean `mask` to `update` only
+    advances the selected symbols, e.g. the feeds that printed a new bar, while
+    the others keep their state and current value.
+    """
+
+    def __init__(self, window: int, n_symbols: int):
+        if window < 1:
+            raise ValueError(f"window must be >= 1, got {window}")
+        self.window = window
+        self.n_symbols = n_symbols
+        self.buffer = np.full((window, n_symbols), np.nan)
+        self.pos = np.zeros(n_symbols, dtype=np.intp)  # next slot per symbol
+        self.count = np.zeros(n_symbols, dtype=np.intp)  # values pushed per symbol
+        self._symbols = np.arange(n_symbols)
+
+    def _columns(self, mask: np.ndarray | None) -> np.ndarray:
+        return self._symbols if mask is None else self._symbols[mask]
+
+    def push(
+        self, x: np.ndarray, mask: np.ndarray | None = None
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Insert the new values of the selected symbols.
+
+        Returns:
+            Tuple of (columns updated, values evicted from the window, whether
+            the window was already full before the push)
+        """
+        cols = self._columns(mask)
+        slot = self.pos[cols]
+        was_full = self.count[cols] >= self.window
+        evicted = self.buffer[slot, cols]
+
+        self.buffer[slot, cols] = np.asarray(x, dtype=np.float64)[cols]
+        self.pos[cols] = (slot + 1) % self.window
+        self.count[cols] += 1
+        return cols, evicted, was_full
+
+    @property
+    def ready(self) -> np.ndarray:
+        """Symbols whose window is full"""
+        return self.count >= self.window
+
+
+class RollingMean(RollingWindow):
+    """
+    Simple moving average over `window` bars, like `bt.indicators.SMA`.
+
+    Running sums are updated in O(1) per bar and re-summed from the buffer every
+    `window` updates so floating-point drift cannot accumulate. A NaN anywhere in
+    the window makes the output NaN until it rolls out.
+    """
+
+    # Powers of x whose running sums are maintained
+    powers = (1,)
+
+    def __init__(self, window: int, n_symbols: int):
+        super().__init__(window, n_symbols)
+        self._sums = np.zeros((len(self.powers), n_symbols))
+        self._nans = np.zeros(n_symbols, dtype=np.intp)
+        self._updates = 0
+
+    def update(self, x: np.ndarray, mask: np.ndarray | None = None) -> np.ndarray:
+        """Push the new values and return the current output for all symbols"""
+        cols, evicted, was_full = self.push(x, mask)
+        added = self.buffer[(self.pos[cols] - 1) % self.window, cols]
+
+        added_nan = np.isnan(added)
+        evicted_nan = np.isnan(evicted) & was_full
+        added = np.where(added_nan, 0.0, added)
+        evicted = np.where(np.isnan(evicted), 0.0, evicted)
+
+        for i, power in enumerate(self.powers):
+            self._sums[i, cols] += added**power - evicted**power
+        self._nans[cols] += added_nan.astype(np.intp) - evicted_nan
+
+        self._updates += 1
+        if self._updates % self.window == 0:
+            for i, power in enumerate(self.powers):
+                self._sums[i] = np.nansum(self.buffer**power, axis=0)
+
+        return self.value
+
+    def _moments(self) -> np.ndarray:
+        """Window means of each power of x"""
+        return self._sums / self.window
+
+    @property
+    def valid(self) -> np.ndarray:
+        return self.ready & (self._nans == 0)
+
+    @property
+    def value(self) -> np.ndarray:
+        return np.where(self.valid, self._moments()[0], np.nan)
+
+
+class RollingStd(RollingMean):
+    """
+    Population standard deviation over `window` bars, computed like
+    `bt.indicators.StandardDeviation`: sqrt(|mean(x^2) - mean(x)^2|).
+    """
+
+    powers = (1, 2)
+
+    @property
+    def mean(self) -> np.ndarray:
+        return np.where(self.valid, self._moments()[0], np.nan)
+
+    @property
+    def value(self) -> np.ndarray:
+        mean, mean_sq = self._moments()
+        std = np.sqrt(np.abs(mean_sq - mean**2))
+        return np.where(self.valid, std, np.nan)
+
+
+class RollingZScore(RollingStd):
+    """Z-score of the latest value against its trailing `window` mean and std"""
+
+    def __init__(self, window: int, n_symbols: int):
+        super().__init__(window, n_symbols)
+        self._last = np.full(n_symbols, np.nan)
+
+    def update(self, x: np.ndarray, mask: np.ndarray | None = None) -> np.ndarray:
+        cols = self._columns(mask)
+        self._last[cols] = np.asarray(x, dtype=np.float64)[cols]
+        return super().update(x, mask)
+
+    @property
+    def value(self) -> np.ndarray:
+        std = super().value
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return (self._last - self.mean) / std
+
+
+class EWMA:
+    """
+    Exponentially weighted moving average, like `bt.indicators.EMA`.
+
+    The first `period` values seed the average with their simple mean, and each
+    later value updates it as `prev * (1 - alpha) + x * alpha` with
+    `alpha = 2 / (1 + period)` unless `alpha` is given.
+    """
+
+    def __init__(self, period: int, n_symbols: int, alpha: float | None = None):
+        self.period = period
+        self.alpha = 2.0 / (1.0 + period) if alpha is None else alpha
+        self.n_symbols = n_symbols
+        self.count = np.zeros(n_symbols, dtype=np.intp)
+        self._seed_sum = np.zeros(n_symbols)
+        self._value = np.full(n_symbols, np.nan)
+        self._symbols = np.arange(n_symbols)
+
+    def update(self, x: np.ndarray, mask: np.ndarray | None = None) -> np.ndarray:
+        cols = self._symbols if mask is None else self._symbols[mask]
+        x = np.asarray(x, dtype=np.float64)[cols]
+        self.count[cols] += 1
+        count = self.count[cols]
+
+        seeding = count <= self.period
+        self._seed_sum[cols[seeding]] += x[seeding]
+
+        seeded = cols[count == self.period]
+        self._value[seeded] = self._seed_sum[seeded] / self.period
+
+        smoothing = count > self.period
+        rolled = cols[smoothing]
+        self._value[rolled] = (
+            self._value[rolled] * (1.0 - self.alpha) + x[smoothing] * self.alpha
+        )
+        return self._value.copy()
+
+    @property
+    def value(self) -> np.ndarray:
+        return self._value.copy()
+
+
+class RateOfChange(RollingWindow):
+    """
+    Rate of change over `period` bars, like `bt.indicators.RateOfChange`:
+    (x - x[-period]) / x[-period].
+    """
+
+    def __init__(self, period: int, n_symbols: int):
+        super().__init__(period, n_symbols)
+        self._value = np.full(n_symbols, np.nan)
+
+    def update(self, x: np.ndarray, mask: np.ndarray | None = None) -> np.ndarray:
+        cols, evicted, was_full = self.push(x, mask)
+        added = self.buffer[(self.pos[cols] - 1) % self.window, cols]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self._value[cols] = np.where(was_full, (added - evicted) / evicted, np.nan)
+        return self._value.copy()
+
+    @property
+    def value(self) -> np.ndarray:
+        return self._value.copy()
@@ -0,0 +1,360 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import polars as pl
+from statsmodels.tsa.adfvalues import mackinnoncrit
+from statsmodels.tsa.stattools import coint
+
+from backtesting.vectorized import price_matrix
+from logger.logging import get_logger
+
+logger = get_logger(__name__)  # Creates 'strategies.pairs'
+
+# Significance levels of the MacKinnon critical values returned by `mackinnoncrit`
+CRITICAL_LEVELS = (0.01, 0.05, 0.10)
+
+# Log-price matrix shared with the exact-test workers
+_pairs_log_prices: np.ndarray | None = None
+
+
+def prepare_log_prices(
+    prices: np.ndarray, min_coverage: float = 0.9
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Turn a (time × symbol) price matrix with gaps into a complete log-price
+    matrix for the pairs scan.
+
+    Gaps are forward-filled, symbols listed for less than `min_coverage` of the
+    bars are dropped, and the rows before the latest first price of the
+    remaining symbols are cut so every column is complete.
+
+    Args:
+        prices: (T, N) matrix of prices, NaN where a symbol has no bar
+        min_coverage: Minimum fraction of bars a symbol must have a price for
+
+    Returns:
+        Tuple of (complete (T', N') log-price matrix, indices of the kept
+        symbols)
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    n_bars = prices.shape[0]
+    valid = np.isfinite(prices) & (prices > 0)
+
+    # Forward fill along time with the index of the last valid row
+    last = np.where(valid, np.arange(n_bars)[:, None], 0)
+    np.maximum.accumulate(last, axis=0, out=last)
+    filled = np.take_along_axis(np.where(valid, prices, np.nan), last, axis=0)
+
+    first = np.where(valid.any(axis=0), valid.argmax(axis=0), n_bars)
+    keep = np.flatnonzero(first <= (1.0 - min_coverage) * n_bars)
+    if len(keep) < prices.shape[1]:
+        logger.warning(
+            f"Dropped {prices.shape[1] - len(keep)} symbols with less than "
+            f"{min_coverage:.0%} price coverage"
+        )
+    start = int(first[keep].max()) if len(keep) else 0
+    return np.log(filled[start:, keep]), keep
+
+
+def batch_engle_granger(
+    log_prices: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Engle-Granger statistics of every ordered pair at once.
+
+    For each pair (i, j) the spread is the residual of the OLS regression
+    `y_i = alpha + beta * x_j`, and the statistic is the Dickey-Fuller t-stat of
+    `Δe_t = gamma * e_{t-1}` on that spread, the lag-0 version of
+    `statsmodels.tsa.stattools.coint`. Every sum the two regressions need is a
+    quadratic form of the demeaned prices, so the whole N × N grid follows from
+    three Gram matrices (levels, lagged levels × changes, changes) computed with
+    one matrix product each, in O(T·N²) time and O(N²) memory.
+
+    Args:
+        log_prices: Complete (T, N) matrix of log prices
+
+    Returns:
+        Tuple of (N, N) matrices `beta`, `alpha`, `stat` and `half_life`,
+        where row i is the dependent series and column j the regressor; the
+        diagonal is NaN. The half-life is in bars, 0 for a spread that reverts
+        fully within one bar (gamma <= -1) and inf for one that does not revert
+    """
+    log_prices = np.asarray(log_prices, dtype=np.float64)
+    n_bars = log_prices.shape[0]
+    mean = log_prices.mean(axis=0)
+    levels = log_prices - mean
+    lagged = levels[:-1]
+    changes = np.diff(levels, axis=0)
+
+    gram = levels.T @ levels
+    cross = lagged.T @ changes  # cross[i, j] = Σ e_i,t-1 · Δe_j,t
+    lagged_gram = lagged.T @ lagged
+    change_gram = changes.T @ changes
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        var = np.diag(gram)
+        beta = gram / var[None, :]
+        alpha = mean[:, None] - beta * mean[None, :]
+
+        def quadratic(m: np.ndarray) -> np.ndarray:
+            """Σ_t (u_i - beta·u_j)(v_i - beta·v_j) of every pair, for m = U'V"""
+            d = np.diag(m)
+            return d[:, None] - beta * (m + m.T) + beta**2 * d[None, :]
+
+        s_xx = quadratic(lagged_gram)
+        s_xy = quadratic(cross)
+        s_yy = quadratic(change_gram)
+
+        gamma = s_xy / s_xx
+        n_obs = n_bars - 1
+        sigma2 = np.maximum(s_yy - gamma * s_xy, 0.0) / (n_obs - 1)
+        stat = gamma / np.sqrt(sigma2 / s_xx)
+        # gamma <= -1 removes the whole spread within one bar: half-life 0
+        half_life = np.select(
+            [gamma <= -1, gamma < 0],
+            [0.0, -np.log(2) / np.log1p(np.maximum(gamma, -1 + 1e-12))],
+            np.inf,
+        )
+
+    np.fill_diagonal(beta, np.nan)
+    np.fill_diagonal(alpha, np.nan)
+    np.fill_diagonal(stat, np.nan)
+    np.fill_diagonal(half_life, np.nan)
+    return beta, alpha, stat, half_life
+
+
+def _init_pairs_worker(log_prices: np.ndarray) -> None:
+    """Receive the log-price matrix once per worker process"""
+    global _pairs_log_prices
+    _pairs_log_prices = log_prices
+
+
+def _coint_pairs(
+    pairs: list[tuple[int, int]], maxlag: int | None, autolag: str | None
+) -> list[tuple[float, float]]:
+    """Exact Engle-Granger test (statistic, p-value) of each (y, x) column pair"""
+    results = []
+    for y, x in pairs:
+        stat, pvalue, _ = coint(
+            _pairs_log_prices[:, y],
+            _pairs_log_prices[:, x],
+            trend="c",
+            maxlag=maxlag,
+            autolag=autolag,
+        )
+        results.append((float(stat), float(pvalue)))
+    return results
+
+
+def exact_cointegration(
+    log_prices: np.ndarray,
+    pairs: list[tuple[int, int]],
+    maxlag: int | None = None,
+    autolag: str | None = "aic",
+    max_workers: int | None = None,
+) -> list[tuple[float, float]]:
+    """
+    Run `statsmodels` Engle-Granger tests (augmented lags, MacKinnon p-values)
+    on the given (y, x) column pairs.
+
+    The pairs are split into a few chunks per worker of a process pool whose
+    workers receive the log-price matrix once in their initializer. Workers are
+    spawned, so scripts calling this need an `if __name__ == "__main__":` guard;
+    `max_workers=1` runs the tests in the calling process instead.
+
+    Args:
+        log_prices: Complete (T, N) matrix of log prices
+        pairs: (dependent, regressor) column indices
+        maxlag: Maximum ADF lag (default: statsmodels' rule of thumb)
+        autolag: ADF lag selection criterion passed to `coint`
+        max_workers: Number of worker processes (default: CPU count)
+
+    Returns:
+        (statistic, p-value) of each pair, in the order of `pairs`
+    """
+    if not pairs:
+        return []
+    if max_workers == 1:
+        _init_pairs_worker(log_prices)
+        return _coint_pairs(pairs, maxlag, autolag)
+
+    n_workers = max_workers or multiprocessing.cpu_count()
+    n_chunks = min(len(pairs), 4 * n_workers)
+    chunks = [pairs[i::n_chunks] for i in range(n_chunks)]
+
+    results: list[tuple[float, float]] = [(np.nan, np.nan)] * len(pairs)
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_pairs_worker,
+        initargs=(log_prices,),
+    ) as executor:
+        chunk_results = executor.map(
+            _coint_pairs,
+            chunks,
+            [maxlag] * n_chunks,
+            [autolag] * n_chunks,
+        )
+        for i, chunk_result in enumerate(chunk_results):
+            results[i::n_chunks] = chunk_result
+    return results
+
+
+def screen_pairs(
+    log_prices: np.ndarray,
+    symbols: list[str],
+    screen_level: float = 0.01,
+    min_half_life: float = 0.0,
+    max_half_life: float | None = None,
+    max_pairs: int | None = None,
+) -> pl.DataFrame:
+    """
+    Batch screen of all N·(N-1)/2 pairs.
+
+    Each unordered pair is oriented in the direction with the more negative
+    statistic, then kept when the statistic is below the MacKinnon critical
+    value at `screen_level` and the half-life is within bounds.
+
+    Args:
+        log_prices: Complete (T, N) matrix of log prices
+        symbols: Column labels of `log_prices`
+        screen_level: Significance level of the screening critical value, one
+                      of 0.01, 0.05 or 0.10 (default: 0.01; with N·(N-1)/2
+                      tests even independent random walks pass looser levels
+                      by the thousands, and each exact test costs ~0.3s)
+        min_half_life: Minimum half-life of the spread in bars (default: 0,
+                       keeping spreads that revert within one bar)
+        max_half_life: Maximum half-life in bars (default: T / 2)
+        max_pairs: Keep at most this many pairs with the lowest statistics
+
+    Returns:
+        DataFrame with `y`, `x`, `hedge_ratio`, `intercept`, `adf_stat` and
+        `half_life`, sorted by `adf_stat`, plus the column indices `y_idx` and
+        `x_idx`
+    """
+    if screen_level not in CRITICAL_LEVELS:
+        raise ValueError(f"screen_level must be one of {CRITICAL_LEVELS}")
+    n_bars = log_prices.shape[0]
+    max_half_life = n_bars / 2 if max_half_life is None else max_half_life
+    critical = mackinnoncrit(N=2, regression="c", nobs=n_bars - 1)[
+        CRITICAL_LEVELS.index(screen_level)
+    ]
+
+    beta, alpha, stat, half_life = batch_engle_granger(log_prices)
+
+    upper_i, upper_j = np.triu_indices(len(symbols), k=1)
+    flip = stat[upper_j, upper_i] < stat[upper_i, upper_j]
+    y = np.where(flip, upper_j, upper_i)
+    x = np.where(flip, upper_i, upper_j)
+
+    pair_stat = stat[y, x]
+    pair_half_life = half_life[y, x]
+    keep = (
+        (pair_stat < critical)
+        & (pair_half_life >= min_half_life)
+        & (pair_half_life <= max_half_life)
+    )
+    y, x = y[keep], x[keep]
+    order = np.argsort(stat[y, x], kind="stable")[:max_pairs]
+    y, x = y[order], x[order]
+
+    logger.info(
+        f"Screened {len(upper_i)} pairs, {len(y)} below the "
+        f"{screen_level:.0%} critical value {critical:.2f}"
+    )
+    names = np.asarray(symbols)
+    return pl.DataFrame(
+        {
+            "y": names[y],
+            "x": names[x],
+            "hedge_ratio": beta[y, x],
+            "intercept": alpha[y, x],
+            "adf_stat": stat[y, x],
+            "half_life": half_life[y, x],
+            "y_idx": y,
+            "x_idx": x,
+        }
+    )
+
+
+def scan_pairs(
+    df: pl.DataFrame,
+    field: str = "close",
+    pvalue: float | None = 0.05,
+    screen_level: float = 0.01,
+    min_half_life: float = 0.0,
+    max_half_life: float | None = None,
+    max_pairs: int | None = None,
+    min_coverage: float = 0.9,
+    maxlag: int | None = None,
+    autolag: str | None = "aic",
+    max_workers: int | None = None,
+    timestamp_col: str = "timestamp",
+    symbol_col: str = "symbol",
+) -> pl.DataFrame:
+    """
+    Find cointegrated pairs across a whole universe.
+
+    All pairs are screened in batch with `screen_pairs` (OLS hedge ratios, a
+    lag-0 Engle-Granger statistic and the spread half-life), and only the
+    shortlist goes through the exact augmented test of `exact_cointegration`.
+    Scripts calling this need an `if __name__ == "__main__":` guard because the
+    exact-test workers are spawned.
+
+    Example:
+        >>> pairs = scan_pairs(bars.filter(pl.col("timestamp") < split), field="close")
+
+    Args:
+        df: Long-format bars
+        field: Price column to test (default: close)
+        pvalue: Maximum p-value of the exact test, or None to return the whole
+                shortlist
+        screen_level: Significance of the batch screen, see `screen_pairs`
+        min_half_life: Minimum spread half-life in bars (default: 0)
+        max_half_life: Maximum spread half-life in bars (default: T / 2)
+        max_pairs: Maximum size of the shortlist
+        min_coverage: See `prepare_log_prices`
+        maxlag: Maximum ADF lag of the exact test
+        autolag: ADF lag selection of the exact test
+        max_workers: Number of worker processes (default: CPU count)
+        timestamp_col: Name of the timestamp column
+        symbol_col: Name of the symbol column
+
+    Returns:
+        DataFrame with `y`, `x`, `hedge_ratio`, `intercept`, `adf_stat`,
+        `half_life`, `coint_stat` and `pvalue`, sorted by `pvalue`; trade the
+        spread `log(y) - hedge_ratio * log(x) - intercept`
+    """
+    _, symbols, prices = price_matrix(
+        df, field=field, timestamp_col=timestamp_col, symbol_col=symbol_col
+    )
+    log_prices, kept = prepare_log_prices(prices, min_coverage=min_coverage)
+    shortlist = screen_pairs(
+        log_prices,
+        [symbols[i] for i in kept],
+        screen_level=screen_level,
+        min_half_life=min_half_life,
+        max_half_life=max_half_life,
+        max_pairs=max_pairs,
+    )
+
+    tests = exact_cointegration(
+        log_prices,
+        list(zip(shortlist["y_idx"], shortlist["x_idx"])),
+        maxlag=maxlag,
+        autolag=autolag,
+        max_workers=max_workers,
+    )
+    result = (
+        shortlist.drop("y_idx", "x_idx")
+        .with_columns(
+            pl.Series("coint_stat", [stat for stat, _ in tests], dtype=pl.Float64),
+            pl.Series("pvalue", [p for _, p in tests], dtype=pl.Float64),
+        )
+        .sort("pvalue")
+    )
+    if pvalue is not None:
+        result = result.filter(pl.col("pvalue") <= pvalue)
+    logger.info(f"{result.height} of {shortlist.height} shortlisted pairs kept")
+    return result
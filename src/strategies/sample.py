@@ -2,10 +2,72 @@ import backtrader as bt
 import numpy as np
 
 from logger.logging import get_logger
+from strategies.indicators import RateOfChange, RollingStd
 
 logger = get_logger(__name__)  # Creates 'strategies.sample'
 
 
+def sample_weights(
+    prices: np.ndarray, z_threshold: float = 0.50, volatility_window: int = 10
+) -> np.ndarray:
+    """
+    Target weights of `SampleStrategy_Backtesting` for every bar at once, for
+    `run_vectorized_backtest`.
+
+    Row t uses prices up to bar t only and reproduces the strategy's rebalance
+    at the close of bar t (with `rebalance_hours=1`): one-bar returns, their
+    population standard deviation over `volatility_window` bars, a z-score of
+    the log returns across the available symbols and inverse-volatility
+    weights demeaned over the symbols beyond `z_threshold`. Like the strategy,
+    a bar with no usable signal targets a flat book.
+
+    Args:
+        prices: (T, N) matrix of closes, NaN where a symbol has no bar
+        z_threshold: Minimum absolute z-score to trade
+        volatility_window: Bars in the return standard deviation
+
+    Returns:
+        (T, N) target weights, 0 where a symbol is not held
+    """
+    prices = np.atleast_2d(np.asarray(prices, dtype=np.float64))
+    returns = np.full(prices.shape, np.nan)
+    returns[1:] = prices[1:] / prices[:-1] - 1.0
+
+    volatility = np.full(prices.shape, np.nan)
+    if len(prices) >= volatility_window:
+        windows = np.lib.stride_tricks.sliding_window_view(
+            returns, volatility_window, axis=0
+        )
+        mean = windows.mean(axis=-1)
+        volatility[volatility_window - 1 :] = np.sqrt(
+            np.abs((windows**2).mean(axis=-1) - mean**2)
+        )
+
+    available = np.isfinite(returns) & np.isfinite(volatility)
+    count = available.sum(axis=1, keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_rets = np.where(available, np.log(returns), 0.0)
+        market_ret = log_rets.sum(axis=1, keepdims=True) / count
+        market_vol = np.sqrt(
+            np.where(available, (log_rets - market_ret) ** 2, 0.0).sum(
+                axis=1, keepdims=True
+            )
+            / count
+        )
+        z = np.where(available, (log_rets - market_ret) / market_vol, np.nan)
+
+        active = np.abs(z) > z_threshold
+        signal = -z / np.clip(volatility, 1e-6, None)
+        signal -= np.where(active, signal, 0.0).sum(axis=1, keepdims=True) / active.sum(
+            axis=1, keepdims=True
+        )
+        signal = np.where(np.abs(z) < z_threshold, 0.0, signal)
+        signal = np.where(available, signal, 0.0)
+        gross = np.abs(signal).sum(axis=1, keepdims=True)
+        weights = signal / gross
+    return np.where(np.isfinite(weights), weights, 0.0)
+
+
 class SampleStrategy_Backtesting(bt.Strategy):
     """
     Multi-asset strategy using returns and volatility to calculate weights.
@@ -14,6 +76,7 @@ class SampleStrategy_Backtesting(bt.Strategy):
     params = (
         ("rebalance_hours", 1),  # Rebalance frequency in days
         ("z_threshold", 0.50),  # Don't trade with signals below this value
+        ("rebalance_band", 0.02),  # Skip trades below this fraction of the book
     )
 
     logger.info(f"Strategy parameters: {params}")
@@ -32,24 +95,41 @@ class SampleStrategy_Backtesting(bt.Strategy):
         # Store data feeds with their names
         self.data_dict = {}
         for _, data in enumerate(self.datas):
-            # Calculate returns and volatility indicators for each data feed
-            data.returns = bt.indicators.RateOfChange(data.close, period=1)
-            data.volatility = bt.indicators.StandardDeviation(data.returns, period=10)
-            # data.moving_average = bt.indicators.SimpleMovingAverage(data.close, period=20)
-            # data.moving_average = bt.indicators.ExponentialMovingAverage(data.close, period=20)
             # Get the symbol name from the data feed
             symbol = data._name
             self.data_dict[symbol] = data
 
+        # Returns and volatility for all feeds at once, updated in O(1) per bar.
+        # Same values as RateOfChange(close, period=1) and
+        # StandardDeviation(returns, period=10) attached to each feed.
+        n_symbols = len(self.datas)
+        self.returns_kernel = RateOfChange(period=1, n_symbols=n_symbols)
+        self.volatility_kernel = RollingStd(window=10, n_symbols=n_symbols)
+        self.closes = np.full(n_symbols, np.nan)
+        self.returns = np.full(n_symbols, np.nan)
+        self.volatility = np.full(n_symbols, np.nan)
+        self.weights = np.zeros(n_symbols)
+        self._data_lens = np.zeros(n_symbols, dtype=np.intp)
+
         logger.info(
             f"Initialized with {len(self.data_dict)} symbols: {list(self.data_dict.keys())}"
         )
 
+    def update_indicators(self):
+        """Advance the return/volatility kernels for feeds that printed a new bar"""
+        data_lens = np.array([len(data) for data in self.datas])
+        new_bar = data_lens > self._data_lens
+        self._data_lens = data_lens
+
+        self.closes[:] = [
+            data.close[0] if len(data) > 0 else np.nan for data in self.datas
+        ]
+        self.returns = self.returns_kernel.update(self.closes, mask=new_bar)
+        self.volatility = self.volatility_kernel.update(self.returns, mask=new_bar)
+
     def prenext(self):
         """Called before the minimum period for all data is met"""
-        # Track portfolio value even during warmup
-        self.portfolio_values.append(self.broker.getvalue())
-        self.dates.append(self.datas[0].datetime.datetime(0))
+        # Run the full logic during warmup; next() also tracks portfolio value
         self.next()
 
     def next(self):
@@ -58,38 +138,22 @@ class SampleStrategy_Backtesting(bt.Strategy):
         self.portfolio_values.append(self.broker.getvalue())
         self.dates.append(self.datas[0].datetime.datetime(0))
 
+        self.update_indicators()
         self.bar_count += 1
 
         # Only rebalance every N hours
         if self.bar_count % self.params.rebalance_hours != 0:
             return
 
-        # Get available symbols (ones that have data at current bar)
-        available_symbols = []
-        rets = []
-        vols = []
-
-        for symbol, data in self.data_dict.items():
-            # Check if this data feed has data at current bar
-            if len(data) > 0:
-                if len(self.data.returns) == 0 | len(self.data.volatility) == 0:
-                    continue
-                else:
-                    # Access the Returns line we added
-                    ret = data.returns[0]  # [0] gets the current bar
-                    vol = data.volatility[0]
-
-                # Skip if return and volatility is NaN
-                if not np.isnan(ret) and not np.isnan(vol):
-                    available_symbols.append(symbol)
-                    rets.append(ret)
-                    vols.append(vol)
-
-        if len(available_symbols) == 0:
+        # Symbols with data at the current bar and defined return and volatility
+        available = (
+            (self._data_lens > 0) & ~np.isnan(self.returns) & ~np.isnan(self.volatility)
+        )
+        if not available.any():
             return
 
-        log_rets = np.log(np.array(rets))
-        vols = np.clip(np.array(vols), 1e-6, None)
+        log_rets = np.log(self.returns[available])
+        vols = np.clip(self.volatility[available], 1e-6, None)
 
         # Calculate weights using your formula
         market_ret = np.mean(log_rets)
@@ -109,30 +173,27 @@ class SampleStrategy_Backtesting(bt.Strategy):
 
         # Normalize weights
         weights_sum = np.sum(np.abs(signal))
+        self.weights[:] = 0.0
         if weights_sum > 0:
-            weights = signal / weights_sum
-        else:
-            weights = np.zeros(len(available_symbols))
+            self.weights[available] = signal / weights_sum
 
         # Get current portfolio value
         portfolio_value = self.broker.getvalue()
 
-        # Rebalance portfolio
-        for i, symbol in enumerate(available_symbols):
-            data = self.data_dict[symbol]
-            target_value = portfolio_value * weights[i]
-
-            # Get current position
-            position = self.getposition(data)
-            current_value = position.size * data.close[0]
-
-            # Calculate how much to buy/sell
-            value_diff = target_value - current_value
+        # Target vs current value for every symbol in one step
+        sizes = np.array([self.getposition(data).size for data in self.datas])
+        value_diff = portfolio_value * self.weights - sizes * self.closes
 
-            if abs(value_diff) > portfolio_value * 0.02:  # Only trade if >2% difference
-                size = value_diff / data.close[0]
-
-                self.order_target_size(data=data, target=position.size + size)
+        # Only trade symbols whose target moved by more than the rebalance band
+        rebalance = available & (
+            np.abs(value_diff) > portfolio_value * self.params.rebalance_band
+        )
+        # Sells first, so the broker's cash check sees their proceeds when the
+        # buys are submitted
+        orders = np.flatnonzero(rebalance)
+        for i in orders[np.argsort(value_diff[orders], kind="stable")]:
+            size = value_diff[i] / self.closes[i]
+            self.order_target_size(data=self.datas[i], target=sizes[i] + size)
 
     def notify_order(self, order):
         """Called when an order status changes"""
@@ -0,0 +1,131 @@
+import logging
+from datetime import UTC, datetime
+
+import backtrader as bt
+import numpy as np
+import polars as pl
+import pytest
+
+from backtesting import engine
+from backtesting.engine import run_backtest
+from backtesting.metrics import max_drawdown
+from backtesting.vectorized import price_matrix, run_vectorized_backtest
+from data.market_calendar import session_calendar
+from strategies.sample import SampleStrategy_Backtesting, sample_weights
+
+
+class UnbandedSampleStrategy(SampleStrategy_Backtesting):
+    """The vectorized engine rebalances fully at every close"""
+
+    params = (("rebalance_band", 0.0),)
+
+
+@pytest.fixture(scope="module")
+def bars() -> pl.DataFrame:
+    """
+    Two years of daily bars for five symbols. Every bar opens at the previous
+    close, so Backtrader's next-open fills happen at the close the vectorized
+    engine trades at, and every return is positive, which the sample
+    strategy's log of simple returns needs to trade.
+    """
+    rng = np.random.default_rng(7)
+    sessions = session_calendar().filter(
+        pl.col("session").dt.year().is_between(2022, 2023)
+    )["session"]
+    growth = rng.uniform(0.001, 0.02, (len(sessions), 5))
+    close = 100 * np.cumprod(1 + growth, axis=0)
+    open_ = close / (1 + growth)
+    timestamps = sessions.cast(pl.Datetime("us")).dt.replace_time_zone("UTC")
+    return pl.concat(
+        pl.DataFrame(
+            {
+                "timestamp": timestamps,
+                "symbol": f"S{j}",
+                "open": open_[:, j],
+                "high": close[:, j],
+                "low": open_[:, j],
+                "close": close[:, j],
+                "volume": 1e6,
+                "trade_count": 100.0,
+                "vwap": close[:, j],
+            }
+        )
+        for j in range(5)
+    )
+
+
+def backtrader_summary(bars: pl.DataFrame, commission: float) -> dict:
+    logging.disable(logging.INFO)
+    try:
+        cerebro = run_backtest(bars, UnbandedSampleStrategy, commission=commission)
+    finally:
+        logging.disable(logging.NOTSET)
+    analyzers = cerebro.runstrats[0][0].analyzers
+    returns = analyzers.returns.get_analysis()
+    return {
+        "sharperatio": analyzers.sharpe.get_analysis()["sharperatio"],
+        "max_drawdown": analyzers.drawdown.get_analysis()["max"]["drawdown"],
+        "rtot": returns["rtot"],
+        "rnorm": returns["rnorm"],
+        "value": cerebro.broker.getvalue(),
+    }
+
+
+def vectorized_summary(bars: pl.DataFrame, commission: float) -> dict:
+    timestamps, symbols, prices = price_matrix(bars)
+    result = run_vectorized_backtest(
+        prices, sample_weights, timestamps, symbols, commission=commission
+    )
+    return {**result["summary"], "value": result["equity"][-1]}
+
+
+def test_vectorized_matches_backtrader_without_costs(bars):
+    expected = backtrader_summary(bars, commission=0.0)
+    actual = vectorized_summary(bars, commission=0.0)
+
+    for key, value in expected.items():
+        assert actual[key] == pytest.approx(value, rel=1e-9), key
+
+
+def test_vectorized_matches_backtrader_with_commission(bars):
+    # Backtrader sizes orders before their commission is paid while the
+    # vectorized engine reinvests net of it, so the curves drift apart by a
+    # fraction of the commission each bar
+    expected = backtrader_summary(bars, commission=0.001)
+    actual = vectorized_summary(bars, commission=0.001)
+
+    assert actual["value"] == pytest.approx(expected["value"], rel=5e-3)
+    assert actual["rtot"] == pytest.approx(expected["rtot"], abs=5e-3)
+    assert actual["rnorm"] == pytest.approx(expected["rnorm"], abs=5e-3)
+    assert actual["max_drawdown"] == pytest.approx(expected["max_drawdown"], abs=0.5)
+    assert actual["sharperatio"] == pytest.approx(expected["sharperatio"], rel=0.05)
+
+
+def test_max_drawdown_counts_a_loss_on_the_first_bar():
+    equity = np.array([90.0, 95.0, 99.0])
+
+    assert max_drawdown(equity) == 0.0
+    assert max_drawdown(equity, start_value=100.0) == pytest.approx(10.0)
+
+
+def test_sweep_point_without_bars_returns_null_metrics(bars, tmp_path, monkeypatch):
+    path = tmp_path / "bars.arrow"
+    bars.write_ipc(path)
+    monkeypatch.setattr(engine, "_sweep_data", None)
+    engine._init_sweep_worker(str(path))
+
+    result = engine._run_sweep_point(
+        SampleStrategy_Backtesting,
+        {"z_threshold": 0.5},
+        timeframe=bt.TimeFrame.Days,
+        cash=1_000.0,
+        commission=0.001,
+        start=datetime(2021, 1, 1, tzinfo=UTC),
+        end=datetime(2021, 6, 1, tzinfo=UTC),
+        record_equity=True,
+    )
+
+    assert result["z_threshold"] == 0.5
+    assert result["sharpe"] is None
+    assert result["final_value"] == 1_000.0
+    assert result["equity"] == []
@@ -0,0 +1,263 @@
+from datetime import UTC, datetime, timedelta
+from types import SimpleNamespace
+
+import polars as pl
+import pytest
+from alpaca.common.exceptions import APIError
+
+from data import download_data
+from data.bar_store import BarStore
+from data.download_data import download_bars, fetch_bars
+
+START = datetime(2024, 1, 2, 14, 30, tzinfo=UTC)
+END = START + timedelta(days=4)
+
+
+def api_error(status: int) -> APIError:
+    response = SimpleNamespace(status_code=status)
+    return APIError(
+        '{"code": 0, "message": "fake"}', SimpleNamespace(response=response)
+    )
+
+
+class FakeClient:
+    """
+    Serves one bar per day of the request. `failures` lists, per symbol, the
+    exceptions to raise or malformed responses to return first.
+    """
+
+    def __init__(self, failures: dict[str, list[Exception]] | None = None):
+        self.failures = {k: list(v) for k, v in (failures or {}).items()}
+        self.calls = []
+
+    def get_stock_bars(self, request):
+        symbol = request.symbol_or_symbols
+        self.calls.append(symbol)
+        if self.failures.get(symbol):
+            failure = self.failures[symbol].pop(0)
+            if isinstance(failure, Exception):
+                raise failure
+            return failure
+
+        bars, day = [], request.start
+        while day < request.end:
+            bars.append(
+                SimpleNamespace(
+                    timestamp=day,
+                    open=100.0,
+                    high=101.0,
+                    low=99.0,
+                    close=100.5,
+                    volume=1_000.0,
+                    trade_count=10.0,
+                    vwap=100.2,
+                )
+            )
+            day += timedelta(days=1)
+        return SimpleNamespace(data={symbol: bars})
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+    monkeypatch.setattr(download_data.time, "sleep", delays.append)
+    return delays
+
+
+def test_fetch_bars_retries_with_exponential_backoff(sleeps):
+    client = FakeClient({"AAA": [api_error(429), api_error(503), OSError("reset")]})
+
+    bars, attempts = fetch_bars(client, "AAA", START, END, backoff=1.0)
+
+    assert attempts == 4
+    assert bars.height == 4
+    assert len(sleeps) == 3
+    for attempt, delay in enumerate(sleeps):
+        assert 2**attempt <= delay < 2 ** (attempt + 1)
+
+
+def test_fetch_bars_does_not_retry_client_errors(sleeps):
+    client = FakeClient({"AAA": [api_error(404)]})
+
+    with pytest.raises(APIError):
+        fetch_bars(client, "AAA", START, END)
+
+    assert client.calls == ["AAA"]
+    assert sleeps == []
+
+
+def test_fetch_bars_gives_up_after_max_retries(sleeps):
+    client = FakeClient({"AAA": [api_error(500)] * 3})
+
+    with pytest.raises(APIError):
+        fetch_bars(client, "AAA", START, END, max_retries=2)
+
+    assert len(client.calls) == 3
+
+
+def test_download_bars_writes_chunks_and_reports_failures(tmp_path, sleeps):
+    client = FakeClient(
+        {
+            "AAA": [api_error(429)],
+            "BBB": [api_error(403)],
+            "CCC": [SimpleNamespace(data={"CCC": [SimpleNamespace(open=1.0)]})],
+        }
+    )
+    store = BarStore(tmp_path / "bars")
+
+    summary = download_bars(
+        client,
+        ["AAA", "BBB", "CCC", "DDD"],
+        START,
+        END,
+        store,
+        chunk=timedelta(days=2),
+        max_workers=2,
+        backoff=0.0,
+    )
+
+    assert summary.height == 8
+    failed = summary.filter(pl.col("error").is_not_null())
+    # BBB is refused outright and the malformed CCC chunk is reported, not raised
+    assert failed["symbol"].to_list() == ["BBB", "CCC"]
+    assert failed["error"][1].startswith("BarPayloadError")
+    assert summary.filter(pl.col("symbol") == "AAA")["attempts"].to_list() == [2, 1]
+
+    # Each failure fires once, so only the first chunks of BBB and CCC are missing
+    stored = store.scan().collect().group_by("symbol").len().sort("symbol")
+    assert stored["symbol"].to_list() == ["AAA", "BBB", "CCC", "DDD"]
+    assert stored["len"].to_list() == [4, 2, 2, 4]
+
+
+def test_download_bars_raises_unexpected_errors(tmp_path, sleeps):
+    client = FakeClient({"AAA": [TypeError("bug in the client")]})
+
+    with pytest.raises(TypeError):
+        download_bars(client, ["AAA"], START, END, BarStore(tmp_path / "bars"))
+
+
+def test_download_bars_is_idempotent(tmp_path, sleeps):
+    store = BarStore(tmp_path / "bars")
+    for _ in range(2):
+        download_bars(FakeClient(), ["AAA"], START, END, store, max_workers=1)
+
+    assert store.scan().collect().height == 4
+
+
+def test_download_bars_writes_each_partition_once(tmp_path, sleeps, monkeypatch):
+    store = BarStore(tmp_path / "bars")
+    written = []
+    append = store.append
+    monkeypatch.setattr(store, "append", lambda df: written.extend(append(df)))
+
+    download_bars(
+        FakeClient(),
+        ["AAA", "BBB"],
+        START,
+        START + timedelta(days=60),
+        store,
+        chunk=timedelta(days=5),
+        max_workers=3,
+    )
+
+    assert sorted(path.parent.parent.name for path in written) == [
+        "symbol=AAA",
+        "symbol=BBB",
+    ]
+    assert store.scan().collect().height == 120
+
+
+def store_with_hole(path) -> BarStore:
+    """Jan 2-5 and Jan 22-25 stored, so Jan 6-21 is a hole inside one partition"""
+    store = BarStore(path)
+    download_bars(FakeClient(), ["AAA"], START, END, store, max_workers=1)
+    download_bars(
+        FakeClient(),
+        ["AAA"],
+        START + timedelta(days=20),
+        END + timedelta(days=20),
+        store,
+        max_workers=1,
+    )
+    return store
+
+
+def test_find_gaps_reads_only_footers_by_default(tmp_path, monkeypatch):
+    store = store_with_hole(tmp_path / "bars")
+    monkeypatch.setattr(store, "scan", None)
+
+    gaps = download_data.find_gaps(
+        store, ["AAA"], START - timedelta(days=30), END + timedelta(days=30)
+    )
+
+    # Only the tail after the last stored bar; the hole needs `fill_holes`
+    assert gaps == [
+        ("AAA", END + timedelta(days=19, microseconds=1), END + timedelta(days=30))
+    ]
+
+
+def test_sync_bars_fills_interior_holes_on_request(tmp_path, sleeps):
+    store = store_with_hole(tmp_path / "bars")
+
+    client = FakeClient()
+    download_data.sync_bars(
+        client,
+        ["AAA"],
+        store,
+        start=START - timedelta(days=30),
+        end=END + timedelta(days=20),
+        fill_holes=True,
+        max_workers=1,
+    )
+
+    stored = store.scan(["AAA"]).collect()
+    assert stored["timestamp"].min() == START
+    assert stored["timestamp"].diff().max() <= timedelta(days=1)
+    # The hole and the tail after the last bar are requested, but nothing before
+    # the first stored bar without backfill
+    assert client.calls == ["AAA", "AAA"]
+
+
+def test_find_gaps_scans_holes_without_partitions_in_range(tmp_path):
+    # Bars stored in December only, synced over the first days of the new year
+    store = BarStore(tmp_path / "bars")
+    december = datetime(2025, 12, 1, tzinfo=UTC)
+    download_bars(FakeClient(), ["AAA"], december, december + timedelta(days=30), store)
+
+    start = datetime(2026, 1, 2, tzinfo=UTC)
+    gaps = download_data.find_gaps(
+        store, ["AAA"], start, start + timedelta(days=1), fill_holes=True
+    )
+
+    assert gaps == [
+        (
+            "AAA",
+            december + timedelta(days=29, microseconds=1),
+            start + timedelta(days=1),
+        )
+    ]
+
+
+def test_sync_bars_does_not_request_empty_ranges_again(tmp_path, sleeps):
+    store = BarStore(tmp_path / "bars")
+    download_bars(FakeClient(), ["AAA"], START, END, store, max_workers=1)
+    halt_end = END + timedelta(days=20)
+
+    # A halt: the tail after the last bar comes back empty
+    halted = FakeClient({"AAA": [SimpleNamespace(data={})]})
+    download_data.sync_bars(halted, ["AAA"], store, start=START, end=halt_end)
+    assert halted.calls == ["AAA"]
+    assert store.empty_ranges()["end"].to_list() == [halt_end]
+
+    client = FakeClient()
+    download_data.sync_bars(client, ["AAA"], store, start=START, end=halt_end)
+    assert client.calls == []
+
+    # Only the range after the recorded halt is requested
+    download_data.sync_bars(
+        client, ["AAA"], store, start=START, end=halt_end + timedelta(days=2)
+    )
+    assert client.calls == ["AAA"]
+    assert store.scan(["AAA"]).collect()["timestamp"].max() == halt_end + timedelta(
+        days=1
+    )
@@ -0,0 +1,125 @@
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+import pytest
+
+from factors.microstructure import abnormal_volume, vwap_deviation
+from factors.momentum import momentum, short_term_reversal
+from factors.registry import FactorGraph
+from factors.volatility import market_beta, realized_volatility
+
+CONFIG = Path(__file__).resolve().parents[1] / "config" / "factors.yaml"
+START = datetime(2020, 1, 1, 21, 0, tzinfo=UTC)
+
+
+def daily_bars(days: dict[str, int], seed: int = 0) -> pl.DataFrame:
+    """Random-walk daily bars, each symbol trading for its first `days` days"""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for symbol, n in days.items():
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+        frames.append(
+            pl.DataFrame(
+                {
+                    "timestamp": [START + timedelta(days=i) for i in range(n)],
+                    "symbol": [symbol] * n,
+                    "close": close,
+                    "vwap": close * (1 + rng.normal(0, 1e-3, n)),
+                    "volume": rng.integers(1_000, 10_000, n).astype(float),
+                }
+            )
+        )
+    return pl.concat(frames).sample(fraction=1.0, shuffle=True, seed=seed)
+
+
+@pytest.fixture
+def graph(tmp_path) -> FactorGraph:
+    return FactorGraph.from_config(CONFIG, cache_dir=tmp_path / "cache")
+
+
+def test_lookback_levels(graph):
+    # market_beta_252 reads 251 rows of log_return (itself one row back), and
+    # market_return reads one earlier row of every symbol below it
+    assert graph.lookback(["market_beta_252"]) == [252, 1]
+    assert graph.lookback(["volatility_21"]) == [21]
+    assert graph.lookback(graph.outputs) == [252, 1]
+
+
+def test_update_matches_full_recompute(graph, tmp_path):
+    bars = daily_bars({"AAA": 700, "BBB": 700, "CCC": 650, "DDD": 120})
+    full = graph.compute(bars)
+
+    path = tmp_path / "factors"
+    ts = pl.col("timestamp")
+    for day in (400, 500, 501, 600, 700):
+        graph.update(bars.lazy().filter(ts < START + timedelta(days=day)), path)
+
+    incremental = graph.scan(path).collect().sort("symbol", "timestamp")
+    assert incremental.select("timestamp", "symbol").equals(
+        full.select("timestamp", "symbol")
+    )
+    for name in graph.outputs:
+        np.testing.assert_allclose(
+            incremental[name].to_numpy(), full[name].to_numpy(), rtol=1e-9
+        )
+
+
+def test_graph_matches_factor_library(graph):
+    bars = daily_bars({"AAA": 400, "BBB": 400, "CCC": 300})
+    graph_factors = graph.compute(bars)
+
+    library = {
+        "momentum_252_21": momentum(bars),
+        "short_term_reversal_21": short_term_reversal(bars),
+        "volatility_21": realized_volatility(bars),
+        "market_beta_252": market_beta(bars),
+        "vwap_deviation_5": vwap_deviation(bars),
+        "abnormal_volume_21": abnormal_volume(bars),
+    }
+    for name, frame in library.items():
+        expected = frame.sort("symbol", "timestamp").to_series(2)
+        np.testing.assert_allclose(
+            graph_factors[name].to_numpy(), expected.to_numpy(), rtol=1e-12
+        )
+
+
+def test_update_matches_full_recompute_across_a_halt(graph, tmp_path):
+    names = ["volatility_21"]
+    bars = daily_bars({"AAA": 300, "BBB": 300})
+    ts = pl.col("timestamp")
+    halt = ts.is_between(START + timedelta(days=200), START + timedelta(days=230))
+    bars = bars.filter(~(halt & (pl.col("symbol") == "BBB")))
+    full = graph.compute(bars, names)
+
+    # The second update falls 30 days into BBB's halt
+    path = tmp_path / "factors"
+    for day in (150, 230, 300):
+        graph.update(bars.lazy().filter(ts < START + timedelta(days=day)), path, names)
+
+    incremental = graph.scan(path).collect().sort("symbol", "timestamp")
+    assert incremental.select("timestamp", "symbol").equals(
+        full.select("timestamp", "symbol")
+    )
+    np.testing.assert_allclose(
+        incremental["volatility_21"].to_numpy(),
+        full["volatility_21"].to_numpy(),
+        rtol=1e-9,
+    )
+
+
+def test_tail_drops_only_delisted_symbols(graph):
+    days = {f"S{i}": 800 for i in range(4)}
+    active = daily_bars(days)
+    stale = daily_bars({**days, "OLD": 100})
+
+    # OLD keeps its last bars, and the market return at them its peers' bars
+    kept = graph.tail(stale)
+    assert kept.filter(pl.col("symbol") == "OLD").height == 100
+    assert kept.height == 4 * 253 + 100 + 4 * 100
+
+    state = graph.tail(stale, delisted=["OLD"])
+    assert state.equals(graph.tail(active))
+    assert state["timestamp"].min() == START + timedelta(days=800 - 253)
+    assert state.height == 4 * 253
@@ -0,0 +1,122 @@
+from datetime import UTC, datetime, timedelta
+
+import backtrader as bt
+import numpy as np
+import polars as pl
+import pytest
+
+from backtesting.engine import prepare_polars_data_feeds
+from strategies.indicators import EWMA, RateOfChange, RollingMean, RollingStd
+
+START = datetime(2022, 1, 3, 21, 0, tzinfo=UTC)
+PERIOD = 7
+
+
+def daily_bars() -> pl.DataFrame:
+    """
+    Three symbols on different calendars: AAA trades every day, BBB starts late
+    and skips days, and CCC has NaN closes that must roll out of the windows.
+    """
+    rng = np.random.default_rng(3)
+    n = 300
+    calendars = {
+        "AAA": np.arange(n),
+        "BBB": np.sort(rng.choice(np.arange(40, n), 180, replace=False)),
+        "CCC": np.arange(n),
+    }
+    frames = []
+    for symbol, days in calendars.items():
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(days))))
+        if symbol == "CCC":
+            close[[50, 51, 140]] = np.nan
+        frames.append(
+            pl.DataFrame(
+                {
+                    "timestamp": [START + timedelta(days=int(day)) for day in days],
+                    "symbol": symbol,
+                    "open": close,
+                    "high": close,
+                    "low": close,
+                    "close": close,
+                    "volume": 1e6,
+                    "trade_count": 100.0,
+                    "vwap": close,
+                }
+            )
+        )
+    return pl.concat(frames)
+
+
+class ParityStrategy(bt.Strategy):
+    """Records the kernels next to the Backtrader indicators on every bar"""
+
+    def __init__(self):
+        n_symbols = len(self.datas)
+        self.kernels = {
+            "sma": RollingMean(window=PERIOD, n_symbols=n_symbols),
+            "std": RollingStd(window=PERIOD, n_symbols=n_symbols),
+            "roc": RateOfChange(period=PERIOD, n_symbols=n_symbols),
+            "ema": EWMA(period=PERIOD, n_symbols=n_symbols),
+        }
+        self.indicators = {
+            "sma": [bt.indicators.SMA(d.close, period=PERIOD) for d in self.datas],
+            "std": [
+                bt.indicators.StandardDeviation(d.close, period=PERIOD)
+                for d in self.datas
+            ],
+            "roc": [
+                bt.indicators.RateOfChange(d.close, period=PERIOD) for d in self.datas
+            ],
+            "ema": [bt.indicators.EMA(d.close, period=PERIOD) for d in self.datas],
+        }
+        self.expected = {name: [] for name in self.kernels}
+        self.actual = {name: [] for name in self.kernels}
+        self._data_lens = np.zeros(n_symbols, dtype=np.intp)
+
+    def prenext(self):
+        self.next()
+
+    def next(self):
+        data_lens = np.array([len(data) for data in self.datas])
+        new_bar = data_lens > self._data_lens
+        self._data_lens = data_lens
+        closes = np.array(
+            [data.close[0] if len(data) else np.nan for data in self.datas]
+        )
+
+        for name, kernel in self.kernels.items():
+            self.actual[name].append(kernel.update(closes, mask=new_bar))
+            self.expected[name].append(
+                [line[0] if len(line) else np.nan for line in self.indicators[name]]
+            )
+
+
+@pytest.fixture(scope="module")
+def parity() -> ParityStrategy:
+    cerebro = bt.Cerebro(stdstats=False)
+    for feed in prepare_polars_data_feeds(daily_bars()):
+        cerebro.adddata(feed)
+    cerebro.addstrategy(ParityStrategy)
+    return cerebro.run()[0]
+
+
+@pytest.mark.parametrize("name", ["sma", "std", "roc", "ema"])
+def test_kernels_match_backtrader_indicators(parity, name):
+    actual = np.array(parity.actual[name])
+    expected = np.array(parity.expected[name])
+
+    # Far more bars than the window, so the periodic re-sum is exercised, and
+    # BBB's skipped days only advance the other symbols through the mask. An
+    # EMA never recovers from CCC's NaN closes, in Backtrader as in EWMA.
+    assert len(actual) == 300
+    assert np.isfinite(actual[:, :2]).sum() > 0.8 * actual[:, :2].size
+    np.testing.assert_allclose(actual, expected, rtol=1e-9, atol=1e-12)
+
+
+def test_nan_rolls_out_of_the_window(parity):
+    sma = np.array(parity.actual["sma"])[:, 2]
+
+    assert np.isnan(sma[50 : 51 + PERIOD]).all()
+    assert np.isfinite(sma[51 + PERIOD : 140]).all()
+    assert np.isnan(sma[140 : 140 + PERIOD]).all()
+    assert np.isfinite(sma[140 + PERIOD :]).all()